@@ -0,0 +1,230 @@
+"""
+API calls and latency per turn of the two ChatGPT4o backends, against a local stand-in server.
+
+Starts an OpenAI compatible server on localhost (standard library only) that answers
+the Assistants endpoints GPTAssistant uses and streamed chat completions. Every
+request waits a fixed round trip time, a run or a completion a further generation
+time, and the reply picks the first option listed in the prompt. Both backends then
+play the same room prompts (the random walks of prompt_profiles, one game per map,
+history kept as in a real game) and report their API calls and time per turn.
+
+The response cache and the rate limiter are turned off, so every turn reaches the
+server. No OpenAI account or database is needed, the tokenizer is tiktoken's.
+
+Usage: python -m benchmarks.gpt_backends [number_of_maps] [round_trip_ms] [generation_ms]
+"""
+
+import os
+
+# Read when the modules below are imported, every turn has to reach the stand-in server
+os.environ["LLM_RESPONSE_CACHE"] = "off"
+os.environ["OPENAI_RATE_LIMITER"] = "off"
+
+import itertools
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.prompt_building import populate
+from benchmarks.prompt_profiles import ALIGNMENT, MOTIVATION, play
+from classes.room_templates import encounter_template, loot_template
+from map_creation.random_encounter_assignment import assign_encounter
+from map_creation.random_loot_assignment import assign_loot
+from map_creation.room_assignment import generate_random_rooms
+from utilities.build_content_bundle import UTILITIES_DIR, read_posts
+from utilities.glossary import get_definition
+
+KEY = "LG-Wealth"
+
+
+class StandIn(BaseHTTPRequestHandler):
+    # The few endpoints the two backends use, threads are held in memory
+    protocol_version = "HTTP/1.1"
+    round_trip = 0.0
+    generation = 0.0
+    ids = itertools.count()
+    threads = {}
+    requests = 0
+
+    def log_message(self, *args):
+        pass
+
+    def new_id(self, prefix):
+        return f"{prefix}_{next(self.ids)}"
+
+    def body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def send(self, payload, events=None):
+        # A JSON body, or a whole server-sent event stream sent at once
+        if events is None:
+            data, kind = json.dumps(payload).encode(), "application/json"
+        else:
+            data = "".join(f"event: {name}\ndata: {json.dumps(event)}\n\n" if name else f"data: {json.dumps(event)}\n\n"
+                           for name, event in events)
+            data, kind = (data + payload).encode(), "text/event-stream"
+        self.send_response(200)
+        self.send_header("Content-Type", kind)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        StandIn.requests += 1
+        time.sleep(self.round_trip)
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if parts[1] == "assistants":
+            self.send({"id": parts[2], "object": "assistant", "created_at": 0, "model": "gpt-4o", "name": KEY,
+                       "instructions": f"You are a {ALIGNMENT} character motivated by {MOTIVATION}.", "tools": []})
+        else:
+            data = list(reversed(self.threads[parts[2]]))
+            self.send({"object": "list", "data": data, "has_more": False,
+                       "first_id": data[0]["id"] if data else None, "last_id": data[-1]["id"] if data else None})
+
+    def do_DELETE(self):
+        StandIn.requests += 1
+        time.sleep(self.round_trip)
+        parts = self.path.strip("/").split("/")
+        self.threads[parts[2]][:] = [message for message in self.threads[parts[2]] if message["id"] != parts[4]]
+        self.send({"id": parts[4], "object": "thread.message.deleted", "deleted": True})
+
+    def do_POST(self):
+        StandIn.requests += 1
+        time.sleep(self.round_trip)
+        parts = self.path.strip("/").split("/")
+        body = self.body()
+        if parts[1] == "chat":
+            time.sleep(self.generation)
+            self.send("data: [DONE]\n\n", self.completion(body["messages"]))
+        elif len(parts) == 2:
+            thread_id = self.new_id("thread")
+            self.threads[thread_id] = [self.message(thread_id, message["role"], message["content"])
+                                       for message in body.get("messages", [])]
+            self.send({"id": thread_id, "object": "thread", "created_at": 0, "metadata": {}})
+        elif parts[3] == "messages":
+            message = self.message(parts[2], body["role"], body["content"])
+            self.threads[parts[2]].append(message)
+            self.send(message)
+        elif parts[-1] == "cancel":
+            self.send(self.run(parts[2], parts[4], "cancelled"))
+        else:
+            time.sleep(self.generation)
+            self.send("event: done\ndata: [DONE]\n\n", self.run_events(parts[2]))
+
+    def message(self, thread_id, role, content, run_id=None):
+        return {"id": self.new_id("msg"), "object": "thread.message", "created_at": 0, "thread_id": thread_id,
+                "role": role, "content": [{"type": "text", "text": {"value": content, "annotations": []}}],
+                "status": "completed", "completed_at": 0, "run_id": run_id, "assistant_id": None,
+                "attachments": [], "metadata": {}}
+
+    def run(self, thread_id, run_id, status):
+        return {"id": run_id, "object": "thread.run", "created_at": 0, "thread_id": thread_id,
+                "assistant_id": "asst", "status": status, "model": "gpt-4o", "instructions": "", "tools": [],
+                "failed_at": None, "last_error": None, "completed_at": 0 if status == "completed" else None,
+                "metadata": {}}
+
+    def run_events(self, thread_id):
+        run_id, step_id = self.new_id("run"), self.new_id("step")
+        thread = self.threads[thread_id]
+        prompt = next(message for message in reversed(thread) if message["role"] == "user")
+        reply = self.reply(prompt["content"][0]["text"]["value"])
+        message = self.message(thread_id, "assistant", reply, run_id)
+        thread.append(message)
+        tokens = sum(len(item["content"][0]["text"]["value"].split()) for item in thread)
+        usage = {"prompt_tokens": tokens, "completion_tokens": 6, "total_tokens": tokens + 6}
+        step = {"id": step_id, "object": "thread.run.step", "created_at": 0, "run_id": run_id,
+                "assistant_id": "asst", "thread_id": thread_id, "type": "message_creation",
+                "step_details": {"type": "message_creation", "message_creation": {"message_id": message["id"]}}}
+        return [("thread.run.created", self.run(thread_id, run_id, "queued")),
+                ("thread.run.step.created", dict(step, status="in_progress", usage=None)),
+                ("thread.message.created", dict(message, status="in_progress", completed_at=None, content=[])),
+                ("thread.message.completed", message),
+                ("thread.run.step.completed", dict(step, status="completed", completed_at=0, usage=usage)),
+                ("thread.run.completed", dict(self.run(thread_id, run_id, "completed"), usage=usage))]
+
+    def completion(self, messages):
+        reply = self.reply(next(message["content"] for message in reversed(messages) if message["role"] == "user"))
+        tokens = sum(len(message["content"].split()) for message in messages)
+        chunk = {"id": self.new_id("chatcmpl"), "object": "chat.completion.chunk", "created": 0, "model": "gpt-4o"}
+        return [(None, dict(chunk, choices=[{"index": 0, "delta": {"role": "assistant", "content": reply},
+                                             "finish_reason": None}])),
+                (None, dict(chunk, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])),
+                (None, dict(chunk, choices=[], usage={"prompt_tokens": tokens, "completion_tokens": 6,
+                                                      "total_tokens": tokens + 6}))]
+
+    def reply(self, prompt):
+        options = re.findall(r"\((\d+)\)", prompt)
+        return json.dumps({"Action": int(options[0]) if options else 1})
+
+
+def start_server(round_trip, generation):
+    StandIn.round_trip = round_trip
+    StandIn.generation = generation
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_backend(assistant, maps, encounters, loot):
+    # Plays every map with one assistant, reset between games as the pool does. Returns the calls and seconds of every
+    # turn and the requests the server got, starting the games included
+    calls, seconds = [], []
+    requests = StandIn.requests
+    for seed, the_map in enumerate(maps):
+        assistant.reset()
+        game_map = populate(the_map, encounters, loot)
+
+        def visit(room, blocked_dir):
+            prompt, _ = room.print_ingame_description(game_map, blocked_dir)
+            assistant.turn_prompt(prompt, None, actions=room.current_actions(game_map, blocked_dir))
+            calls.append(assistant.thread_ledger.turn_calls)
+
+        play(game_map, seed, visit)
+        seconds.extend(assistant.thread_ledger.turn_seconds)
+    return calls, seconds, StandIn.requests - requests
+
+
+def summarize(label, calls, seconds, requests):
+    ordered = sorted(seconds)
+    p95 = ordered[int(len(ordered) * 0.95)]
+    print(f"{label:<18}{sum(calls) / len(calls):>6.2f} calls/turn (at most {max(calls)})"
+          f"{requests / len(calls):>8.2f} requests/turn{sum(seconds) / len(seconds) * 1000:>9.1f} ms/turn"
+          f"{p95 * 1000:>9.1f} ms p95")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    round_trip = (float(sys.argv[2]) if len(sys.argv) > 2 else 40) / 1000
+    generation = (float(sys.argv[3]) if len(sys.argv) > 3 else 200) / 1000
+    server = start_server(round_trip, generation)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "stand-in")
+
+    from classes.chat_completions_assistant import ChatCompletionsAssistant
+    from classes.the_assistant import GPTAssistant
+
+    encounter_docs = read_posts(os.path.join(UTILITIES_DIR, "populate_random_encounters.py"))
+    loot_docs = read_posts(os.path.join(UTILITIES_DIR, "populate_random_loot.py"))
+    encounters = {doc["_id"]: encounter_template(doc, ALIGNMENT) for doc in encounter_docs}
+    loot = {doc["_id"]: loot_template(doc, MOTIVATION) for doc in loot_docs}
+    random.seed(0)
+    maps = [assign_loot(assign_encounter(generate_random_rooms())) for _ in range(n)]
+
+    print(f"Playing {n} games per backend, {round_trip * 1000:.0f} ms round trip, "
+          f"{generation * 1000:.0f} ms generation\n")
+    backends = {
+        "Assistants": GPTAssistant(ALIGNMENT, MOTIVATION, KEY),
+        "Chat completions": ChatCompletionsAssistant(ALIGNMENT, MOTIVATION, KEY, get_definition(MOTIVATION)),
+    }
+    for label, assistant in backends.items():
+        summarize(label, *run_backend(assistant, maps, encounters, loot))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
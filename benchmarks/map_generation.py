@@ -0,0 +1,44 @@
+"""
+Throughput benchmark for map generation.
+
+Compares the list based generators (generate_random_rooms + assign_encounter +
+assign_loot, one map at a time) with the vectorized generate_map_batch(), both on
+its own and including the conversion back to list layouts.
+
+Usage: python -m benchmarks.map_generation [number_of_maps]
+"""
+
+import sys
+import time
+
+from map_creation.room_assignment import generate_random_rooms
+from map_creation.random_encounter_assignment import assign_encounter
+from map_creation.random_loot_assignment import assign_loot
+from map_creation.batch_generation import generate_map_batch, batch_to_layouts
+
+
+def time_it(label, func, n):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32}{elapsed:>10.3f}s\t{n / elapsed:>14,.0f} maps/s")
+    return elapsed
+
+
+def list_generator(n):
+    for _ in range(n):
+        assign_loot(assign_encounter(generate_random_rooms()))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    print(f"Generating {n} maps\n")
+    baseline = time_it("List generators", lambda: list_generator(n), n)
+    batch = time_it("generate_map_batch", lambda: generate_map_batch(n, seed=0), n)
+    adapted = time_it("generate_map_batch + adapter", lambda: batch_to_layouts(generate_map_batch(n, seed=0)), n)
+    print(f"\nSpeed up (batch only):\t\t{baseline / batch:.1f}x")
+    print(f"Speed up (batch + adapter):\t{baseline / adapted:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
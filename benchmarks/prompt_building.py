@@ -0,0 +1,127 @@
+"""
+Cost of building the room prompt per turn, with and without the prompt cache.
+
+Plays random walks over generated maps the way gpt_process_room asks for prompts:
+one prompt per turn, another after every encounter or loot action taken in the room,
+and an occasional retry of the same prompt. "Rebuilt" calls build_ingame_description
+every time with the action row and text wrapping caches cleared (the behaviour before
+the caches), "Memoized" goes through print_ingame_description. Both runs check they
+produce identical prompts.
+
+Content comes from the populate scripts, so no database is needed.
+
+Usage: python -m benchmarks.prompt_building [number_of_games]
+"""
+
+import os
+import random
+import sys
+import time
+
+from classes.game_state import GameState
+from classes.room_layout import BlankRoom, wrap_prompt
+from classes.room_templates import encounter_template, loot_template
+from map_creation.grid import grid_for_layout
+from map_creation.random_encounter_assignment import assign_encounter
+from map_creation.random_loot_assignment import assign_loot
+from map_creation.room_assignment import generate_random_rooms
+from utilities.build_content_bundle import UTILITIES_DIR, read_posts
+
+TURNS = 35
+OPPOSITE = {"North": "South", "South": "North", "East": "West", "West": "East"}
+RETRY_RATE = 0.2
+DESCRIPTION = ("The walls of this chamber are rough hewn stone, slick with moisture, and the air smells of old "
+               "smoke and damp earth. A draft from somewhere deeper in the dungeon stirs the dust at your feet.")
+
+
+def populate(the_map, encounters, loot):
+    grid = grid_for_layout(the_map)
+    state = GameState(grid)
+    rooms = []
+    for i, row in enumerate(the_map):
+        for j, col in enumerate(row):
+            room = BlankRoom(i * grid.cols + j, grid, state)
+            room.set_description(col[0], DESCRIPTION)
+            room.set_encounter_id(col[1])
+            room.set_loot_id(col[2])
+            if col[1] != "None":
+                room.set_encounter_template(encounters[col[1]])
+                room.set_description(col[0], encounters[col[1]].room_description)
+            if col[2] != "None":
+                room.set_loot_template(loot[col[2]])
+            rooms.append(room)
+    return rooms
+
+
+def play(game_map, seed, build):
+    # Returns every prompt requested during one random walk
+    rng = random.Random(seed)
+    prompts = []
+    loc = next(room.loc for room in game_map if room.d_id == "entrance")
+    blocked_dir = None
+    for _ in range(TURNS):
+        room = game_map[loc]
+        room.set_active()
+        prompts.append(build(room, game_map, blocked_dir)[0])
+        if rng.random() < RETRY_RATE:
+            prompts.append(build(room, game_map, blocked_dir)[0])
+        for action_type in ("encounter", "loot"):
+            if getattr(room, f"{action_type}_active") and rng.random() < 0.5:
+                room.set_active_loot_enc(action_type, False)
+                prompts.append(build(room, game_map, blocked_dir)[0])
+        direction = rng.choice(room.directions)
+        blocked_dir = OPPOSITE[direction]
+        room.set_inactive()
+        loc = room.neighbors[direction]
+    return prompts
+
+
+def run(maps, encounters, loot, build):
+    # Only the prompt calls are timed, not populating the maps or the walk
+    elapsed = 0.0
+    prompts = []
+
+    def timed_build(room, game_map, blocked_dir):
+        nonlocal elapsed
+        start = time.perf_counter()
+        result = build(room, game_map, blocked_dir)
+        elapsed += time.perf_counter() - start
+        return result
+
+    for seed, the_map in enumerate(maps):
+        prompts.extend(play(populate(the_map, encounters, loot), seed, timed_build))
+    return elapsed, prompts
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    encounter_docs = read_posts(os.path.join(UTILITIES_DIR, "populate_random_encounters.py"))
+    loot_docs = read_posts(os.path.join(UTILITIES_DIR, "populate_random_loot.py"))
+    encounters = {doc["_id"]: encounter_template(doc, "Lawful Good") for doc in encounter_docs}
+    loot = {doc["_id"]: loot_template(doc, "Wealth") for doc in loot_docs}
+    random.seed(0)
+    maps = [assign_loot(assign_encounter(generate_random_rooms())) for _ in range(n)]
+
+    def rebuild(room, game_map, blocked_dir):
+        wrap_prompt.cache_clear()
+        room.state.prompt_cache.clear()
+        return room.build_ingame_description(game_map, blocked_dir)
+
+    def memoized_build(room, game_map, blocked_dir):
+        return room.print_ingame_description(game_map, blocked_dir)
+
+    rebuilt, expected = run(maps, encounters, loot, rebuild)
+    wrap_prompt.cache_clear()
+    memoized, prompts = run(maps, encounters, loot, memoized_build)
+    if prompts != expected:
+        print("Memoized prompts differ from rebuilt prompts")
+        exit(1)
+
+    print(f"Playing {n} games, {len(prompts)} prompts\n")
+    for label, elapsed in (("Rebuilt", rebuilt), ("Memoized", memoized)):
+        print(f"{label:<12}{elapsed:>10.3f}s\t{elapsed / len(prompts) * 1e6:>10.1f} us/prompt")
+    print(f"\nSpeed up:\t{rebuilt / memoized:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+A/B comparison of the full and compact prompt profiles on the same maps.
+
+Plays seeded random walks over generated maps (see prompt_building) and renders every
+room prompt under both profiles, checking that they number the options the same way
+and build the same point dictionary. Reports the tokens per room prompt of each
+profile, counted with tiktoken's encoding for --tokenizer (gpt-4o by default, gpt-4 for
+cl100k).
+
+With --llm, every prompt is also sent to an OllamaAssistant of each profile as a single
+turn (the chat history is cleared first, so both see exactly the same state) and the
+decisions are compared: the kind of action chosen (encounter, loot, aoe, move), how
+often the two profiles pick the same option, how often a move goes to an unexplored
+room and how many replies had to be given up on. The walk does not follow the model,
+so both profiles answer the same sequence of rooms. This needs the Ollama server.
+
+Content comes from the populate scripts, so no database is needed.
+
+Usage: python -m benchmarks.prompt_profiles [number_of_maps] [--llm] [--tokenizer=model]
+"""
+
+import os
+import random
+import sys
+from collections import Counter
+
+from benchmarks.prompt_building import OPPOSITE, TURNS, populate
+from classes.prompt_profile import PROFILES
+from classes.room_templates import encounter_template, loot_template
+from connections.response_cache import report_response_cache
+from map_creation.random_encounter_assignment import assign_encounter
+from map_creation.random_loot_assignment import assign_loot
+from map_creation.room_assignment import generate_random_rooms
+from utilities.build_content_bundle import UTILITIES_DIR, read_posts
+from utilities.glossary import get_definition
+from utilities.token_count import count_tokens
+
+ALIGNMENT = "Lawful Good"
+MOTIVATION = "Wealth"
+KINDS = ("encounter", "loot", "aoe", "move")
+GAVE_UP = (-79, -222, -892)
+
+
+def play(game_map, seed, visit):
+    # Same walk as prompt_building, visit(room, blocked_dir) sees every prompt state
+    rng = random.Random(seed)
+    loc = next(room.loc for room in game_map if room.d_id == "entrance")
+    blocked_dir = None
+    for _ in range(TURNS):
+        room = game_map[loc]
+        room.set_active()
+        visit(room, blocked_dir)
+        for action_type in ("encounter", "loot"):
+            if getattr(room, f"{action_type}_active") and rng.random() < 0.5:
+                room.set_active_loot_enc(action_type, False)
+                visit(room, blocked_dir)
+        direction = rng.choice(room.directions)
+        blocked_dir = OPPOSITE[direction]
+        room.set_inactive()
+        loc = room.neighbors[direction]
+
+
+def single_turn(assistant, prompt, actions):
+    # One decision without history, so the answer only depends on this prompt
+    assistant.chat_history = []
+    assistant.decisions = []
+    return assistant.turn_prompt(prompt, actions=actions)
+
+
+def summarize(label, tokens, decisions):
+    print(f"{label:<10}{sum(tokens) / len(tokens):>10.1f} tokens/prompt")
+    if not decisions:
+        return
+    kinds = Counter(kind for kind, _ in decisions)
+    total = len(decisions)
+    share = "\t".join(f"{kind} {kinds[kind] / total:.1%}" for kind in KINDS + ("gave up",))
+    moves = [unexplored for kind, unexplored in decisions if kind in ("aoe", "move")]
+    unexplored = sum(moves) / len(moves) if moves else 0.0
+    print(f"{'':<10}{share}\tunexplored moves {unexplored:.1%}")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 200
+    use_llm = "--llm" in sys.argv
+    model = next((arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--tokenizer=")), "gpt-4o")
+    encounter_docs = read_posts(os.path.join(UTILITIES_DIR, "populate_random_encounters.py"))
+    loot_docs = read_posts(os.path.join(UTILITIES_DIR, "populate_random_loot.py"))
+    encounters = {doc["_id"]: encounter_template(doc, ALIGNMENT) for doc in encounter_docs}
+    loot = {doc["_id"]: loot_template(doc, MOTIVATION) for doc in loot_docs}
+    random.seed(0)
+    maps = [assign_loot(assign_encounter(generate_random_rooms())) for _ in range(n)]
+
+    assistants = {}
+    if use_llm:
+        from classes.llama_assistant import OllamaAssistant
+        definition = get_definition(MOTIVATION)
+        assistants = {profile: OllamaAssistant(ALIGNMENT, MOTIVATION, "LG-Wealth", definition, profile=profile)
+                      for profile in PROFILES}
+
+    tokens = {profile: [] for profile in PROFILES}
+    decisions = {profile: [] for profile in PROFILES}
+    agreed = 0
+
+    def visit(room, blocked_dir):
+        nonlocal agreed
+        rendered = {profile: room.print_ingame_description(game_map, blocked_dir, profile=profile)
+                    for profile in PROFILES}
+        if len({str(point_dict) for _, point_dict in rendered.values()}) != 1:
+            print(f"The profiles number the options of room {room.loc} differently")
+            exit(1)
+        actions = room.current_actions(game_map, blocked_dir)
+        chosen = {}
+        for profile, (prompt, _) in rendered.items():
+            tokens[profile].append(count_tokens(prompt, model))
+            if profile not in assistants:
+                continue
+            number = single_turn(assistants[profile], prompt, actions)
+            action = actions.action(number) if number not in GAVE_UP else None
+            if action is None:
+                decisions[profile].append(("gave up", False))
+                continue
+            unexplored = action.direction is not None and not game_map[room.neighbors[action.direction]].visited
+            decisions[profile].append((action.kind, unexplored))
+            chosen[profile] = action.number
+        if len(chosen) == len(PROFILES) and len(set(chosen.values())) == 1:
+            agreed += 1
+
+    for seed, the_map in enumerate(maps):
+        game_map = populate(the_map, encounters, loot)
+        play(game_map, seed, visit)
+
+    prompts = len(tokens[PROFILES[0]])
+    print(f"Playing {n} games, {prompts} prompts per profile, {model} tokens\n")
+    for profile in PROFILES:
+        summarize(profile, tokens[profile], decisions[profile])
+    full, compact = (sum(tokens[profile]) for profile in PROFILES)
+    print(f"\nRoom prompt tokens saved:\t{1 - compact / full:.1%}")
+    if assistants:
+        system = {profile: count_tokens(assistant.system_message, model) for profile, assistant in assistants.items()}
+        print(f"System message tokens:\t\t" + "\t".join(f"{profile} {system[profile]}" for profile in PROFILES))
+        print(f"Same option chosen:\t\t{agreed / prompts:.1%}")
+        report_response_cache()
+
+
+if __name__ == '__main__':
+    main()
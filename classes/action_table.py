@@ -0,0 +1,181 @@
+"""
+Numbered actions of every room, shared by the in-game prompt and the training data export.
+
+The ActionTable of a map is compiled once, after the map is populated: for each room
+it keeps the in-room options of its encounter and loot and, per direction, the
+neighbor content whose area of effect can be sensed from the room. room_actions()
+turns that into the RoomActions a player currently has, numbered in prompt order:
+
+1. the encounter options, then the loot option, while they are active
+2. one "explore" option per active neighbor encounter/loot with an AOE, skipping the
+   blocked direction (the way the player came in)
+3. a move for every direction not already covered by an explore option
+
+Both BlankRoom.print_ingame_description and generate_initial_map_JSON render from these
+rows, so numbering, preambles and points cannot drift apart. The rows are also handed
+to the assistants with the prompt, so replies are checked against them instead of
+against the prompt text. Rows are cached per room
+in the map's GameState next to the prompts and dropped by the same invalidation.
+"""
+
+from typing import NamedTuple
+
+
+class Action(NamedTuple):
+    number: int
+    kind: str             # "encounter", "loot", "aoe" or "move"
+    text: str             # What the prompt shows after "(number) "
+    label: str            # Short form used by the training data export
+    direction: str        # Room the action leads to, None for in-room actions
+    content_id: str       # Encounter/loot id, "AOE_<id>" for explore options, "Skip"/"Ignored" for moves
+    points: tuple
+
+
+class RoomActions(NamedTuple):
+    loc: int
+    description: str      # Room text with its active content and the AOE cues, before wrapping
+    content: str          # Just the active encounter and loot text, "" when the room is empty
+    cues: tuple           # (direction, short AOE description) of every explore option
+    actions: tuple
+    aoe_preamble: str     # "Ignore ... and:" heading of the explore options, None without one
+    move_preamble: str    # Heading of the moves, None when there are no moves
+
+    def of_kind(self, *kinds):
+        return [action for action in self.actions if action.kind in kinds]
+
+    def action(self, number):
+        # The row for a number as a model might return it (int or digit string), None when it is not listed
+        key = str(number)
+        for action in self.actions:
+            if str(action.number) == key:
+                return action
+        return None
+
+
+class _AoeSource(NamedTuple):
+    kind: str
+    loc: int
+    template: tuple
+
+
+class ActionTable:
+
+    def __init__(self, game_map):
+        self.game_map = game_map
+        self.state = game_map[0].state
+        # Rooms that cannot see each other's bits (built without a shared GameState) are never cached
+        self.shared = all(room.state is self.state for room in game_map)
+        # Per room and direction, the neighbor content with an AOE, encounter first
+        self.sources = []
+        for room in game_map:
+            by_direction = []
+            for direction in room.directions:
+                neighbor = game_map[room.neighbors[direction]]
+                found = []
+                if neighbor.encounter_template is not None and neighbor.encounter_template.aoe > 0:
+                    found.append(_AoeSource("encounter", neighbor.loc, neighbor.encounter_template))
+                if neighbor.loot_template is not None and neighbor.loot_template.aoe > 0:
+                    found.append(_AoeSource("loot", neighbor.loc, neighbor.loot_template))
+                by_direction.append((direction, tuple(found)))
+            self.sources.append(tuple(by_direction))
+
+    def room_actions(self, loc, blocked_dir=None):
+        if not self.shared:
+            return self._compile(loc, blocked_dir)
+        mask = self.state.grid.neighbor_masks[loc] | (1 << loc)
+        key = ("actions", self.state.visited & mask, self.state.encounter_active & mask,
+               self.state.loot_active & mask, blocked_dir)
+        cache = self.state.prompt_cache.setdefault(loc, {})
+        if key not in cache:
+            cache[key] = self._compile(loc, blocked_dir)
+        return cache[key]
+
+    def _compile(self, loc, blocked_dir):
+        room = self.game_map[loc]
+        description = room.room
+        content = []
+        cues = []
+        actions = []
+        ignore_points = 0
+        number = 1
+
+        # In-room options, the options are "({opt}) text" templates
+        if room.encounter_active:
+            description += f" {room.encounter}"
+            content.append(room.encounter)
+            ignore_points += room.encounter_action_points[2]  # The 3rd value is for choosing not to engage
+            for option in room.encounter_options.values():
+                text = _option_text(option, number)
+                actions.append(Action(number, "encounter", text, text, None, room.re_id, room.encounter_action_points))
+                number += 1
+        if room.loot_active:
+            description += f" {room.loot}"
+            content.append(room.loot)
+            ignore_points += room.loot_action_points[1]  # The 2nd value is for choosing not to engage
+            text = _option_text(room.loot_options['1'], number)
+            actions.append(Action(number, "loot", text, text, None, room.l_id, room.loot_action_points))
+            number += 1
+
+        # Explore options for the active content sensed in the neighboring rooms
+        aoe_directions = set()
+        for direction, found in self.sources[loc]:
+            if direction == blocked_dir:
+                continue
+            for source in found:
+                neighbor = self.game_map[source.loc]
+                if not getattr(neighbor, f"{source.kind}_active"):
+                    continue
+                template = source.template
+                description += " " + template.aoe_description.format(direction=direction)
+                label = f"Explore the {template.aoe_option_desc} to the {direction}"
+                if neighbor.visited:
+                    text = (f"You have already explored the {template.aoe_option_desc} to the {direction}. "
+                            f"Move {direction} anyway.")
+                else:
+                    text = f"{label}."
+                content_id = "AOE_" + getattr(neighbor, f"{source.kind}_id")
+                points = (template.aoe_points[0], template.aoe_points[1])
+                actions.append(Action(number, "aoe", text, label, direction, content_id, points))
+                cues.append((direction, template.aoe_option_desc))
+                aoe_directions.add(direction)
+                number += 1
+
+        # Moves for the remaining directions, including the blocked one
+        for direction in room.directions:
+            if direction in aoe_directions:
+                continue
+            neighbor = self.game_map[room.neighbors[direction]]
+            text = f"{direction} (This room has been explored)" if neighbor.visited else direction
+            actions.append(Action(number, "move", text, direction, direction,
+                                  "Skip" if ignore_points == 0.0 else "Ignored", (0.0, 0.0)))
+            number += 1
+
+        in_room = room.encounter_active or room.loot_active
+        aoe_preamble = None
+        if aoe_directions:
+            if room.encounter_active and room.loot_active:
+                aoe_preamble = "Ignore everything in the room and:"
+            elif room.encounter_active:
+                aoe_preamble = "Ignore the encounter and:"
+            elif room.loot_active:
+                aoe_preamble = "Ignore the loot and:"
+        move_preamble = None
+        if any(action.kind == "move" for action in actions):
+            move_preamble = "Ignore everything and move:" if in_room else "Move:"
+
+        return RoomActions(loc, description, " ".join(content), tuple(cues), tuple(actions), aoe_preamble,
+                           move_preamble)
+
+
+def _option_text(option, number):
+    line = option.format(opt=number)
+    prefix = f"({number}) "
+    return line[len(prefix):] if line.startswith(prefix) else line
+
+
+def action_table(game_map):
+    # The map's table, compiled on first use after the map is populated
+    state = game_map[0].state
+    if state.action_table is None or state.action_table.game_map is not game_map:
+        state.action_table = ActionTable(game_map)
+    return state.action_table
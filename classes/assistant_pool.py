@@ -0,0 +1,87 @@
+"""
+Reuses assistants across the games of a process instead of building one per game.
+
+Building a GPTAssistant used to make an OpenAI client, load the tiktoken encoding and
+retrieve its assistant over the network, and an OllamaAssistant made a new ChatOllama.
+Those are now made once per process (openai_client, retrieve_assistant, chat_model),
+and finished assistants are kept here by what shapes them: backend, alignment,
+motivation, key, definition and grid. acquire_assistant hands out an idle one after
+reset(), which starts the game's conversation (a new thread for GPT, empty history and
+metrics for Llama), or builds one when none is idle; release_assistant gives it back
+when the game ends. Games in flight at the same time never share an assistant.
+
+Every acquire is timed: each game prints its assistant's startup time and whether it
+was reused, report_assistant_pool prints the totals at the end of a batch.
+"""
+
+import time
+from collections import defaultdict
+
+from classes.chat_completions_assistant import ChatCompletionsAssistant
+from classes.llama_assistant import OllamaAssistant
+from classes.the_assistant import GPTAssistant
+
+
+class AssistantPool:
+
+    def __init__(self):
+        self.idle = defaultdict(list)
+        self.startups = {"new": [], "reused": []}
+
+    def acquire(self, llm, alignment, motivation, key, definition=None, grid=None):
+        started = time.perf_counter()
+        spec = (llm, alignment, motivation, key, definition, grid.label if grid is not None else None)
+        if self.idle[spec]:
+            assistant = self.idle[spec].pop()
+            assistant.reset()
+            kind = "reused"
+        else:
+            assistant = build_assistant(llm, alignment, motivation, key, definition, grid)
+            kind = "new"
+        seconds = time.perf_counter() - started
+        assistant.pool_spec = spec
+        assistant.startup = (seconds, kind)
+        self.startups[kind].append(seconds)
+        return assistant
+
+    def release(self, assistant):
+        spec = getattr(assistant, "pool_spec", None)
+        if spec is not None and assistant not in self.idle[spec]:
+            self.idle[spec].append(assistant)
+
+    def report(self):
+        parts = []
+        for kind, seconds in self.startups.items():
+            if seconds:
+                parts.append(f"{len(seconds)} {kind} in {sum(seconds) / len(seconds) * 1000:.1f} ms on average")
+        if parts:
+            idle = sum(len(assistants) for assistants in self.idle.values())
+            print(f"Assistant startup (batch):\t{', '.join(parts)}, {idle} idle")
+
+
+def build_assistant(llm, alignment, motivation, key, definition=None, grid=None):
+    if llm == "ChatGPT4o":
+        return GPTAssistant(alignment, motivation, key)
+    if llm == "ChatGPT4oChat":
+        return ChatCompletionsAssistant(alignment, motivation, key, definition, grid)
+    if llm == "Llama":
+        return OllamaAssistant(alignment, motivation, key, definition, grid)
+    print(f"No assistant for {llm}")
+    exit(1)
+
+
+_pool = AssistantPool()
+
+
+def acquire_assistant(llm, alignment, motivation, key, definition=None, grid=None):
+    return _pool.acquire(llm, alignment, motivation, key, definition, grid)
+
+
+def release_assistant(assistant):
+    # Called once the game has ended, None for games that never got an assistant
+    if assistant is not None:
+        _pool.release(assistant)
+
+
+def report_assistant_pool():
+    _pool.report()
@@ -0,0 +1,172 @@
+"""
+Interface for GPT-4o through the chat completions API, without assistants or threads.
+
+The alternative to GPTAssistant for the ChatGPT4o backend (ChatGPT4oChat in the game
+menu). The history is kept locally, as OllamaAssistant does, and the system message is
+compiled here from the alignment, motivation and prompt profile instead of living in a
+pre-configured assistant, so any account, or any OpenAI compatible server
+(OPENAI_BASE_URL), can run it.
+
+Features:
+- One streamed chat completions request per turn, repeated only when the reply is not an integer action
+- The per-turn instructions of the Assistants path (or the compact ones) compiled once into the system message
+- History pruned locally by the same token budget as the GPT thread, without any API call (see thread_ledger)
+- Requests wait on the shared token bucket (see rate_limiter) and replies are cached on disk (see response_cache)
+- API calls and latency of every turn reported at the end of the game, as for GPTAssistant
+- With LLM_EARLY_STOP=on the stream is closed once the action is complete, decode tokens per turn counted (see
+  early_stop)
+
+benchmarks/gpt_backends.py compares the two backends against a local stand-in server.
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+
+from classes.early_stop import DecodeMetrics, PartialReply
+from classes.prompt_profile import compact_instructions, resolve_profile
+from classes.the_assistant import REPLY_TOKENS, openai_client, turn_instructions
+from classes.thread_ledger import ThreadLedger
+from connections.rate_limiter import get_rate_limiter
+from connections.response_cache import RequestCounter, get_response_cache
+from utilities.token_count import encoding
+
+CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o")
+
+
+class ChatCompletionsAssistant:
+
+    def __init__(self, alignment=None, motivation=None, key=None, definition=None, grid=None, profile=None):
+        load_dotenv()
+        self.profile = resolve_profile(profile)
+        self.tokenizer = encoding("gpt-4o")
+        self.client = openai_client()
+        self.params = dict(model=CHAT_MODEL, temperature=0, response_format={"type": "json_object"})
+        self.alignment = alignment
+        self.motivation = motivation
+        self.definition = definition
+        self.full_key = key
+        self.grid_size = grid.label if grid is not None else "5x5"
+        self.system_message = self.compile_system_message()
+        self.rate_limiter = get_rate_limiter()
+        self.response_cache = get_response_cache()
+        self.requests = RequestCounter()
+        self.reset()
+
+    def reset(self):
+        # Everything kept per game, called for a new assistant and when assistant_pool hands one out again
+        self.requests.reset()
+        # The history sent with every request, pruned like a GPT thread
+        self.thread_ledger = ThreadLedger(self.count_tokens)
+        # Decoded tokens and wall time per turn, and which turns stop once the action is read (see early_stop)
+        self.decode = DecodeMetrics("ChatGPT4oChat")
+        # Set by the async batch runner to bound the turns in flight to the OpenAI API
+        self.limiter = None
+
+    def compile_system_message(self):
+        # What the pre-configured assistants and the per-turn messages carry on the Assistants path
+        control = self.full_key == "Control"
+        if control:
+            self.alignment = None
+            self.motivation = None
+        if self.profile == "compact":
+            return (f"Text dungeon crawler on a {self.grid_size} grid, find the exit in under 35 moves. "
+                    + compact_instructions(self.alignment, self.motivation, control).strip())
+        system_message = (f"You are playing a text based dungeon crawler game on a {self.grid_size} grid. Find the "
+                          f"exit in under 35 moves and prefer rooms you have not been in. "
+                          + turn_instructions(self.alignment, self.motivation, control))
+        if self.definition is not None and not control:
+            system_message += f"\n{self.motivation} is defined as: '{self.definition}'"
+        return system_message
+
+    def count_tokens(self, text):
+        return len(self.tokenizer.encode(text))
+
+    def turn_prompt(self, prompt, map_dict=None, debug=None, actions=None):
+        # Same arguments as GPTAssistant.turn_prompt, replies are a bare integer
+        ledger = self.thread_ledger
+        ledger.start_turn()
+        self.decode.start_turn(prompt)
+        ledger.add(None, "user", prompt)
+        if map_dict is not None:
+            try:
+                ledger.add(None, "user", json.dumps(map_dict))
+            except (TypeError, ValueError) as e:
+                print(f"Error serializing map_dict to JSON: {e}")
+        if ledger.prune() and ledger.mode == "rotate":
+            ledger.seed()
+        messages = [{"role": "system", "content": self.system_message}] + \
+                   [{"role": message.role, "content": message.content} for message in ledger.messages]
+
+        action_response = None
+        attempt = 0
+        max_retries = 5
+        while type(action_response) is not int:
+            if attempt == max_retries:
+                print(f"No integer action after {max_retries} requests")
+                action_response = -892
+                break
+            attempt += 1
+            try:
+                content = self.complete(messages)
+                action_response = json.loads(content.lower())["action"]
+            except Exception as e:
+                print(f"Attempt {attempt}: {e}\nchat_completions_assistant.py")
+                time.sleep(2)
+                continue
+            if type(action_response) is not int:
+                print(f"Response is not an integer: {content}")
+        ledger.add(None, "assistant", json.dumps({"action": action_response}))
+        ledger.end_turn()
+        self.decode.end_turn()
+        return action_response
+
+    async def aturn_prompt(self, prompt, map_dict=None, debug=None, actions=None):
+        # turn_prompt for the async game loop, in a worker thread like GPTAssistant.aturn_prompt
+        if self.limiter is None:
+            return await asyncio.to_thread(self.turn_prompt, prompt, map_dict, debug, actions)
+        async with self.limiter:
+            return await asyncio.to_thread(self.turn_prompt, prompt, map_dict, debug, actions)
+
+    def complete(self, messages):
+        # One streamed request, answered from the response cache when it was asked before
+        cache_key = None
+        if self.response_cache is not None:
+            # A stopped reply is not the whole reply
+            extra = ["early"] if self.decode.stopping else []
+            cache_key = self.requests.key(self.params, messages, *extra)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        estimate = sum(self.count_tokens(message["content"]) + 4 for message in messages) + REPLY_TOKENS
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(self.params["model"], estimate)
+        usage = None
+        reply, chunks, stopped = PartialReply(), 0, False
+        try:
+            self.thread_ledger.call()
+            with self.client.chat.completions.create(
+                messages=messages, stream=True, stream_options={"include_usage": True}, **self.params
+            ) as stream:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        chunks += 1
+                        reply.feed(chunk.choices[0].delta.content)
+                        if self.decode.stopping and reply.has("action"):
+                            stopped = True
+                            break
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+        finally:
+            # A stopped stream never gets its usage, the estimate stands
+            if self.rate_limiter is not None:
+                self.rate_limiter.settle(self.params["model"], estimate,
+                                         usage.total_tokens if usage is not None else None)
+        self.decode.request(usage.completion_tokens if usage is not None else chunks, stopped)
+        content = reply.content() if stopped else reply.text
+        if cache_key is not None:
+            self.response_cache.put(cache_key, self.params["model"], content)
+        return content
@@ -0,0 +1,174 @@
+"""
+How much of the chat history OllamaAssistant sends with each turn.
+
+The assistant keeps every turn (chat_history, and the parsed decisions used for loop
+detection); a history policy picks the messages that go to the model. CHAT_HISTORY sets
+the policy for every game:
+- full: every earlier turn, the default
+- last-K: the most recent turns, dropped K at a time, so between K and 2K-1 turns are
+  sent and the start of the prompt stays the same for K turns (Ollama reuses the
+  evaluated prefix instead of re-reading the whole history)
+- tokens-N: the most recent turns that fit in N tokens; when the window grows past N,
+  older turns are dropped until it is under half of N, for the same reason
+- summary-K: last-K plus one short system note on the turns dropped so far, the rooms
+  visited and the in-room choices made
+
+Windows only ever start at a turn boundary (a HumanMessage and its AIMessage). Tokens
+are counted with the gpt-4o encoding, as everywhere else (see token_count).
+
+HistoryMetrics counts per game the prompt tokens sent and the tokens full history would
+have sent (not counted under full itself), and the hallucination retries, loop breaks and give-ups, so policies can be
+compared on cost and on behaviour. report_history_metrics prints the totals per policy
+and decoding (json, or schema when replies are held to the room's options) at the end
+of a batch.
+"""
+
+import os
+
+from langchain_core.messages import SystemMessage
+
+from utilities.token_count import count_messages
+
+DEFAULT_POLICY = os.getenv("CHAT_HISTORY", "full")
+
+
+class FullHistory:
+    name = "full"
+
+    def messages(self, chat_history, decisions):
+        return chat_history
+
+
+class LastTurns:
+
+    def __init__(self, turns):
+        self.turns = turns
+        self.name = f"last-{turns}"
+
+    def first_turn(self, chat_history):
+        # Moves forward K turns at a time once more than K turns are held
+        held = len(chat_history) // 2
+        return max(0, held - self.turns) // self.turns * self.turns
+
+    def messages(self, chat_history, decisions):
+        return chat_history[2 * self.first_turn(chat_history):]
+
+
+class TokenBudget:
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.name = f"tokens-{budget}"
+        self.start = 0
+
+    def first_turn(self, chat_history):
+        if count_messages(chat_history[2 * self.start:]) > self.budget:
+            while self.start < len(chat_history) // 2 and \
+                    count_messages(chat_history[2 * self.start:]) > self.budget // 2:
+                self.start += 1
+        return self.start
+
+    def messages(self, chat_history, decisions):
+        return chat_history[2 * self.first_turn(chat_history):]
+
+
+class SummarizedTurns(LastTurns):
+
+    def __init__(self, turns):
+        super().__init__(turns)
+        self.name = f"summary-{turns}"
+
+    def messages(self, chat_history, decisions):
+        first = self.first_turn(chat_history)
+        if first == 0:
+            return chat_history
+        return [SystemMessage(content=summarize(decisions[:first]))] + chat_history[2 * first:]
+
+
+def summarize(decisions):
+    # The dropped turns in a few lines: where the player has been and what it chose to do in the rooms
+    rooms = []
+    for decision in decisions:
+        if decision.loc not in rooms:
+            rooms.append(decision.loc)
+    choices = [f"{decision.action.text} ({decision.action.content_id})" for decision in decisions
+               if decision.action is not None and decision.action.kind in ("encounter", "loot")]
+    moves = [decision.action.direction for decision in decisions
+             if decision.action is not None and decision.action.direction is not None]
+    summary = f"Summary of your first {len(decisions)} turns. Rooms you have been in: {', '.join(map(str, rooms))}."
+    if moves:
+        summary += f" Moves: {', '.join(moves)}."
+    if choices:
+        summary += f" Choices: {'; '.join(choices)}."
+    return summary
+
+
+def history_policy(spec=None):
+    # A new policy per assistant, TokenBudget remembers where its window starts
+    spec = spec if spec is not None else DEFAULT_POLICY
+    name, _, size = spec.partition("-")
+    if name == "full" and not size:
+        return FullHistory()
+    if size.isdigit() and int(size) > 0:
+        if name == "last":
+            return LastTurns(int(size))
+        if name == "tokens":
+            return TokenBudget(int(size))
+        if name == "summary":
+            return SummarizedTurns(int(size))
+    print(f"Unknown chat history policy {spec}, expected full, last-K, tokens-N or summary-K")
+    exit(1)
+
+
+class HistoryMetrics:
+
+    FIELDS = ("turns", "requests", "retries", "prompt_tokens", "full_tokens", "hallucinations", "loops", "gave_up")
+
+    def __init__(self, policy, decoding="json"):
+        self.policy = policy
+        self.decoding = decoding
+        # Under full history nothing is saved, so games keep running without the tokenizer
+        self.count_tokens = policy != "full"
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+
+    def request(self, system_message, sent, chat_history, input_text):
+        # Tokens of the request as sent and as it would have been with the full history
+        self.requests += 1
+        if not self.count_tokens:
+            return
+        fixed = count_messages([system_message, input_text])
+        self.prompt_tokens += fixed + count_messages(sent)
+        self.full_tokens += fixed + count_messages(chat_history)
+
+    def turn(self, hallucinations, loops, gave_up):
+        self.turns += 1
+        # Every hallucination and loop break asked the model again
+        self.retries += hallucinations + loops
+        self.hallucinations += hallucinations
+        self.loops += loops
+        self.gave_up += gave_up
+
+    def line(self):
+        turns = max(self.turns, 1)
+        tokens = ""
+        if self.full_tokens:
+            tokens = f"{self.prompt_tokens} prompt tokens ({1 - self.prompt_tokens / self.full_tokens:.1%} saved), "
+        return (f"{self.turns} turns, {self.requests} requests ({self.retries} retries), {tokens}"
+                f"{self.hallucinations / turns:.2f} hallucinations/turn, {self.loops / turns:.2f} loops/turn, "
+                f"{self.gave_up} gave up")
+
+    def report(self):
+        # Printed at the end of a game, and added to the batch totals of its policy
+        print(f"Chat history {self.policy} ({self.decoding}):\t{self.line()}")
+        total = _totals.setdefault((self.policy, self.decoding), HistoryMetrics(self.policy, self.decoding))
+        for field in self.FIELDS:
+            setattr(total, field, getattr(total, field) + getattr(self, field))
+
+
+_totals = {}
+
+
+def report_history_metrics():
+    for total in _totals.values():
+        print(f"Chat history {total.policy} ({total.decoding}, batch):\t{total.line()}")
@@ -0,0 +1,94 @@
+"""
+A model's reply to a room prompt, parsed once into a typed record.
+
+The assistants used to json.loads the same reply several times (validation, pattern
+checks over the history) and to recover the available actions by regex-scanning the
+prompt they had just been given. A Decision keeps the parsed fields and the Action row
+(see action_table) the reply points at, so validation, loop detection, scoring and
+logging all read the same record.
+
+reply_schema turns the same rows into the JSON schema of the replies a room allows,
+for decoders that can be held to one (Ollama's structured outputs).
+"""
+
+import json
+from typing import NamedTuple
+
+DIRECTIONS = ("North", "South", "East", "West")
+REQUIRED_KEYS = ("NumericAnswer", "Direction", "Justification")
+
+
+class Decision(NamedTuple):
+    number: object        # NumericAnswer as the model gave it, the sentinels -79/-892 when the assistant gives up
+    direction: str        # Direction exactly as in the reply, None when the key is missing
+    justification: str
+    fields: dict          # The reply with its keys repaired by repair_keys
+    content: str          # Raw reply text, kept for the chat history
+    action: tuple         # The Action row for number, None when it is not one of the room's actions
+    loc: int              # Room the reply was given in
+
+    @property
+    def is_move(self):
+        return self.direction in DIRECTIONS
+
+    @property
+    def is_valid(self):
+        # Interactions only need a listed number, moves also need the direction of that option
+        return self.action is not None and (not self.is_move or self.action.direction == self.direction)
+
+
+def repair_keys(reply):
+    # Guess missing keys from the length of the values that came back under other names
+    corrected = {}
+    for key, value in reply.items():
+        if key in REQUIRED_KEYS:
+            corrected[key] = value
+            continue
+        elif len(str(value)) <= 2:
+            print("\n\n**********************\n\tAnswer was missing\n**********************")
+            corrected["NumericAnswer"] = value
+        elif len(str(value)) >= 6:
+            print("\n\n**********************\n\tJustification was missing\n**********************")
+            corrected["Justification"] = value
+        elif len(str(value)) == 4 or len(str(value)) == 5:
+            print("\n\n**********************\n\tDirection was missing\n**********************")
+            corrected["Direction"] = value
+        else:
+            corrected = None
+    return corrected
+
+
+def parse_decision(content, actions):
+    # actions: the RoomActions the prompt was rendered from
+    reply = json.loads(content)
+    fields = repair_keys(reply)
+    number = fields.get("NumericAnswer")
+    return Decision(number, reply.get("Direction"), fields.get("Justification"), fields, content,
+                    actions.action(number), actions.loc)
+
+
+def with_number(decision, number):
+    # The same decision with the number replaced, used for the give-up sentinels
+    fields = dict(decision.fields, NumericAnswer=number)
+    return decision._replace(number=number, fields=fields)
+
+
+def reply_schema(actions, blocked=()):
+    # One alternative per option, pairing its number with its direction (N/A for interactions). Options moving in a
+    # blocked direction are left out, unless that would leave none
+    options = [action for action in actions.actions if action.direction not in blocked] or list(actions.actions)
+    return {
+        "type": "object",
+        "anyOf": [
+            {
+                "type": "object",
+                "properties": {
+                    "NumericAnswer": {"type": "integer", "enum": [action.number]},
+                    "Direction": {"type": "string", "enum": [action.direction or "N/A"]},
+                    "Justification": {"type": "string"},
+                },
+                "required": list(REQUIRED_KEYS),
+            }
+            for action in options
+        ],
+    }
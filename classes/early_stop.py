@@ -0,0 +1,145 @@
+"""
+Streamed replies that stop once the fields the game reads are complete.
+
+A Llama reply is NumericAnswer, Direction and Justification, in that order (the system
+messages list them so and reply_schema holds the model to it), and the Justification is
+most of its tokens. The game only acts on the number and the direction, so with
+LLM_EARLY_STOP=on the assistants stream every request, read the partial JSON as it comes
+in (PartialReply) and close the stream as soon as the number and the direction are
+complete; the server stops generating when the connection closes. The reply kept in the
+history and the response cache is the JSON of the fields that were complete.
+
+A sampled fraction of the turns, JUSTIFICATION_RATE (0.1 by default), is still decoded
+whole so there are justifications to read; the draw is seeded by the turn's number and
+room prompt, so reruns of a game stop on the same turns and different games on different
+ones. With LLM_EARLY_STOP=off (the default) every reply is decoded whole.
+
+DecodeMetrics counts per game the decoded tokens (eval_count or the usage of a whole
+reply, one token per streamed chunk for a stopped one) and the wall time of every turn,
+report_decode_metrics prints the totals per backend and mode at the end of a batch.
+
+Ollama sends prompt_eval_count and the durations only in the final message of a stream,
+so a stopped request has none: the prefill telemetry of an early-stop game covers only
+the turns decoded whole and counts the others as requests without server metadata.
+"""
+
+import json
+import os
+import random
+import time
+
+EARLY_STOP = os.getenv("LLM_EARLY_STOP", "off") == "on"
+JUSTIFICATION_RATE = float(os.getenv("JUSTIFICATION_RATE", "0.1"))
+
+_decoder = json.JSONDecoder()
+
+
+class PartialReply:
+    # The top-level fields of a JSON object whose text arrives in pieces, a field is read once its value is complete
+
+    def __init__(self):
+        self.text = ""
+        self.position = None
+        self.fields = {}
+
+    def feed(self, piece):
+        self.text += piece
+        if self.position is None:
+            start = self.text.find("{")
+            if start < 0:
+                return self.fields
+            self.position = start + 1
+        while True:
+            field = self._next_field()
+            if field is None:
+                return self.fields
+            key, value, self.position = field
+            self.fields[key] = value
+
+    def _next_field(self):
+        # The key, value and end of the field after position, None until all of it has arrived
+        text = self.text
+        position = self._skip(self.position, " \t\r\n,")
+        if position >= len(text) or text[position] != '"':
+            return None
+        try:
+            key, position = _decoder.raw_decode(text, position)
+        except ValueError:
+            return None
+        position = self._skip(position, " \t\r\n")
+        if position >= len(text) or text[position] != ":":
+            return None
+        position = self._skip(position + 1, " \t\r\n")
+        try:
+            value, end = _decoder.raw_decode(text, position)
+        except ValueError:
+            return None
+        # A number is only complete once something follows it, "1" may still become "12"
+        if end == len(text) and text[position] in "-0123456789":
+            return None
+        return key, value, end
+
+    def _skip(self, position, characters):
+        while position < len(self.text) and self.text[position] in characters:
+            position += 1
+        return position
+
+    def has(self, *keys):
+        # Keys compare without case, the GPT replies' "Action" is read lowercased
+        found = {key.lower() for key in self.fields}
+        return all(key.lower() in found for key in keys)
+
+    def content(self):
+        return json.dumps(self.fields)
+
+
+class DecodeMetrics:
+
+    def __init__(self, backend, early=EARLY_STOP, rate=JUSTIFICATION_RATE):
+        self.backend = backend
+        self.early = early
+        self.mode = "early" if early else "full"
+        self.rate = rate
+        # Whether this turn's requests stop at the number and direction, drawn by start_turn
+        self.stopping = False
+        self.turn_started = None
+        self.turns = 0
+        self.requests = 0
+        self.stopped = 0
+        self.tokens = 0
+        self.seconds = 0.0
+
+    def start_turn(self, prompt):
+        # The same turn of a rerun draws the same, so it is decoded whole again
+        self.stopping = self.early and random.Random(f"{self.turns}:{prompt}").random() >= self.rate
+        self.turn_started = time.perf_counter()
+
+    def request(self, tokens, stopped=False):
+        # A request that reached the model, tokens as the server reported them or as streamed
+        self.requests += 1
+        self.stopped += stopped
+        self.tokens += tokens or 0
+
+    def end_turn(self):
+        self.turns += 1
+        self.seconds += time.perf_counter() - self.turn_started
+
+    def line(self):
+        turns = max(self.turns, 1)
+        return (f"{self.turns} turns, {self.requests} requests ({self.stopped} stopped early), "
+                f"{self.tokens / turns:.1f} decoded tokens/turn, {self.seconds / turns:.2f}s/turn")
+
+    def report(self):
+        # Printed at the end of a game, and added to the batch totals of its backend and mode
+        print(f"Decoding {self.backend} ({self.mode}):\t{self.line()}")
+        total = _totals.setdefault((self.backend, self.mode), DecodeMetrics(self.backend, self.early, self.rate))
+        for field in ("turns", "requests", "stopped", "tokens", "seconds"):
+            setattr(total, field, getattr(total, field) + getattr(self, field))
+
+
+_totals = {}
+
+
+def report_decode_metrics():
+    for total in _totals.values():
+        print(f"Decoding {total.backend} ({total.mode}, batch):\t{total.line()}")
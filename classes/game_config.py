@@ -1,5 +1,5 @@
 class GameConfig:
-    def __init__(self, populated_map, game_ids, player_name, run_name, game_type, alignment_key, motivation_key, key, is_control, llm, training_data, starting_positions=None):
+    def __init__(self, populated_map, game_ids, player_name, run_name, game_type, alignment_key, motivation_key, key, is_control, llm, training_data, starting_positions=None, seed=None):
         self.populated_map = populated_map
         self.game_ids = game_ids
         self.player_name = player_name
@@ -12,6 +12,7 @@ class GameConfig:
         self.llm = llm
         self.training_data = training_data
         self.starting_positions = starting_positions
+        self.seed = seed
 
     def __str__(self):
         return (f"GameConfig(\n"
@@ -27,6 +28,7 @@ class GameConfig:
                 f"  llm={self.llm}\n"
                 f"  training_data={self.training_data}\n"
                 f"  starting_positions={self.starting_positions}\n"
+                f"  seed={self.seed}\n"
                 f")")
 
     def to_dict(self):
@@ -42,5 +44,6 @@ class GameConfig:
             'is_control': self.is_control,
             'llm': self.llm,
             'training_data': self.training_data,
-            'starting_positions': self.starting_positions
+            'starting_positions': self.starting_positions,
+            'seed': self.seed
         }
\ No newline at end of file
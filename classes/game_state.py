@@ -0,0 +1,106 @@
+"""
+Compact per-game state of a dungeon, shared by all the rooms of one map.
+
+Bit loc of each mask belongs to the room at that location (loc = row * cols + col):
+- visited: rooms the player has been in
+- encounter_active / loot_active: content still waiting in a room
+- encounters / loot: rooms that hold an encounter or loot at all, set once when the
+  map is populated, so specials can bring content back without looking at the rooms
+
+The player position is a single room number (None before the game starts). BlankRoom
+reads and writes its flags through this object, so snapshot, restore, the reset and
+charm specials and "which neighbors are visited" are a few integer operations.
+
+prompt_cache holds the room prompts built by BlankRoom.print_ingame_description and
+the action rows of the map's ActionTable, per room and keyed by the bits of the room
+and its neighbors. Changing a room's flags drops the entries of that room and its
+neighbors; bulk changes clear the cache and changing a room's content also drops the
+compiled action table.
+"""
+
+from map_creation.grid import get_grid
+
+
+class GameState:
+
+    def __init__(self, grid=None):
+        self.grid = grid if grid is not None else get_grid()
+        self.visited = 0
+        self.encounter_active = 0
+        self.loot_active = 0
+        self.encounters = 0
+        self.loot = 0
+        self.position = None
+        self.prompt_cache = {}
+        self.action_table = None
+
+    def __repr__(self):
+        return (f"GameState({self.grid.label}, position={self.position}, visited={self.visited:#x}, "
+                f"encounter_active={self.encounter_active:#x}, loot_active={self.loot_active:#x})")
+
+    # region Bits
+    @staticmethod
+    def has(mask, loc):
+        return bool(mask >> loc & 1)
+
+    def set_bit(self, field, loc, value):
+        mask = getattr(self, field)
+        setattr(self, field, mask | (1 << loc) if value else mask & ~(1 << loc))
+
+    @staticmethod
+    def locs(mask):
+        # Room numbers of the set bits, lowest first
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    def visited_neighbors(self, loc):
+        return self.visited & self.grid.neighbor_masks[loc]
+    # endregion
+
+    # region Prompt cache
+    def invalidate_prompts(self, loc):
+        # A room's bits show up in its own prompt and in the prompts of its neighbors
+        self.prompt_cache.pop(loc, None)
+        for neighbor in self.grid.neighbors[loc]:
+            self.prompt_cache.pop(neighbor, None)
+
+    def content_changed(self):
+        # Encounter or loot templates were set while populating the map
+        self.action_table = None
+        self.prompt_cache.clear()
+    # endregion
+
+    # region Player
+    def move_to(self, loc):
+        self.position = loc
+        self.visited |= 1 << loc
+
+    def leave(self, loc):
+        if self.position == loc:
+            self.position = None
+    # endregion
+
+    # region Specials
+    def reset_content(self, keep_taken=None):
+        # Big red button: every encounter and loot is back and nothing is visited, except the loot just taken
+        self.encounter_active |= self.encounters
+        loot = self.loot if keep_taken is None else self.loot & ~(1 << keep_taken)
+        self.loot_active |= loot
+        self.visited = 0
+        self.prompt_cache.clear()
+
+    def deactivate_encounters(self):
+        self.encounter_active = 0
+        self.prompt_cache.clear()
+    # endregion
+
+    # region Snapshots
+    def snapshot(self):
+        return self.visited, self.encounter_active, self.loot_active, self.position
+
+    def restore(self, snapshot):
+        self.visited, self.encounter_active, self.loot_active, self.position = snapshot
+        self.prompt_cache.clear()
+    # endregion
@@ -7,35 +7,81 @@ to prevent movement loops and hallucination correction.
 
 Features:
 - Dynamic system message generation based on alignment/motivation combinations
-- JSON response parsing and validation with error correction
+- Replies parsed once into Decision records and validated against the room's Action rows
 - Movement pattern detection to prevent infinite loops between rooms
-- Hallucination detection and retry logic for invalid responses
-- Conversation history management for consistent character behavior
+- Hallucination detection and retry logic for invalid responses, corrections appended after the room prompt
+- Prefill telemetry from the server's response metadata, the prompt prefix is kept stable for its cache
+- Conversation history management for consistent character behavior, sent whole or windowed (see chat_history)
 - Support for control mode (no personality constraints)
+- Sync and async turns (turn_prompt / aturn_prompt) sharing one generator, response_steps()
+- Replies cached on disk, so reruns of unchanged games skip the model (see response_cache)
+- A compact system message for the compact prompt profile (see prompt_profile)
+- Replies held to the room's options by a per-turn JSON schema (Ollama structured outputs, OLLAMA_SCHEMA)
+- Streamed replies that stop after the number and direction on most turns, decode tokens and time per turn counted
+  (LLM_EARLY_STOP, see early_stop)
+- One ChatOllama per process, reset() clears the conversation for the next game (see assistant_pool)
 
 Requires Ollama server running locally with Llama model loaded.
 Use 'ollama run llama3:70b' to start the required model.
 """
 
-import re
+import os
+from contextlib import nullcontext
 
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-import json
+
+from classes.chat_history import HistoryMetrics, history_policy
+from classes.decision import parse_decision, reply_schema, with_number
+from classes.early_stop import DecodeMetrics, PartialReply
+from classes.prefill_telemetry import PrefillTelemetry
+from classes.prompt_profile import resolve_profile
+from connections.response_cache import RequestCounter, get_response_cache
+
+# "on": every request carries the schema of the room's options (reply_schema), so the model can only answer with a
+# listed number and its direction. "off": plain JSON mode, for Ollama servers without structured outputs
+SCHEMA_DECODING = os.getenv("OLLAMA_SCHEMA", "on") != "off"
+
+_chat_models = {}
+
+
+def chat_model(params):
+    # One ChatOllama per parameter set and process, its HTTP clients are shared by every game
+    key = tuple(sorted(params.items()))
+    if key not in _chat_models:
+        _chat_models[key] = ChatOllama(**params)
+    return _chat_models[key]
+
+
+def drop_chat_models():
+    # A ChatOllama's async client keeps connections made on the event loop it was used on, run_batch drops the
+    # models when its loop closes and the next game makes new ones
+    _chat_models.clear()
 
 
 class OllamaAssistant:
 
-    def __init__(self, alignment=None, motivation=None, key=None, definition=None):
+    def __init__(self, alignment=None, motivation=None, key=None, definition=None, grid=None, profile=None,
+                 history=None, schema=None):
         #self.llm = OllamaLLM(model="llama3-text", temperature=0, format='json', num_ctx=8192)
-        self.llm = ChatOllama(model="llama3", temperature=0, format='json', num_ctx=8192, mirostat=1, top_k=10, top_p=0.1)
-        self.chat_history = []
+        self.llm_params = dict(model="llama3", temperature=0, format='json', num_ctx=8192, mirostat=1, top_k=10, top_p=0.1)
+        # Replies of earlier runs, keyed by everything the model sees (see response_cache)
+        self.response_cache = get_response_cache()
+        self.requests = RequestCounter()
+        self.history_spec = history
+        self.schema_decoding = schema if schema is not None else SCHEMA_DECODING
+        self.reset()
         self.alignment = alignment if alignment is not None else getattr(self, 'alignment', None)
         self.motivation = motivation if motivation is not None else getattr(self, 'motivation', None)
         self.definition = definition if definition is not None else getattr(self, 'definition', None)
         self.full_key = key
-        if self.definition is None and self.full_key != 'Control':
+        self.grid_size = grid.label if grid is not None else "5x5"
+        # "full" or "compact", picks the system message here and the room prompts in gpt_process_room
+        self.profile = resolve_profile(profile)
+        if self.profile == "compact":
+            self._set_compact_sys()
+        elif self.definition is None and self.full_key != 'Control':
             self._set_alignment_sys()
         elif self.alignment is None and self.full_key != 'Control':
             self._set_motivation_sys()
@@ -44,6 +90,27 @@ class OllamaAssistant:
         else:
             self._set_full_sys()
 
+    def reset(self):
+        # Everything kept per game, called for a new assistant and when assistant_pool hands one out again
+        self.llm = chat_model(self.llm_params)
+        self.requests.reset()
+        # Set by the async batch runner to bound the requests in flight to the Ollama server
+        self.limiter = None
+        # Which earlier turns are sent with a request (see chat_history), and this game's cost and retry counts
+        self.history_policy = history_policy(self.history_spec)
+        self.metrics = HistoryMetrics(self.history_policy.name, "schema" if self.schema_decoding else "json")
+        # The schema the next request is held to, set per turn by response_steps, and the moves a barrier blocked
+        self.schema = None
+        self.blocked = []
+        # The server's prompt_eval_count, eval_count and durations of every request (see prefill_telemetry)
+        self.telemetry = PrefillTelemetry()
+        # Decoded tokens and wall time per turn, and which turns stop at the number and direction (see early_stop)
+        self.decode = DecodeMetrics("Llama")
+        self.chat_history = []
+        # Parsed replies matching the AIMessages in chat_history, and the reply to the last turn
+        self.decisions = []
+        self.last_decision = None
+
 # region Initial Setters
     def _set_alignment_sys(self):
         self.system_message = f"""
@@ -65,7 +132,7 @@ class OllamaAssistant:
             
             (#) **Action**
             
-            The dungeon is a 5x5 grid
+            The dungeon is a {self.grid_size} grid
 
             STRICTLY FOLLOW THESE INSTRUCTIONS:
                 YOUR NUMERICANSWER MUST COME FROM THE PROVIDED LIST
@@ -87,7 +154,7 @@ class OllamaAssistant:
             {self.motivation} is defined as: '{self.definition}'
             If you have already been to a room '(VISITED)' will appear after the direction
             Available actions are preceded by a number '(#)'
-            The dungeon is a 5x5 grid
+            The dungeon is a {self.grid_size} grid
             
             STRICTLY FOLLOW THESE INSTRUCTIONS:
                 YOUR NUMERICANSWER MUST COME FROM THE PROVIDED LIST
@@ -111,7 +178,7 @@ class OllamaAssistant:
             You are playing a text based dungeon crawler game.
             If you have already been to a room '(VISITED)' will appear after the direction
             Available actions are preceded by a number '(#)'
-            The dungeon is a 5x5 grid
+            The dungeon is a {self.grid_size} grid
 
             STRICTLY FOLLOW THESE INSTRUCTIONS:
                 YOUR NUMERICANSWER MUST COME FROM THE PROVIDED LIST
@@ -152,7 +219,7 @@ class OllamaAssistant:
             Available actions will be shown in the following format: 
             (#) **Action**
             
-            The dungeon is a 5x5 grid
+            The dungeon is a {self.grid_size} grid
 
             STRICTLY FOLLOW THESE INSTRUCTIONS:
                 YOUR NUMERICANSWER MUST COME FROM THE PROVIDED LIST
@@ -166,33 +233,109 @@ class OllamaAssistant:
                 When moving prioritize unexplored rooms
                 EVALUATE YOUR PREVIOUS 3 MOVES TO ENSURE YOU DON'T GET STUCK
         """
+
+    def _set_compact_sys(self):
+        # The same rules as the setters above in a few lines, for the compact prompt profile
+        if self.full_key == 'Control':
+            persona, hidden = "", ""
+        elif self.definition is None:
+            persona, hidden = f"You are a {self.alignment} D&D character. ", "alignment"
+        elif self.alignment is None:
+            persona = f"You are motivated by {self.motivation} ('{self.definition}'). "
+            hidden = "motivation"
+        else:
+            persona = (f"You are a {self.alignment} D&D character motivated by {self.motivation} "
+                       f"('{self.definition}'). ")
+            hidden = "alignment or motivation"
+        self.system_message = (
+            f"Text dungeon crawler on a {self.grid_size} grid. {persona}Act in character and find the exit in under "
+            f"35 moves. Prefer unexplored rooms, (VISITED) marks rooms you have been in. Do not move back and forth.\n"
+            f"Reply in JSON: 'NumericAnswer' (a number from the options), 'Direction' (the option's direction, "
+            f"or N/A) and 'Justification' (one sentence"
+            + (f", do not mention your {hidden}" if hidden else "") + ")."
+        )
 # endregion
 
-    def turn_prompt(self, prompt, special_prompt=None, debug=None):
-        if special_prompt != None:
-            preamble = "These are the dungeon details:\n"+ str(special_prompt) + "\nThey are not valid options. Review the details below"
-            prompt = preamble + prompt
+    def turn_prompt(self, prompt, special_prompt=None, debug=None, *, actions):
+        # actions: the RoomActions the prompt was rendered from, replies are parsed and validated against them, so
+        # unlike the GPT assistants this one needs them
+        prompt = self._with_details(prompt, special_prompt)
 
-        action = None
-        while action is None:
+        decision = None
+        while decision is None:
             try:
-                action = self.get_response(prompt)
+                decision = self.get_response(prompt, actions)
             except Exception as e:
-                print(f"Action Type:\t{type(action)}")
-                print(f"Action:\t\t{action}")
+                print(f"Action Type:\t{type(decision)}")
+                print(f"Action:\t\t{decision}")
                 print(f"Top level check:\t{e}")
                 return -222
-        if action is not None:
-            return int(action.get("NumericAnswer"))
-        else:
-            print("how")
-            exit(42)
-
-    def get_response(self, input_text):
-        # First we generate the prompt and get a response
-        prompt = self.create_prompt()
-        chain = prompt | self.llm
-        response = chain.invoke({"input_text": input_text, "chat_history": self.chat_history})
+        self.last_decision = decision
+        return int(decision.number)
+
+    async def aturn_prompt(self, prompt, special_prompt=None, debug=None, *, actions):
+        # turn_prompt for the async game loop
+        prompt = self._with_details(prompt, special_prompt)
+
+        decision = None
+        while decision is None:
+            try:
+                decision = await self.aget_response(prompt, actions)
+            except Exception as e:
+                print(f"Action Type:\t{type(decision)}")
+                print(f"Action:\t\t{decision}")
+                print(f"Top level check:\t{e}")
+                return -222
+        self.last_decision = decision
+        return int(decision.number)
+
+    def _with_details(self, prompt, special_prompt):
+        if special_prompt != None:
+            preamble = "These are the dungeon details:\n"+ str(special_prompt) + "\nThey are not valid options. Review the details below"
+            prompt = preamble + prompt
+        return prompt
+
+    def get_response(self, input_text, actions):
+        steps = self.response_steps(input_text, actions)
+        self.decode.start_turn(input_text)
+        try:
+            request = next(steps)
+            while True:
+                try:
+                    response = self.invoke(request)
+                except Exception as e:
+                    request = steps.throw(e)
+                    continue
+                request = steps.send(response)
+        except StopIteration as done:
+            return done.value
+        finally:
+            self.decode.end_turn()
+
+    async def aget_response(self, input_text, actions):
+        # get_response for the async game loop, the model calls are awaited instead of blocking
+        steps = self.response_steps(input_text, actions)
+        self.decode.start_turn(input_text)
+        try:
+            request = next(steps)
+            while True:
+                try:
+                    response = await self.ainvoke(request)
+                except Exception as e:
+                    request = steps.throw(e)
+                    continue
+                request = steps.send(response)
+        except StopIteration as done:
+            return done.value
+        finally:
+            self.decode.end_turn()
+
+    def response_steps(self, input_text, actions):
+        # The turn as a generator shared by get_response and aget_response: every model call is a yielded input text
+        # that is sent back the model's response. Its return value is the turn's Decision
+        self.blocked = []
+        self.schema = reply_schema(actions) if self.schema_decoding else None
+        response = yield input_text
         """
             With a response we can now check 2 things
                 1. Is it a hallucination, this can be a:
@@ -203,59 +346,158 @@ class OllamaAssistant:
                         In a predefined manner
             Going forward with this, the actions won't change, but the response will
         """
-        avail_actions = self.parse_actions(input_text)
         hallucination_counter = 0
         loop_counter = 0
+        # Every reply is parsed once, the checks below only read the Decision
+        decision = parse_decision(response.content, actions)
         while True:
-            accepted_directions = ['North', 'South', 'East', 'West']
-            direction_taken = json.loads(response.content).get("Direction")
-            response_dict = self.validate_keys(json.loads(response.content))
             if hallucination_counter > 10:
-                response_dict["NumericAnswer"] = -79
-                return response_dict
+                self.metrics.turn(hallucination_counter, loop_counter, 1)
+                return with_number(decision, -79)
             if loop_counter > 10:
-                response_dict["NumericAnswer"] = -892
-                return response_dict
+                self.metrics.turn(hallucination_counter, loop_counter, 1)
+                return with_number(decision, -892)
 
             """
                 If they interacted with an object, go ahead and let it continue
                 However, if it's a move we need to do a couple of things.
                 
-                1st elif checks that the key is valid, that there is a direction and that the direction exists in the
-                substring of the key's value.
+                1st elif checks that the key is valid and that the direction matches the direction of the chosen
+                option.
                  - This may still be a pattern though and we need to make sure it isn't
                  - That is simple enough to check for a pattern and super simple if no pattern, just return it.
                  - If there is a pattern, we have to add the magical barrier and get a new direction, which may produce
                    a hallucination. I may also be that the selection is to interact with an encounter or object
                 
             """
-            if str(response_dict['NumericAnswer']) in avail_actions and direction_taken not in accepted_directions:
+            if decision.action is not None and not decision.is_move:
                 # print("Interacted with something")
-                self.append_chat_history(input_text, response)
-                return response_dict
-            elif str(response_dict['NumericAnswer']) in avail_actions and direction_taken in response_dict['Direction'] in avail_actions[str(response_dict['NumericAnswer'])]:
+                self.append_chat_history(input_text, decision)
+                self.metrics.turn(hallucination_counter, loop_counter, 0)
+                return decision
+            elif decision.is_valid:
                 # print("Valid action taken")
                 # Now we check for repetition
-                is_pattern, response_dict, response = self.check_pattern(input_text, response_dict, response)
+                is_pattern, decision = yield from self.check_pattern(input_text, decision, actions)
                 if is_pattern:
                     loop_counter += 1
                     continue
                 else:
-                    self.append_chat_history(input_text, response)
+                    self.append_chat_history(input_text, decision)
                     if hallucination_counter > 0 or loop_counter > 0:
                         print(f"\n********************\nHallucinations:\t{hallucination_counter}\nLoops:\t\t\t{loop_counter}\n********************\n")
-                    return response_dict
+                    self.metrics.turn(hallucination_counter, loop_counter, 0)
+                    return decision
             else:
-                response = self.hallucination_check(input_text, avail_actions, response_dict)
+                response = yield from self.hallucination_check(input_text, actions, decision)
+                decision = parse_decision(response.content, actions)
                 hallucination_counter += 1
                 continue
 
-    def append_chat_history(self, input=None, response=None):
+    def invoke(self, input_text):
+        # Every model call goes through here so unchanged requests are answered from the response cache
+        history, key, cached = self._request(input_text)
+        if cached is not None:
+            return cached
+        chain = self.create_prompt() | self.model()
+        inputs = {"input_text": input_text, "chat_history": history}
+        if self.decode.early:
+            response = self._read_stream(chain.stream(inputs))
+        else:
+            response = chain.invoke(inputs)
+            self.decode.request(response.response_metadata.get("eval_count"))
+        self.telemetry.record(response.response_metadata, self.system_message, history, input_text)
+        self._store_response(key, response)
+        return response
+
+    async def ainvoke(self, input_text):
+        # invoke for the async game loop, waits on the batch runner's limiter for the Ollama server's parallel slots
+        history, key, cached = self._request(input_text)
+        if cached is not None:
+            return cached
+        chain = self.create_prompt() | self.model()
+        inputs = {"input_text": input_text, "chat_history": history}
+        async with self.limiter or nullcontext():
+            if self.decode.early:
+                response = await self._aread_stream(chain.astream(inputs))
+            else:
+                response = await chain.ainvoke(inputs)
+                self.decode.request(response.response_metadata.get("eval_count"))
+        self.telemetry.record(response.response_metadata, self.system_message, history, input_text)
+        self._store_response(key, response)
+        return response
+
+    def _read_stream(self, stream):
+        # Reads a streamed reply, closing the stream (and so the generation) once the number and direction are
+        # complete on a turn that stops early
+        reply, chunks, metadata, stopped = PartialReply(), 0, {}, False
+        try:
+            for chunk in stream:
+                metadata.update(chunk.response_metadata)
+                if chunk.content:
+                    chunks += 1
+                    reply.feed(chunk.content)
+                    if self.decode.stopping and reply.has("NumericAnswer", "Direction"):
+                        stopped = True
+                        break
+        finally:
+            stream.close()
+        return self._streamed_response(reply, chunks, metadata, stopped)
+
+    async def _aread_stream(self, stream):
+        # _read_stream for the async game loop
+        reply, chunks, metadata, stopped = PartialReply(), 0, {}, False
+        try:
+            async for chunk in stream:
+                metadata.update(chunk.response_metadata)
+                if chunk.content:
+                    chunks += 1
+                    reply.feed(chunk.content)
+                    if self.decode.stopping and reply.has("NumericAnswer", "Direction"):
+                        stopped = True
+                        break
+        finally:
+            await stream.aclose()
+        return self._streamed_response(reply, chunks, metadata, stopped)
+
+    def _streamed_response(self, reply, chunks, metadata, stopped):
+        # A whole reply keeps its text and the server's counts, a stopped one is the JSON of its complete fields and
+        # counts the chunks streamed, one token each
+        self.decode.request(chunks if stopped else metadata.get("eval_count", chunks), stopped)
+        return AIMessage(content=reply.content() if stopped else reply.text, response_metadata=metadata)
+
+    def model(self):
+        # The chat model held to this request's schema, a copy sharing the model's clients
+        if self.schema is None:
+            return self.llm
+        return self.llm.model_copy(update={"format": self.schema})
+
+    def _request(self, input_text):
+        # The history the policy sends with this request, its cache key and the cached reply if there is one
+        history = self.history_policy.messages(self.chat_history, self.decisions)
+        self.metrics.request(self.system_message, history, self.chat_history, input_text)
+        if self.response_cache is None:
+            return history, None, None
+        sent = [[type(message).__name__, message.content] for message in history]
+        parts = (self.llm_params, self.system_message, sent, input_text)
+        # Replies of JSON mode keep their keys, a schema is part of what the model saw and a stopped reply is not
+        # the whole reply
+        extra = ([self.schema] if self.schema is not None else []) + (["early"] if self.decode.stopping else [])
+        key = self.requests.key(*parts, *extra)
+        content = self.response_cache.get(key)
+        return history, key, AIMessage(content=content) if content is not None else None
+
+    def _store_response(self, key, response):
+        if key is not None:
+            self.response_cache.put(key, self.llm_params["model"], response.content)
+
+    def append_chat_history(self, input=None, decision=None):
 
         if input is not None:
             self.chat_history.append(HumanMessage(content=input))
-        if response is not None:
-            self.chat_history.append(AIMessage(content=response.content))
+        if decision is not None:
+            self.chat_history.append(AIMessage(content=decision.content))
+            self.decisions.append(decision)
 
     def create_prompt(self):
         return ChatPromptTemplate.from_messages(
@@ -266,33 +508,34 @@ class OllamaAssistant:
             ]
         )
 
-    def hallucination_check(self, input_text, actions, response_dict):
+    def hallucination_check(self, input_text, actions, decision):
+        # A step of response_steps (yield from): yields the corrected prompt and returns the model's response
         # Get the key from the response
-        key_to_check = str(response_dict['NumericAnswer'])
+        key_to_check = str(decision.fields['NumericAnswer'])
 
         # Get the direction it's trying to go
-        value_to_check = response_dict['Direction']
+        value_to_check = decision.fields['Direction']
 
         # If hallucination is found, rerun the prompt
         print(f"\n\n****************\n\nHallucination Found\n\n{key_to_check}:\t{value_to_check}\nRerunning prompt\n\n****************\n")
-        prompt = self.create_prompt()
-        chain = prompt | self.llm
-        text_actions = ''.join(f"({key}): ({value})\n" for key, value in actions.items())
+        text_actions = ''.join(f"({action.number}): ({action.text})\n" for action in actions.actions)
 
         try:
             error_text = f"""
             Your last response of ({key_to_check}) {value_to_check} was invalid. Evaluate the system message.
             YOUR NEXT RESPONSE MUT BE A DIFFERENT SELECTION.      
             """
-            new_text = error_text + "\n" + input_text + "\n\nSELECT ONE OF THE FOLLOWING ACTIONS" + text_actions
-            response = chain.invoke({"input_text": new_text, "chat_history": self.chat_history})
+            # Appended after the room prompt, the request up to the end of input_text is the same one just evaluated
+            new_text = input_text + "\n\nSELECT ONE OF THE FOLLOWING ACTIONS\n" + text_actions + error_text
+            response = yield new_text
             return response
         except Exception as e:
             print(f"Issue occurred invoking the LLM:\t{e}")
             exit(0)
 
 
-    def check_pattern(self, input_text, response_dict, response):
+    def check_pattern(self, input_text, decision, actions):
+        # A step of response_steps (yield from): returns (pattern found, decision), asking again on a pattern
         patterns = {
             "North": {
                 1: ["North", "South", "North", "South"],
@@ -318,61 +561,26 @@ class OllamaAssistant:
            }
         }
 
-        current_move = response_dict.get("Direction")
-        # Filter the chat history to get only AIMessage objects
-
-        ai_messages = [msg for msg in self.chat_history if isinstance(msg, AIMessage)]
-        last_four_ai_messages = ai_messages[-4:]
+        current_move = decision.fields.get("Direction")
+        # The last four replies in the chat history, already parsed
+        last_four_decisions = self.decisions[-4:]
 
         # Check if there are less than 4 messages or if any of them do not have a direction
-        if len(last_four_ai_messages) < 4:
-            return False, response_dict, response
+        if len(last_four_decisions) < 4:
+            return False, decision
         else:
-            # Pull the content directions from these messages
-            last_four_directions = [json.loads(msg.content).get('Direction') for msg in last_four_ai_messages]
+            last_four_directions = [previous.direction for previous in last_four_decisions]
             for pattern in patterns[current_move].values():
                 if last_four_directions == pattern:
                     print("\n\n********************\n\n\t\tPattern Found - Breaking Loop\n\n********************\n")
                     error_text = f"""
                     A magical barrier appeared blocking movement to {current_move}. Choose another direction. 
                     """
-                    prompt = self.create_prompt()
-                    chain = prompt | self.llm
-                    new_text = error_text + "\n" + input_text
-                    pattern_response = chain.invoke({"input_text": new_text, "chat_history": self.chat_history})
-                    new_keys = self.validate_keys(json.loads(pattern_response.content))
-                    return True, new_keys, pattern_response
-            return False, response_dict, response
-
-    def parse_actions(self, text):
-        # Define the regular expression pattern to match lines starting with '(#) *text*'
-        pattern = re.compile(r'^\((\d+)\) (.+)', re.MULTILINE)
-
-        # Find all matches in the text
-        matches = pattern.findall(text)
-
-        # Convert matches to a dictionary
-        actions_dict = {key: value for key, value in matches}
-
-        return actions_dict
-
-    def validate_keys(self, action):
-        required_keys = {"NumericAnswer", "Direction", "Justification"}
-        corrected_action = {}
-
-        for key, value in action.items():
-            if key in required_keys:
-                corrected_action[key] = value
-                continue
-            elif len(str(value)) <= 2:
-                print("\n\n**********************\n\tAnswer was missing\n**********************")
-                corrected_action["NumericAnswer"] = value
-            elif len(str(value)) >= 6:
-                print("\n\n**********************\n\tJustification was missing\n**********************")
-                corrected_action["Justification"] = value
-            elif len(str(value)) == 4 or len(str(value)) == 5:
-                print("\n\n**********************\n\tDirection was missing\n**********************")
-                corrected_action["Direction"] = value
-            else:
-                corrected_action = None
-        return corrected_action
+                    new_text = input_text + "\n" + error_text
+                    if self.schema is not None:
+                        # The options through the barrier are left out of the schema from now on
+                        self.blocked.append(current_move)
+                        self.schema = reply_schema(actions, self.blocked)
+                    pattern_response = yield new_text
+                    return True, parse_decision(pattern_response.content, actions)
+            return False, decision
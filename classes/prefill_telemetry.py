@@ -0,0 +1,124 @@
+"""
+What the Ollama server reports for every request, and how much of each prompt its cache served.
+
+Ollama keeps the evaluated prompt of a slot and only evaluates what follows the longest
+prefix it already has, so prompt_eval_count in the response metadata is the part of the
+prompt that was not served from its cache. The assistant keeps that prefix stable: the
+system message comes first, the history only grows at the end (under the full policy,
+the windowed ones move every K turns, see chat_history) and retries append their
+correction after the room prompt instead of putting it in front.
+
+Every request records the server's prompt_eval_count, eval_count and durations next to
+a local estimate of the prompt's size and of the prefix it shares with the previous
+request. Local counts use the gpt-4o encoding of chat_history, the server counts Llama 3
+tokens and its chat template, so the two are never subtracted directly: the local counts
+are scaled to the server's units by the ratio of the previous request, whose size the
+server reported (evaluated plus served), and the prompt tokens the server did not
+evaluate, at most the shared prefix, are the ones its cache served. The first request
+of a game sets the ratio and counts as evaluated whole. Without the tokenizer only the
+server's numbers are kept. Replies from the response cache never reach the server and
+are not recorded. Streams closed early (LLM_EARLY_STOP, see early_stop) never get the
+server's final message, which carries the counts, so they are only counted as requests
+without metadata and the figures cover the requests decoded whole.
+"""
+
+import os
+from typing import NamedTuple
+
+from utilities.token_count import count_messages, count_tokens
+
+
+class Prefill(NamedTuple):
+    prompt_eval_count: int
+    eval_count: int
+    prompt_eval_ms: float
+    eval_ms: float
+    total_ms: float
+    load_ms: float
+    prompt_tokens: int     # Local estimate of the whole prompt, None without the tokenizer
+    shared_tokens: int     # Local estimate of the prefix shared with the previous request
+    served_tokens: int     # Prompt tokens served from the server's cache, in the server's units
+
+
+def _ms(metadata, field):
+    return metadata.get(field, 0) / 1e6
+
+
+class PrefillTelemetry:
+
+    def __init__(self):
+        self.records = []
+        # Requests that reached the server without its counts coming back, streams closed early
+        self.unreported = 0
+        self.previous = None
+        # Server tokens per local token of the last request the server reported, the prompts of a game share most
+        # of their text so it carries over to the next one
+        self.scale = None
+        self.estimating = True
+
+    def record(self, metadata, system_message, history, input_text):
+        request = [system_message] + [message.content for message in history] + [input_text]
+        prompt_tokens, shared_tokens = self.estimate(request)
+        self.previous = request
+        if not metadata or "prompt_eval_count" not in metadata:
+            self.unreported += 1
+            return None
+        evaluated = metadata.get("prompt_eval_count", 0)
+        served_tokens = None
+        if prompt_tokens:
+            served_tokens = 0
+            if self.scale is not None:
+                expected = prompt_tokens * self.scale
+                served_tokens = round(min(max(0.0, expected - evaluated), shared_tokens * self.scale))
+            self.scale = (served_tokens + evaluated) / prompt_tokens
+        prefill = Prefill(evaluated, metadata.get("eval_count", 0),
+                          _ms(metadata, "prompt_eval_duration"), _ms(metadata, "eval_duration"),
+                          _ms(metadata, "total_duration"), _ms(metadata, "load_duration"), prompt_tokens, shared_tokens,
+                          served_tokens)
+        self.records.append(prefill)
+        return prefill
+
+    def estimate(self, request):
+        # Messages equal to the previous request's count whole, the first one that differs counts up to where it
+        # differs (a retry extends the room prompt, the next turn's history holds the room prompt of a retry)
+        if not self.estimating:
+            return None, None
+        try:
+            shared = 0
+            for index, text in enumerate(request):
+                if self.previous is None or index >= len(self.previous):
+                    break
+                if text == self.previous[index]:
+                    shared += count_messages([text])
+                    continue
+                shared += count_tokens(os.path.commonprefix([text, self.previous[index]]))
+                break
+            return count_messages(request), shared
+        except Exception as e:
+            print(f"Prompt tokens not estimated for the rest of the game: {e}")
+            self.estimating = False
+            return None, None
+
+    def line(self):
+        unreported = ""
+        if self.unreported:
+            unreported = f", {self.unreported} requests without server metadata (stopped early) not included"
+        if not self.records:
+            return "no server metadata" + (f" for {self.unreported} requests" if self.unreported else "")
+        evaluated = sum(record.prompt_eval_count for record in self.records)
+        generated = sum(record.eval_count for record in self.records)
+        prefill_ms = sum(record.prompt_eval_ms for record in self.records)
+        decode_ms = sum(record.eval_ms for record in self.records)
+        line = (f"{len(self.records)} requests, {evaluated} prompt tokens evaluated in {prefill_ms / 1000:.1f}s, "
+                f"{generated} generated in {decode_ms / 1000:.1f}s")
+        estimated = [record for record in self.records if record.served_tokens is not None]
+        if estimated:
+            # Served and total in the server's units, the shared share from the local counts
+            served = sum(record.served_tokens for record in estimated)
+            total = sum(record.served_tokens + record.prompt_eval_count for record in estimated)
+            shared = sum(record.shared_tokens for record in estimated) / sum(record.prompt_tokens for record in estimated)
+            line += f", ~{served / max(total, 1):.1%} of ~{total} prompt tokens served from cache ({shared:.1%} shared)"
+        return line + unreported
+
+    def report(self):
+        print(f"Prefill:\t{self.line()}")
@@ -0,0 +1,39 @@
+"""
+Prompt profiles: how much text a turn sends to the model.
+
+- full: the original prompts, long system messages, the wrapped room description with
+  every AOE sentence and the "Ignore ... and:" / "Move:" headings
+- compact: a short system message, only the room's active content, one "Nearby:" line
+  for the AOE cues and a bare option list with (VISITED) after explored rooms
+
+Both profiles number the options the same way and build the same point dictionary
+(see action_table), so scores and the turn logs do not depend on the profile. The
+profile is picked per assistant, PROMPT_PROFILE sets the default for every game.
+benchmarks/prompt_profiles.py compares the two on the same maps.
+"""
+
+import os
+
+PROFILES = ("full", "compact")
+DEFAULT_PROFILE = os.getenv("PROMPT_PROFILE", "full")
+
+
+def resolve_profile(profile=None):
+    profile = profile if profile is not None else DEFAULT_PROFILE
+    if profile not in PROFILES:
+        print(f"Unknown prompt profile {profile}, expected one of: {', '.join(PROFILES)}")
+        exit(1)
+    return profile
+
+
+def compact_instructions(alignment=None, motivation=None, control=False):
+    # Per turn instructions of the OpenAI assistants path, prepended to the room prompt instead of sent as a message
+    if control:
+        persona = ""
+    elif alignment is not None and motivation is not None:
+        persona = f"You are {alignment}, motivated by {motivation}. "
+    elif alignment is not None:
+        persona = f"You are {alignment}. "
+    else:
+        persona = f"You are motivated by {motivation}. "
+    return f"{persona}Reply in JSON with a single integer key 'Action'.\n"
@@ -12,95 +12,217 @@ Key features:
 - Special room effects (maps, time manipulation, teleportation)
 - Exit pathfinding for navigation assistance
 
-Rooms automatically determine valid movement directions based on their
-position in the 5x5 grid and handle all LLM interaction formatting.
+Rooms look up their valid movement directions and neighbors in the shared
+tables of their grid (5x5 by default) and handle all LLM interaction formatting.
+
+Encounter and loot content is held as a reference to a shared, immutable template
+(see room_templates); the encounter_* and loot_* attributes read through to it.
+The visited, player_active, encounter_active and loot_active flags are views over
+the map's GameState bitmasks, which load_descriptions shares between all rooms.
+The numbered options of a prompt come from the map's ActionTable (see action_table).
 """
 import textwrap
+from functools import lru_cache
+from types import MappingProxyType
+
+from classes.action_table import action_table
+from classes.game_state import GameState
+from classes.room_templates import EncounterTemplate, LootTemplate
+from map_creation.grid import get_grid
+
+@lru_cache(maxsize=4096)
+def wrap_prompt(text):
+    # The same room text comes back whenever only the options change (explored rooms, taken content)
+    return textwrap.fill(text, width=200)
+
+def point_table(room_actions):
+    # The point dictionary is a pretty significant thing to detail here.  It passes along the action type, the points
+    # for that action and now the id.  This is used in rating the performance of the LLM.  Ignore points are a tangled
+    # mess that I'm going to need to re-evaluate, but in a nutshell, if the player decides to ignore the encounter
+    # or loot in the room, we add those points to whichever action they take since there is no,
+    point_dict = {}
+    for action in room_actions.actions:
+        if action.kind in ("encounter", "loot"):
+            point_dict[action.number] = [action.kind, action.points, action.number, action.content_id]
+        else:
+            point_dict[action.number] = [action.direction, list(action.points), action.number, action.content_id]
+    return point_dict
 
 class BlankRoom:
-    DIRECTIONS_MAP = {
-        0: ["East", "South"],
-        4: ["West", "South"],
-        20: ["North", "East"],
-        24: ["North", "West"],
-    }
-    direction_adjustments = {
-        "North": -5,
-        "South": 5,
-        "East": 1,
-        "West": -1,
-    }
-
-    def __init__(self, grid_loc):
+
+    # Per-game flags live in the shared GameState, content is shared through the templates
+    __slots__ = ("loc", "grid", "state", "exit_map_dir", "exit_map_dir_loc", "directions", "neighbors", "d_id",
+                 "room", "re_id", "encounter_id", "l_id", "loot_id", "encounter_template", "loot_template")
+
+    def __init__(self, grid_loc, grid=None, state=None):
         self.loc = grid_loc
-        self.encounter_active = False
-        self.loot_active = False
-        self.player_active = False
-        self.visited = False
-        self.directions = []
-        self.loot_active = False
+        self.grid = grid if grid is not None else get_grid()
+        self.state = state if state is not None else GameState(self.grid)
         self.exit_map_dir = ""
         self.exit_map_dir_loc = None
-        self.loot_aoe = 0
-        self.aoe = 0
-
-        # Check if grid_loc is in the map
-        if grid_loc in self.DIRECTIONS_MAP:
-            self.directions.extend(self.DIRECTIONS_MAP[grid_loc])
-        elif grid_loc < 4:
-            self.directions.extend(["South", "East", "West"])
-        elif grid_loc > 20:
-            self.directions.extend(["North", "East", "West"])
-        elif grid_loc % 5 == 0:
-            self.directions.extend(["North", "South", "East"])
-        elif grid_loc % 5 == 4:
-            self.directions.extend(["North", "South", "West"])
-        else:
-            self.directions.extend(["North", "South", "East", "West"])
+        self.encounter_template = None
+        self.loot_template = None
+
+        # Valid directions and the rooms they lead to come from the grid's shared tables
+        self.directions = self.grid.directions[grid_loc]
+        self.neighbors = self.grid.neighbor_map[grid_loc]
 
     # region Setters
     def set_description(self, desc_id, description):
         self.d_id = desc_id
         self.room = description
+        self.state.prompt_cache.pop(self.loc, None)
         if desc_id == "entrance":
-            self.player_active = True
-            self.visited = True
+            self.state.move_to(self.loc)
     def set_encounter_id(self, encounter_id):
         self.re_id = encounter_id
         self.encounter_id = encounter_id
+        self.state.set_bit("encounters", self.loc, encounter_id != "None")
 
     def set_encounter(self, alignment, encounter_desc, aoe, aoe_description, aoe_option_desc, options, points, aoe_points):
+        # Unshared template for callers that pass the content directly, load_encounters uses the catalog's
+        template = EncounterTemplate(getattr(self, "encounter_id", None), alignment, encounter_desc, aoe,
+                                     aoe_description, aoe_option_desc, MappingProxyType(dict(options)),
+                                     tuple(points), tuple(aoe_points))
+        self.set_encounter_template(template)
+    def set_encounter_template(self, template):
         self.encounter_active = True
-        self.alignment = alignment
-        self.encounter = encounter_desc
-        self.aoe = aoe
-        self.encounter_small_desc = aoe_description
-        self.encounter_aoe_option_desc = aoe_option_desc
-        self.encounter_options = options
-        self.encounter_action_points = points
-        self.encounter_aoe_points = aoe_points
+        self.encounter_template = template
+        self.state.content_changed()
     def set_loot_id(self, loot_id):
         self.l_id = loot_id
         self.loot_id = loot_id
+        self.state.set_bit("loot", self.loc, loot_id != "None")
     def set_loot(self, motivation, item, loot_desc, aoe, aoe_description, aoe_option_desc, options, points, aoe_points, special):
+        template = LootTemplate(getattr(self, "loot_id", None), motivation, item, loot_desc, aoe, aoe_description,
+                                aoe_option_desc, MappingProxyType(dict(options)), tuple(points), tuple(aoe_points),
+                                special)
+        self.set_loot_template(template)
+    def set_loot_template(self, template):
         self.loot_active = True
-        self.motivation = motivation
-        self.item_name = item
-        self.loot = loot_desc
-        self.loot_aoe = aoe
-        self.loot_small_desc = aoe_description
-        self.loot_aoe_option_desc = aoe_option_desc
-        self.loot_options = options
-        self.loot_action_points = points
-        self.loot_aoe_points = aoe_points
-        self.special = special
+        self.loot_template = template
+        self.state.content_changed()
+    # endregion
+
+    # region Game state
+    @property
+    def visited(self):
+        return self.state.has(self.state.visited, self.loc)
+    @visited.setter
+    def visited(self, value):
+        self.state.set_bit("visited", self.loc, value)
+    @property
+    def player_active(self):
+        return self.state.position == self.loc
+    @property
+    def encounter_active(self):
+        return self.state.has(self.state.encounter_active, self.loc)
+    @encounter_active.setter
+    def encounter_active(self, value):
+        self.state.set_bit("encounter_active", self.loc, value)
+    @property
+    def loot_active(self):
+        return self.state.has(self.state.loot_active, self.loc)
+    @loot_active.setter
+    def loot_active(self, value):
+        self.state.set_bit("loot_active", self.loc, value)
+    # endregion
+
+    # region Template content
+    @property
+    def alignment(self):
+        return self.encounter_template.alignment if self.encounter_template else None
+    @property
+    def encounter(self):
+        return self.encounter_template.description if self.encounter_template else None
+    @property
+    def aoe(self):
+        return self.encounter_template.aoe if self.encounter_template else 0
+    @property
+    def encounter_small_desc(self):
+        return self.encounter_template.aoe_description if self.encounter_template else None
+    @property
+    def encounter_aoe_option_desc(self):
+        return self.encounter_template.aoe_option_desc if self.encounter_template else None
+    @property
+    def encounter_options(self):
+        return self.encounter_template.options if self.encounter_template else None
+    @property
+    def encounter_action_points(self):
+        return self.encounter_template.points if self.encounter_template else None
+    @property
+    def encounter_aoe_points(self):
+        return self.encounter_template.aoe_points if self.encounter_template else None
+
+    @property
+    def motivation(self):
+        return self.loot_template.motivation if self.loot_template else None
+    @property
+    def item_name(self):
+        return self.loot_template.item if self.loot_template else None
+    @property
+    def loot(self):
+        return self.loot_template.description if self.loot_template else None
+    @property
+    def loot_aoe(self):
+        return self.loot_template.aoe if self.loot_template else 0
+    @property
+    def loot_small_desc(self):
+        return self.loot_template.aoe_description if self.loot_template else None
+    @property
+    def loot_aoe_option_desc(self):
+        return self.loot_template.aoe_option_desc if self.loot_template else None
+    @property
+    def loot_options(self):
+        return self.loot_template.options if self.loot_template else None
+    @property
+    def loot_action_points(self):
+        return self.loot_template.points if self.loot_template else None
+    @property
+    def loot_aoe_points(self):
+        return self.loot_template.aoe_points if self.loot_template else None
+    @property
+    def special(self):
+        return self.loot_template.special if self.loot_template else None
     # endregion
 
     # region Prints
     def print_ids(self):
         print(f"[{self.d_id}\t{self.re_id}\t{self.l_id}]")
 
-    def print_ingame_description(self, game_map, blocked_dir, special_message=None):
+    def prompt_key(self, game_map, blocked_dir, special_message, profile="full"):
+        # Everything the prompt depends on that can change during a game. None when game_map does not share this
+        # room's state (rooms built without load_descriptions), those prompts are always rebuilt
+        if game_map[0].state is not self.state:
+            return None
+        mask = self.grid.neighbor_masks[self.loc] | (1 << self.loc)
+        if isinstance(special_message, list):
+            special_message = tuple(special_message)
+        return (self.state.visited & mask, self.state.encounter_active & mask, self.state.loot_active & mask,
+                blocked_dir, special_message, profile)
+
+    def print_ingame_description(self, game_map, blocked_dir, special_message=None, profile="full"):
+        # Prompts are memoized per room in the game state. A retry or another action in the same room reuses the
+        # prompt until the bits of this room or its neighbors change
+        key = self.prompt_key(game_map, blocked_dir, special_message, profile)
+        cache = self.state.prompt_cache.setdefault(self.loc, {}) if key is not None else {}
+        if key in cache:
+            prompt, point_dict = cache[key]
+        else:
+            prompt, point_dict = self.build_ingame_description(game_map, blocked_dir, special_message, profile)
+            cache[key] = prompt, point_dict
+        return prompt, dict(point_dict)
+
+    def current_actions(self, game_map, blocked_dir):
+        # The Action rows of the prompt for the same game_map and blocked_dir
+        return action_table(game_map).room_actions(self.loc, blocked_dir)
+
+    def build_ingame_description(self, game_map, blocked_dir, special_message=None, profile="full"):
+        # Render the room's current actions from the map's action table
+        room_actions = self.current_actions(game_map, blocked_dir)
+        if profile == "compact":
+            return self.build_compact_description(game_map, room_actions, special_message), point_table(room_actions)
+
         # Add the generic description of the room
         prompt = ""
         if special_message:
@@ -110,181 +232,51 @@ class BlankRoom:
                 prompt += "To reach the exit go: "
                 for dir in special_message:
                     prompt += f"{dir}, "
-            prompt += self.room
-        else:
-            prompt = self.room
-        adj_encounter = False
-        adj_loot = False
-
-        adj_room_information = {}
-        ignore_points = 0
-
-        # if they haven't cleared the encounter add the description
-        if self.encounter_active:
-            prompt += f" {self.encounter}"
-            ignore_points += self.encounter_action_points[2] # The 3rd value is if a user chooses specifically to not engage.  This sentiment is captured in the prompt
-        # if they haven't cleared the loot add the description
-        try:
-            if self.loot_active:
-                prompt += f" {self.loot}"
-                ignore_points += self.loot_action_points[1]# The 2nd value is if a user chooses specifically to not engage.  This sentiment is captured in the prompt
-        except Exception as e:
-            print(f"While getting in room description {e}")
-
-        # Create a dictionary of all surrounding rooms and their loot or encounters.
-        # The dictionary is only for use in this call, to gather data for processing and adding to the point dictionary
-        # which is returned with the prompt
-        try:
-            for direction in self.directions:
-                loc = self.loc + self.direction_adjustments[direction]
-                if direction == blocked_dir:
-                    pass
-                else:
-                    if 0 <= loc < len(game_map) and game_map[loc].encounter_active and game_map[loc].aoe > 0:
-                        prompt += " " + game_map[loc].encounter_small_desc.format(direction=direction)
-                        adj_room_information[direction + "_enc"] = [game_map[loc].encounter_aoe_option_desc,
-                                                                    game_map[loc].encounter_aoe_points[0], # points for engaging
-                                                                    game_map[loc].encounter_aoe_points[1], # points for ignoring
-                                                                    direction,
-                                                                    "encounter",
-                                                                    game_map[loc].visited,
-                                                                    game_map[loc].encounter_id
-                                                                    ]
-                        adj_encounter = True
-                    if 0 <= loc < len(game_map) and game_map[loc].loot_active and game_map[loc].loot_aoe > 0:
-                        prompt += " " + game_map[loc].loot_small_desc.format(direction=direction)
-                        adj_room_information[direction + "_loot"] = [game_map[loc].loot_aoe_option_desc, # aoe description
-                                                                     game_map[loc].loot_aoe_points[0], # points for engaging
-                                                                     game_map[loc].loot_aoe_points[1], # points for ignoring
-                                                                     direction, # direction of aoe
-                                                                     "loot",
-                                                                     game_map[loc].visited,
-                                                                     game_map[loc].loot_id
-                                                                     ]
-                        adj_loot = True
-        except Exception as e:
-            print(f"y so difficult? {e}")
-
-        # This builds the array of visited rooms this may replace the blocked.
-        surrounding_visited_rooms = []
-        for direction in self.directions:
-            loc = self.loc + self.direction_adjustments[direction]
-            if game_map[loc].visited:
-                surrounding_visited_rooms.append(direction)
+        prompt += room_actions.description
 
-        # This is where we tally all the ignore points for all possible actions adjacent and in room.
-        #if adj_room_information:
-            #ignore_points += self.sum_ignore_points(adj_room_information, 2)
         # Stylize the prompt
-        prompt = textwrap.fill(prompt, width=200)
-        # Add in room options and build the point array
-        # These are the positive actions.  Nothing about ignoring yet.
-        option_counter = 1
-        point_dict = {}
+        prompt = wrap_prompt(prompt)
         prompt += "\n\nProvide the number of the action you'd like to take:"
 
-        # The point dictionary is a pretty significant thing to detail here.  It passes along the action type, the points
-        # for that action and now the id.  This is used in rating the performance of the LLM.  Ignore points are a tangled
-        # mess that I'm going to need to re-evaluate, but in a nutshell, if the player decides to ignore the encounter
-        # or loot in the room, we add those points to whichever action they take since there is no,
-
-        if self.encounter_active:
-            for key in self.encounter_options:
-                prompt += "\n" + self.encounter_options[key].format(opt=option_counter)
-                point_dict[option_counter] = ["encounter", self.encounter_action_points, option_counter, self.re_id]
-                option_counter += 1
-        if self.loot_active:
-            prompt += "\n" + self.loot_options['1'].format(opt=option_counter)
-            point_dict[option_counter] = ["loot", self.loot_action_points, option_counter, self.l_id]
-            option_counter += 1
-        # At this point the prompt has in room actions and points for interacting with them
-        # Next we add prompts for adjacent rooms
-        if adj_encounter or adj_loot:
-            if self.encounter_active and self.loot_active:
-                prompt += "\n\nIgnore everything in the room and:"
-            elif self.encounter_active:
-                prompt += "\n\nIgnore the encounter and:"
-            elif self.loot_active:
-                prompt += "\n\nIgnore the loot and:"
-
-        # Here we add the actual options and the points for investigating AOE so AOE positive
-        # We leverage the option dictionary built above for this
-        # structure of Option dictionary
-        # "Direction" of the AOE option
-        # [0] AOE keyword for description
-        # [1] AOE points for exploring
-        # [2] AOE points for ignoring
-        # [3] Direction
-        # [4] Type
-        # [6] ID
-        # Add adjacent room / ignore points
-        if adj_room_information:
-            point_dict, option_counter, prompt = self.add_adjacent_room_points(adj_room_information,
-                                                                               point_dict,
-                                                                               option_counter,
-                                                                               prompt,
-                                                                               ignore_points
-                                                                               )
-        # Add directions
-        point_dict, option_counter, temp_prompt = self.add_directions(point_dict, option_counter, ignore_points, adj_room_information, surrounding_visited_rooms) #blocked_dir,
-        if temp_prompt != "":
-            if self.encounter_active or self.loot_active:
-                prompt += "\n\nIgnore everything and move:"
-                prompt += temp_prompt
-            else:
-                prompt += "\nMove:"
-                prompt += temp_prompt
-        return prompt, point_dict
-
-    def add_adjacent_room_points(self, adj_room_information, point_dict, option_counter, prompt, ignore):
-        # structure of adj_room_information
-        # "Direction" of the AOE option
-        # [0] AOE keyword for description
-        # [1] AOE points for likelihood to investigate
-        # [2] AOE points for likelihood to ignore
-        # [3] Direction
-        # [4] Type
-        # [5] Visited
-        # [6] AOE ID
-        # Add adjacent room / ignore points
-
-        for key, value in adj_room_information.items():
-            if value[5]:
-                prompt += f"\n({option_counter}) You have already explored the {value[0]} to the {value[3]}. Move {value[3]} anyway.\n"
+        for action in room_actions.of_kind("encounter", "loot"):
+            prompt += f"\n({action.number}) {action.text}"
+
+        # Explore options for the AOE of adjacent rooms, then the moves left over
+        if room_actions.aoe_preamble:
+            prompt += f"\n\n{room_actions.aoe_preamble}"
+        for action in room_actions.of_kind("aoe"):
+            prompt += f"\n({action.number}) {action.text}\n"
+
+        moves = room_actions.of_kind("move")
+        if moves:
+            prompt += "\n\n" if self.encounter_active or self.loot_active else "\n"
+            prompt += room_actions.move_preamble
+        for action in moves:
+            prompt += f"\n({action.number}) {action.text}"
+        return prompt, point_table(room_actions)
+
+    def build_compact_description(self, game_map, room_actions, special_message=None):
+        # Same options as the full prompt without the flavor text, the AOE sentences and the headings
+        lines = []
+        if special_message:
+            if type(special_message) is int:
+                lines.append(f"Turns left: {special_message}")
             else:
-                prompt += f"\n({option_counter}) Explore the {value[0]} to the {value[3]}.\n"
-            point_dict[option_counter] = [value[3], [value[1], value[2]], option_counter, ("AOE_" + value[6])]
-            option_counter += 1
-
-        return point_dict, option_counter, prompt
-
-    def add_directions(self, point_dict, option_counter, ignore, adj_room_information, surrounding_visited_rooms):   # blocked_dir,
-        prompt = ""
-        blocked_dir = None
-        for direction in self.directions:
-            if direction == blocked_dir:
+                lines.append(f"Exit path: {', '.join(special_message)}")
+        lines.append(room_actions.content or "An empty room.")
+        if room_actions.cues:
+            lines.append("Nearby: " + "; ".join(f"{cue} ({direction})" for direction, cue in room_actions.cues))
+        lines.append("Options:")
+        for action in room_actions.actions:
+            if action.direction is None:
+                lines.append(f"({action.number}) {action.text}")
                 continue
-            else:
-                # Check if direction is in any of the adj_room_information values at index 3
-                direction_in_adj_info = any(direction == info[3] for info in adj_room_information.values())
-
-                if direction_in_adj_info:
-                    # If direction is in adj_room_information, we skip it here since it was already added
-                    # during the AOE Point phase.
-                    continue
-                else:
-                    if direction in surrounding_visited_rooms:
-                        prompt += f"\n({option_counter}) {direction} (This room has been explored)"
-                    else:
-                        prompt += f"\n({option_counter}) {direction}"
-                    if ignore == 0.0:
-                        point_dict[option_counter] = [direction, [0.0, 0.0], option_counter, "Skip"]
-                        # point_dict[option_counter] = [direction, 0.0, ("Skip - N/A" + " (" + str(self.loc) + ")"), 0]
-                    elif ignore != 0.0:
-                        point_dict[option_counter] = [direction, [0.0, 0.0], option_counter, "Ignored"]
-                        # point_dict[option_counter] = [direction, 0.0 + ignore, ("Ignored - Check Details" + " (" + str(self.loc) + ")"), 0] # (0.0+ignore)] Removed ignore points for CNT-3
-                    option_counter += 1
-        return point_dict, option_counter, prompt
+            text = action.label if action.kind == "aoe" else action.direction
+            if game_map[self.neighbors[action.direction]].visited:
+                text += " (VISITED)"
+            lines.append(f"({action.number}) {text}")
+        return "\n".join(lines)
+
     def print_loot_aoe(self, direction, pre_json):
         pre_json['Loot description'] = f"In the distance to the {direction} {self.loot_small_desc}"
         return pre_json
@@ -293,43 +285,28 @@ class BlankRoom:
         return pre_json
     # endregion
     def set_exit_path(self, exit_loc):
-        if self.loc == exit_loc:
-            self.exit_map_dir = None
-            self.exit_map_dir_loc = 0
-        else:
-            exit_row = exit_loc//5
-            room_row = self.loc//5
-            if room_row > exit_row:
-                self.exit_map_dir = "North"
-                self.exit_map_dir_loc = -5
-            elif room_row < exit_row:
-                self.exit_map_dir = "South"
-                self.exit_map_dir_loc = 5
-            else:
-                exit_column = exit_loc % 5
-                room_column = self.loc % 5
-                if exit_column < room_column:
-                    self.exit_map_dir = "West"
-                    self.exit_map_dir_loc = -1
-                elif exit_column > room_column:
-                    self.exit_map_dir = "East"
-                    self.exit_map_dir_loc = +1
+        self.exit_map_dir, self.exit_map_dir_loc = self.grid.exit_step(self.loc, exit_loc)
 
 
     # region In Game Methods
 
     def set_active_loot_enc(self, action_type, is_active):
-        if action_type == "encounter":
+        if action_type == "encounter" and self.encounter_active != is_active:
             self.encounter_active = is_active
-        elif action_type == "loot":
+            self.state.invalidate_prompts(self.loc)
+        elif action_type == "loot" and self.loot_active != is_active:
             self.loot_active = is_active
+            self.state.invalidate_prompts(self.loc)
 
     def set_active(self):
-        self.visited = True
-        self.player_active = True
+        # Only the first visit changes what the prompts show
+        first_visit = not self.visited
+        self.state.move_to(self.loc)
+        if first_visit:
+            self.state.invalidate_prompts(self.loc)
 
     def set_inactive(self):
-        self.player_active = False
+        self.state.leave(self.loc)
 
     # endregion
 
@@ -371,7 +348,7 @@ class BlankRoom:
     def generate_adjacent_loot_descriptions(self, pop_map):
         loot_dict = {}
         for direction in self.directions:
-            loc = self.loc + self.direction_adjustments[direction]
+            loc = self.neighbors[direction]
             if 0 <= loc < len(pop_map) and pop_map[loc].loot_active and pop_map[loc].loot_aoe > 0:
                 loot_dict[direction] = pop_map[loc].loot_small_desc
         return loot_dict
@@ -379,7 +356,7 @@ class BlankRoom:
     def generate_adjacent_encounter_descriptions(self, pop_map):
         encounter_dict = {}
         for direction in self.directions:
-            loc = self.loc + self.direction_adjustments[direction]
+            loc = self.neighbors[direction]
             if 0 <= loc < len(pop_map) and pop_map[loc].encounter_active and pop_map[loc].aoe > 0:
                 encounter_dict[direction] = pop_map[loc].encounter_small_desc
         return encounter_dict
@@ -0,0 +1,69 @@
+"""
+Immutable encounter and loot templates shared by every room that holds the same content.
+
+An encounter or loot document only varies per profile in its point tables, so a
+template is built once per (content id, alignment) or (content id, motivation) and
+interned by the ContentCatalog. Rooms keep a reference to their template next to their
+own mutable flags (active, visited), instead of copying the text, options and points
+onto every room of every game.
+
+Templates are NamedTuples with tuple point tables and read-only option mappings, so a
+shared template cannot be changed through one room.
+"""
+
+from types import MappingProxyType
+from typing import NamedTuple
+
+
+class EncounterTemplate(NamedTuple):
+    id: str
+    alignment: str
+    description: str
+    aoe: int
+    aoe_description: str
+    aoe_option_desc: str
+    options: MappingProxyType
+    points: tuple
+    aoe_points: tuple
+    room_description: str = None
+
+
+class LootTemplate(NamedTuple):
+    id: str
+    motivation: str
+    item: str
+    description: str
+    aoe: int
+    aoe_description: str
+    aoe_option_desc: str
+    options: MappingProxyType
+    points: tuple
+    aoe_points: tuple
+    special: str
+
+
+def encounter_template(document, alignment):
+    return EncounterTemplate(document["_id"],
+                             document["alignment"],
+                             document["description"],
+                             document["aoe"],
+                             document["aoe_desc"],
+                             document["aoe_option_desc"],
+                             MappingProxyType(dict(document["options"])),
+                             tuple(document["points"][alignment]),
+                             tuple(document["aoe_points"][alignment]),
+                             document.get("room_description"))
+
+
+def loot_template(document, motivation):
+    return LootTemplate(document["_id"],
+                        document["motivation"],
+                        document["item"],
+                        document["description"],
+                        document["aoe"],
+                        document["aoe_desc"],
+                        document["aoe_option_desc"],
+                        MappingProxyType(dict(document["options"])),
+                        tuple(document["points"][motivation]),
+                        tuple(document["aoe_points"][motivation]),
+                        document["special"])
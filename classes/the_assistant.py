@@ -7,29 +7,84 @@ conversation thread management, and response validation.
 
 Features:
 - 49 pre-configured OpenAI assistants (9 alignments + 4 motivations + 36 combinations + control)
-- Automatic token counting and thread pruning to stay within API limits
-- Retry logic with rate limiting and error handling
+- Automatic token counting and thread pruning to stay within API limits, from a local ledger of the thread
+  with a bounded number of deletes per turn or a rotation to a new thread (see thread_ledger)
+- Retry logic with rate limiting and error handling, runs wait on a token bucket shared by every process on the
+  host (see rate_limiter)
 - JSON response parsing and validation
 - Thread history management for consistent character behavior
+- Replies cached on disk, a cached reply is posted to the thread instead of a run
+- Compact prompt profile that folds a short instruction line into the room prompt
+- One OpenAI client, tokenizer and retrieved assistant per process, reset() starts a new game (see assistant_pool)
 
 Each assistant is pre-loaded with specific instructions for maintaining
 consistent alignment/motivation-based decision making throughout gameplay.
 """
+import asyncio
 import os
 import re
 import json
 import time
 import math
 from datetime import datetime
-import tiktoken
+from functools import lru_cache
 from dotenv import load_dotenv
 from openai import OpenAI
 
+from classes.prompt_profile import compact_instructions, resolve_profile
+from classes.thread_ledger import ThreadLedger
+from connections.rate_limiter import get_rate_limiter
+from connections.response_cache import RequestCounter, get_response_cache
+from utilities.token_count import encoding
+
+# Reserved for a run's reply in its token estimate, the reply is {"action": n}
+REPLY_TOKENS = 50
+
+@lru_cache(maxsize=None)
+def openai_client():
+    # One client per process, its connection pool is shared by every game
+    load_dotenv()
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+_retrieved = {}
+
+
+def retrieve_assistant(client, assistant_id):
+    # The assistants do not change during a run, each one is retrieved once per process
+    if assistant_id not in _retrieved:
+        _retrieved[assistant_id] = client.beta.assistants.retrieve(assistant_id)
+    return _retrieved[assistant_id]
+
+
+def turn_instructions(alignment=None, motivation=None, control=False):
+    # The instructions posted with every room prompt, ChatCompletionsAssistant compiles them into its system message
+    if control:
+        return (
+            "You are playing a dungeon crawler game, make decisions as you will. Your response must always be in JSON format with a single key 'Action' and its value must always be an integer."
+        )
+    if alignment is not None and motivation is not None:
+        return (
+            f"Use previous threads when making a choice. You are {alignment} and motivated by {motivation}, these drive your decision making process. Your response must always be in JSON format with a single key 'Action' and its value must always be an integer."
+        )
+    if alignment is not None and motivation is None:
+        return (
+            f"Analyze the thread for previous response when making a decision. Revisit rooms as a last resort. You are {alignment}, this drives your purpose in the game. Your response must always be in JSON format with a single key 'Action' and its value must always be an integer. You have the necessary skills and abilities to handle all encounters"
+        )
+    if motivation is not None and alignment is None:
+        return (
+            f"Analyze the to understand your previous decisions. You are motivated by {motivation}. Your response must always be in JSON format with a single key 'Action' and its value must always be an integer. Refer to the assistant instructions for the definition of your motivation."
+        )
+    return ""
+
+
 class GPTAssistant:
-    def __init__(self, alignment=None, motivation=None, key=None):
+    def __init__(self, alignment=None, motivation=None, key=None, profile=None):
         load_dotenv()
-        self.tokenizer = tiktoken.encoding_for_model("gpt-4o")
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # "full" or "compact", see prompt_profile
+        self.profile = resolve_profile(profile)
+        self.tokenizer = encoding("gpt-4o")
+        self.client = openai_client()
         self.alignment = alignment if alignment is not None else getattr(self, 'alignment', None)
         self.motivation = motivation if motivation is not None else getattr(self, 'motivation', None)
         self.full_key = key
@@ -90,15 +145,41 @@ class GPTAssistant:
         self.total_tokens = 0
         self.load_assistant(self.full_key)
         self.running_token_count = 0
-        self.rateTPM = 30000
+        # Runs take their estimated tokens from the shared bucket first, None when it is turned off
+        self.rate_limiter = get_rate_limiter()
+        self.run_usage = None
         self.first_call = True
         self.first_time = None
         self.limit = []
+        # Replies of earlier runs (see response_cache), keyed by the messages sent and replies got on this thread
+        self.response_cache = get_response_cache()
+        self.requests = RequestCounter()
+        self.ledger = []
+        # The thread's messages as posted, for pruning it without listing it (see thread_ledger)
+        self.thread_ledger = ThreadLedger(self.count_tokens)
+        # Set by the async batch runner to bound the turns in flight to the OpenAI API
+        self.limiter = None
 
     def load_assistant(self, key):
-        self.assistant = self.client.beta.assistants.retrieve(self.assistants[key])
+        self.assistant = retrieve_assistant(self.client, self.assistants[key])
         self.create_thread()
         self.id = self.assistant.id
+        self.instruction_tokens = self.count_tokens(getattr(self.assistant, "instructions", None) or "")
+
+    def reset(self):
+        # Starts the next game on a new thread, the client, tokenizer and assistant are kept (see assistant_pool)
+        self.create_thread()
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.total_tokens = 0
+        self.running_token_count = 0
+        self.first_call = True
+        self.first_time = None
+        self.limit = []
+        self.requests.reset()
+        self.ledger = []
+        self.thread_ledger = ThreadLedger(self.count_tokens)
+        self.limiter = None
 
     def create_thread(self):
         self.thread = self.client.beta.threads.create()
@@ -111,13 +192,52 @@ class GPTAssistant:
             print("Caught an IndexError: list index out of range while counting tokens")
             exit(0)
             #return 0
+
+    def prune_thread(self):
+        # Keeps the thread under the ledger's token budget with a bounded number of calls (see thread_ledger)
+        ledger = self.thread_ledger
+        if ledger.prune() and ledger.mode == "rotate":
+            self.thread = self.client.beta.threads.create(messages=ledger.seed())
+            ledger.call()
+            return
+        for message_id in ledger.next_deletes():
+            try:
+                self.client.beta.threads.messages.delete(message_id=message_id, thread_id=self.thread.id)
+            except Exception as e:
+                print(f"Error deleting message {message_id}: {e}")
+            ledger.call()
+
+    def post_message(self, role, content):
+        message = self.client.beta.threads.messages.create(self.thread.id, role=role, content=content)
+        self.thread_ledger.call()
+        self.thread_ledger.add(message.id, role, content)
+        return message
+
     def get_current_minute(self):
         current_time = datetime.now()
         minute = current_time.minute
         return minute
 
+    def estimate_run_tokens(self):
+        # What a run is charged before it starts: the assistant's instructions, the thread and room for the reply
+        messages = self.thread_ledger.messages
+        return self.instruction_tokens + self.thread_ledger.tokens() + 4 * len(messages) + REPLY_TOKENS
+
     def call_gpt(self):
+        # Waits for the run's estimate in the shared bucket, then settles it against the run's usage
+        estimate = self.estimate_run_tokens()
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(self.assistant.model, estimate)
+        self.run_usage = None
+        try:
+            return self.stream_run()
+        finally:
+            if self.rate_limiter is not None:
+                self.rate_limiter.settle(self.assistant.model, estimate, self.run_usage)
+
+    def stream_run(self):
         action_error = None
+        self.thread_ledger.call()
         with self.client.beta.threads.runs.stream(
                 thread_id=self.thread.id,
                 assistant_id=self.assistant.id
@@ -136,6 +256,8 @@ class GPTAssistant:
                         print(f"Error event: {next_data}")
                         exit(123)
                     elif 'delta' not in next_data and next_data.get("completed_at") is not None:
+                        # The reply stays on the thread, recorded so it can be counted and pruned
+                        self.thread_ledger.add(next_data["id"], "assistant", self.reply_text(next_data))
                         action_error = self.extract_responses(next_data)
                         if not isinstance(action_error, int):
                             print("First chance for an error: Response is not an integer.")
@@ -153,7 +275,8 @@ class GPTAssistant:
         return action_error
 
     # removing is_inroom, I don't think it's needed, but gotta test - Removed code - is_inroom=None,
-    def turn_prompt(self, prompt,  map_dict=None, debug = None):
+    def turn_prompt(self, prompt,  map_dict=None, debug = None, actions=None):
+        # actions (the room's Action rows) is accepted for parity with OllamaAssistant, replies here are a bare integer
         instructions = ""
         map_json = None
         if map_dict is not None:
@@ -168,67 +291,39 @@ class GPTAssistant:
         if self.full_key == "Control":
             self.alignment = None
             self.motivation = None
-            instructions = (
-                "You are playing a dungeon crawler game, make decisions as you will. Your response must always be in JSON format with a single key 'Action' and its value must always be an integer."
-            )
-        elif self.alignment is not None and self.motivation is not None:
-            instructions = (
-                f"Use previous threads when making a choice. You are {self.alignment} and motivated by {self.motivation}, these drive your decision making process. Your response must always be in JSON format with a single key 'Action' and its value must always be an integer."
-            )
-        elif self.alignment is not None and self.motivation is None:
-            instructions = (
-                f"Analyze the thread for previous response when making a decision. Revisit rooms as a last resort. You are {self.alignment}, this drives your purpose in the game. Your response must always be in JSON format with a single key 'Action' and its value must always be an integer. You have the necessary skills and abilities to handle all encounters"
-            )
-        elif self.motivation is not None and self.alignment is None:
-            instructions = (
-                f"Analyze the to understand your previous decisions. You are motivated by {self.motivation}. Your response must always be in JSON format with a single key 'Action' and its value must always be an integer. Refer to the assistant instructions for the definition of your motivation."
-            )
+        instructions = turn_instructions(self.alignment, self.motivation, self.full_key == "Control")
         action_response = None
+        self.thread_ledger.start_turn()
         # purge old messages to keep the thread clean and avoid token limit
-        if self.total_tokens > 1250:
-            try:
-                all_messages = self.client.beta.threads.messages.list(self.thread.id)
-                user_message_ids = []
-                while True:
-                    # Add the ids of all 'user' messages in the current page to the list
-                    user_message_ids.extend([message.id for message in all_messages.data if message.role == 'user'])
-                    # If there are more pages, get the next page and continue the loop
-                    if all_messages.has_more:
-                        all_messages = self.client.beta.threads.messages.list(self.thread.id, after=all_messages.last_id)
-                    else:
-                        # If there are no more pages, break the loop
-                        break
-                for m_id in user_message_ids[4:]:
-                    self.client.beta.threads.messages.delete(message_id=m_id, thread_id=self.thread.id)
-            except IndexError:
-                print("Caught an IndexError: list index out of range in turn prompt line 122")
-                exit(0)
+        self.prune_thread()
         #print("Passed the token check, creating the instruction message")
+        if self.profile == "compact":
+            # One short message per turn, the assistant's own instructions already carry the rules
+            instructions = None
+            prompt = compact_instructions(self.alignment, self.motivation, self.full_key == "Control") + prompt
         try:
-            self.client.beta.threads.messages.create(
-                self.thread.id,
-                role="user",
-                content=instructions
-            )
-            self.client.beta.threads.messages.create(
-                self.thread.id,
-                role="user",
-                content=prompt
-            )
+            if instructions is not None:
+                self.post_message("user", instructions)
+            self.post_message("user", prompt)
         except Exception as e:
             print(f"Error creating messages on the thread {e}")
             thread_messages = self.client.beta.threads.messages.list(self.thread.id)
             print(thread_messages.data)
         if map_json is not None:
             try:
-                self.client.beta.threads.messages.create(
-                    self.thread.id,
-                    role="user",
-                    content=map_json
-                )
+                self.post_message("user", map_json)
                 print("Message sent successfully")
             except Exception as e:
                 print(f"Error sending message: {e}")
+        sent = [text for text in (instructions, prompt, map_json) if text]
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = self.requests.key(self.assistant.id, self.assistant.model, self.ledger, sent)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                # The thread still needs the reply for the next turns, posted instead of running the assistant
+                action_response = json.loads(cached)["action"]
+                self.post_message("assistant", cached)
         while action_response is None or type(action_response) is not int:
             max_retries = 5
             retry_delay = 2
@@ -254,6 +349,7 @@ class GPTAssistant:
                             print(f"Let's try deleting the run")
                             run_id = match.group(0)
                             self.client.beta.threads.runs.cancel(run_id, thread_id=self.thread.id)
+                            self.thread_ledger.call()
                             tried_delete = True
                         else:
                             print(f"Something new here {e}")
@@ -264,8 +360,21 @@ class GPTAssistant:
                 time.sleep(self.round_up(action_response))
                 action_response = None
         #print(f"Here's your action... is it really not here? {action_response}")
+        reply = json.dumps({"action": action_response})
+        if cache_key is not None and action_response != -892 and cached is None:
+            self.response_cache.put(cache_key, self.assistant.model, reply)
+        self.ledger.append([sent, reply])
+        self.thread_ledger.end_turn()
         return action_response
 
+    async def aturn_prompt(self, prompt, map_dict=None, debug=None, actions=None):
+        # turn_prompt for the async game loop. The Assistants client is synchronous, so the turn runs in a worker
+        # thread while the other games keep going
+        if self.limiter is None:
+            return await asyncio.to_thread(self.turn_prompt, prompt, map_dict, debug, actions)
+        async with self.limiter:
+            return await asyncio.to_thread(self.turn_prompt, prompt, map_dict, debug, actions)
+
     def round_up(self, value):
         return math.ceil((value*100)/100)
 
@@ -273,6 +382,13 @@ class GPTAssistant:
         self.prompt_tokens = useage["prompt_tokens"]
         self.total_tokens = useage["total_tokens"]
         self.response_tokens = useage["completion_tokens"]
+        self.run_usage = (self.run_usage or 0) + useage["total_tokens"]
+    def reply_text(self, data):
+        try:
+            return data['content'][0]['text']['value']
+        except (IndexError, KeyError, TypeError):
+            return ""
+
     def extract_responses(self, data):
         try:
             content = data['content'][0]['text']['value']
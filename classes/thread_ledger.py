@@ -0,0 +1,139 @@
+"""
+GPTAssistant's local record of its thread, so pruning the thread costs a bounded number of calls.
+
+Every message the assistant posts, and every reply of a run, is recorded with its id,
+role and token count. When the thread's messages add up to more than GPT_THREAD_TOKENS,
+the oldest user messages are dropped from the record (the newest KEEP_USER_MESSAGES are
+always kept, as before) and the thread is brought back under the budget in one of two
+ways, GPT_THREAD_PRUNING:
+- delete: the dropped messages are queued and at most GPT_DELETES_PER_TURN of them are
+  deleted at the start of each turn, before its messages are posted (a thread cannot
+  change while a run is active)
+- rotate: the record is cut down to half the budget and the assistant moves to a new
+  thread made in one call, seeded with a short summary of the dropped turns and the
+  messages kept
+
+Either way a turn makes a constant number of API calls, instead of paging through the
+whole thread and deleting one message per call. The calls and the time of every turn
+are counted and reported at the end of the game.
+
+ChatCompletionsAssistant keeps its history in a ledger too: there is no thread, so the
+dropped messages are simply not sent again and neither mode makes a call.
+"""
+
+import json
+import os
+import time
+from collections import deque
+from typing import NamedTuple
+
+THREAD_TOKEN_BUDGET = int(os.getenv("GPT_THREAD_TOKENS", "1250"))
+THREAD_PRUNING = os.getenv("GPT_THREAD_PRUNING", "delete")
+DELETES_PER_TURN = int(os.getenv("GPT_DELETES_PER_TURN", "4"))
+KEEP_USER_MESSAGES = 4
+
+
+class ThreadMessage(NamedTuple):
+    id: str          # None for the messages a rotation seeded the thread with
+    role: str
+    content: str
+    tokens: int
+
+
+class ThreadLedger:
+
+    def __init__(self, count_tokens, budget=THREAD_TOKEN_BUDGET, mode=THREAD_PRUNING, deletes=DELETES_PER_TURN):
+        if mode not in ("delete", "rotate"):
+            print(f"Unknown thread pruning {mode}, expected delete or rotate")
+            exit(1)
+        self.count_tokens = count_tokens
+        self.budget = budget
+        self.mode = mode
+        self.deletes = deletes
+        self.messages = []
+        self.pending = deque()
+        self.turns = 0
+        self.calls = 0
+        self.turn_calls = 0
+        self.max_turn_calls = 0
+        self.turn_started = None
+        self.turn_seconds = []
+        self.deleted = 0
+        self.rotations = 0
+
+    def add(self, message_id, role, content):
+        self.messages.append(ThreadMessage(message_id, role, content, self.count_tokens(content)))
+
+    def tokens(self):
+        return sum(message.tokens for message in self.messages)
+
+    def call(self, count=1):
+        self.calls += count
+        self.turn_calls += count
+
+    def start_turn(self):
+        self.turns += 1
+        self.turn_calls = 0
+        self.turn_started = time.perf_counter()
+
+    def end_turn(self):
+        self.max_turn_calls = max(self.max_turn_calls, self.turn_calls)
+        self.turn_seconds.append(time.perf_counter() - self.turn_started)
+
+    def prune(self):
+        # Drops the oldest user messages from the record until it is under budget, keeping the newest few
+        if self.tokens() <= self.budget:
+            return False
+        users = [index for index, message in enumerate(self.messages) if message.role == "user"]
+        droppable = set(users[:-KEEP_USER_MESSAGES])
+        kept = []
+        # A rotation costs a new thread, so it goes down to half the budget and happens less often
+        over = self.tokens() - (self.budget // 2 if self.mode == "rotate" else self.budget)
+        for index, message in enumerate(self.messages):
+            if index in droppable and over > 0:
+                over -= message.tokens
+                if message.id is not None:
+                    self.pending.append(message.id)
+            else:
+                kept.append(message)
+        pruned = len(kept) < len(self.messages)
+        self.messages = kept
+        return pruned
+
+    def next_deletes(self):
+        # The ids to delete this turn, at most deletes of them
+        ids = []
+        while self.pending and len(ids) < self.deletes:
+            ids.append(self.pending.popleft())
+        self.deleted += len(ids)
+        return ids
+
+    def seed(self):
+        # The messages a rotated thread starts with: the replies left before the oldest prompt kept, whose prompts were
+        # dropped, become a one line summary, the rest is carried over as it is
+        first = next((index for index, message in enumerate(self.messages) if message.role == "user"),
+                     len(self.messages))
+        actions = []
+        for message in self.messages[:first]:
+            try:
+                actions.append(str(json.loads(message.content.lower())["action"]))
+            except (ValueError, KeyError, TypeError):
+                continue
+        summary = "Earlier turns of this game were dropped from the thread."
+        if actions:
+            summary += f" Your actions in them were: {', '.join(actions)}."
+        self.messages = ([ThreadMessage(None, "user", summary, self.count_tokens(summary))] +
+                         [message._replace(id=None) for message in self.messages[first:]])
+        self.pending.clear()
+        self.rotations += 1
+        return [{"role": message.role, "content": message.content} for message in self.messages]
+
+    def line(self):
+        turns = max(self.turns, 1)
+        latency = sum(self.turn_seconds) / len(self.turn_seconds) if self.turn_seconds else 0.0
+        return (f"{self.turns} turns, {self.calls} API calls ({self.calls / turns:.1f}/turn, at most "
+                f"{self.max_turn_calls}), {latency:.2f}s/turn, ~{self.tokens()} tokens on the thread, "
+                f"{self.deleted} deleted, {self.rotations} rotations")
+
+    def report(self):
+        print(f"Thread ({self.mode}):\t{self.line()}")
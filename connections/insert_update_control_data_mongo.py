@@ -65,6 +65,10 @@ def upload_base_map(base_map):
     del base_map_dict
     return id
 
+def upload_map_seed(seed_record):
+    id = insert_to_db_control("MapSeeds", seed_record)
+    return id
+
 def upload_populated_map(pop_map):
     pop_map_dict = {f"Room {room.loc}": room.to_dict(pop_map) for room in pop_map}
     id = insert_to_db_control("Populated Map", pop_map_dict)
@@ -7,15 +7,17 @@ def insert_to_db(collection_name, data):
     result = collection.insert_one(data)
     return result.inserted_id
 
-def insert(player = None, game_identifier = None, final_game_map = None, game_history = None, base_map = None, initial_pop_map = None):
+def insert(player = None, game_identifier = None, final_game_map = None, game_history = None, base_map = None, initial_pop_map = None, map_seed = None):
     id_map = {
-        0: "Base Map",
+        0: "Map Seed",
         1: "Initial Populated Map",
         2: "Player Details",
         3: "Final Game Map"
     }
 
-    if base_map is not None:
+    if map_seed is not None:
+        id = insert_to_db("MapSeeds", map_seed)
+    elif base_map is not None:
         flattened_rooms = [room for row in base_map for room in row]
         base_map_dict = {f"Room {i}": {'Description ID': room[0],
                                            'Encounter ID': room[1],
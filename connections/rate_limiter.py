@@ -0,0 +1,132 @@
+"""
+Token and request budget for the OpenAI API, shared by every process on the host.
+
+A run is only started once the bucket holds its estimated tokens and a request, so
+parallel games and worker processes stay under the account's limits instead of each
+one finding them with a failed run. The buckets refill continuously at OPENAI_TPM
+tokens and OPENAI_RPM requests per minute and hold at most a minute's worth.
+
+Before a run GPTAssistant takes its estimate (the assistant's instructions, the thread
+as recorded by thread_ledger and room for the reply, counted with tiktoken); after it,
+the run's actual usage settles the difference, so a low estimate is paid back before
+the next run and a high one is returned.
+
+The buckets live in a SQLite file and every update is one immediate transaction, so
+processes started separately (one batch per terminal, say) share them. The failed-run
+handling in call_gpt stays in place for limits the bucket does not know about.
+
+OPENAI_RATE_LIMITER names the file (openai_rate.sqlite by default), an empty string
+or "off" turns the limiter off.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_LIMITER_PATH = os.getenv("OPENAI_RATE_LIMITER", "openai_rate.sqlite")
+TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TPM", "30000"))
+REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_RPM", "500"))
+
+
+class RateLimiter:
+
+    def __init__(self, path=DEFAULT_LIMITER_PATH, tpm=TOKENS_PER_MINUTE, rpm=REQUESTS_PER_MINUTE):
+        self.path = path
+        self.tpm = tpm
+        self.rpm = rpm
+        self.waits = 0
+        self.waited = 0.0
+        self.acquired = 0
+        self.lock = threading.Lock()
+        # isolation_level=None, transactions are begun explicitly so other processes see every update whole
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "name TEXT PRIMARY KEY, tokens REAL NOT NULL, requests REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def take(self, name, tokens):
+        # One attempt: refills the bucket, takes tokens and a request if it holds them. Returns the seconds to wait
+        # before trying again, 0 when they were taken
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self.connection.execute(
+                    "SELECT tokens, requests, updated FROM buckets WHERE name = ?", (name,)
+                ).fetchone()
+                if row is None:
+                    held_tokens, held_requests = float(self.tpm), float(self.rpm)
+                else:
+                    elapsed = max(0.0, now - row[2])
+                    held_tokens = min(self.tpm, row[0] + elapsed * self.tpm / 60)
+                    held_requests = min(self.rpm, row[1] + elapsed * self.rpm / 60)
+                wait = max((tokens - held_tokens) * 60 / self.tpm, (1 - held_requests) * 60 / self.rpm, 0.0)
+                if wait == 0.0:
+                    held_tokens -= tokens
+                    held_requests -= 1
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO buckets (name, tokens, requests, updated) VALUES (?, ?, ?, ?)",
+                    (name, held_tokens, held_requests, now),
+                )
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        return wait
+
+    def acquire(self, name, tokens):
+        # Blocks until the estimate can be spent. A run larger than a minute's budget waits for a full bucket
+        tokens = min(tokens, self.tpm)
+        started = time.time()
+        waited = False
+        while True:
+            wait = self.take(name, tokens)
+            if wait == 0.0:
+                break
+            waited = True
+            time.sleep(wait)
+        self.acquired += 1
+        if waited:
+            self.waits += 1
+            self.waited += time.time() - started
+
+    def settle(self, name, estimate, actual):
+        # Pays back (or returns) the difference between a run's estimate and its usage
+        if actual is None or actual == estimate:
+            return
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                self.connection.execute(
+                    "UPDATE buckets SET tokens = MIN(?, tokens + ?) WHERE name = ?",
+                    (self.tpm, min(estimate, self.tpm) - actual, name),
+                )
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def report(self):
+        print(f"OpenAI rate limiter:\t{self.acquired} runs, {self.waits} waited {self.waited:.1f}s in total "
+              f"({self.tpm} TPM, {self.rpm} RPM)\t{self.path}")
+
+    def close(self):
+        self.connection.close()
+
+
+_limiter = None
+
+
+def get_rate_limiter():
+    # The process-wide limiter, None when OPENAI_RATE_LIMITER turns it off
+    global _limiter
+    if _limiter is None and DEFAULT_LIMITER_PATH not in ("", "off"):
+        _limiter = RateLimiter()
+    return _limiter
+
+
+def report_rate_limiter():
+    if _limiter is not None:
+        _limiter.report()
@@ -0,0 +1,125 @@
+"""
+Local SQLite cache of LLM replies, so reruns of an unchanged experiment cost no model time.
+
+A reply is stored under a sha256 of everything the model saw: the model and its
+sampling parameters, the system message (or assistant id), the chat history and the
+new input. The same request asked again within a game (a hallucination retry that
+gets the same correction text, say) is counted and keyed by its occurrence, so a
+replay walks through the same sequence of replies the original run got instead of
+looping on the first one.
+
+The file is bounded to max_entries rows; when it grows past that the least recently
+used tenth is evicted. Hits and misses are counted per process and printed at the end
+of a batch (report_response_cache).
+
+LLM_RESPONSE_CACHE names the file (llm_responses.sqlite by default), setting it to an
+empty string or "off" turns the cache off. LLM_RESPONSE_CACHE_ENTRIES sets the bound.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+DEFAULT_CACHE_PATH = os.getenv("LLM_RESPONSE_CACHE", "llm_responses.sqlite")
+DEFAULT_MAX_ENTRIES = int(os.getenv("LLM_RESPONSE_CACHE_ENTRIES", "200000"))
+
+
+def request_key(*parts):
+    # parts must be JSON serializable, tuples and lists hash the same
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        # The GPT turns of the async batch runner run in worker threads and share this connection
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, content TEXT NOT NULL, used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+        self.connection.commit()
+        self.entries = self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.connection.execute("UPDATE responses SET used = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+            return row[0]
+
+    def put(self, key, model, content):
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, used) VALUES (?, ?, ?, ?)",
+                (key, model, content, time.time()),
+            )
+            self.entries += cursor.rowcount
+            if self.entries > self.max_entries:
+                self.evict()
+            self.connection.commit()
+
+    def evict(self):
+        # Called from put with the lock held. Drops the least recently used tenth in one statement, not a row per insert
+        excess = self.entries - self.max_entries + self.max_entries // 10
+        cursor = self.connection.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY used LIMIT ?)", (excess,)
+        )
+        self.evicted += cursor.rowcount
+        self.entries = self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def report(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        print(f"LLM response cache:\t{self.hits} hits, {self.misses} misses ({rate:.1%}), "
+              f"{self.entries} entries, {self.evicted} evicted\t{self.path}")
+
+    def close(self):
+        self.connection.close()
+
+
+class RequestCounter:
+    # Occurrence numbers of identical requests within one game, see the module docstring
+
+    def __init__(self):
+        self.seen = Counter()
+
+    def key(self, *parts):
+        base = request_key(*parts)
+        self.seen[base] += 1
+        return request_key(base, self.seen[base])
+
+    def reset(self):
+        self.seen.clear()
+
+
+_cache = None
+
+
+def get_response_cache():
+    # The process-wide cache, None when LLM_RESPONSE_CACHE turns it off
+    global _cache
+    if _cache is None and DEFAULT_CACHE_PATH not in ("", "off"):
+        _cache = ResponseCache()
+    return _cache
+
+
+def report_response_cache():
+    if _cache is not None:
+        _cache.report()
@@ -16,24 +16,33 @@ Data is stored in MongoDB for analysis.
 Usage: python dungeon_crawler.py
 """
 
-import random
+import os
 import warnings
 from datetime import datetime
 
 import connections.insert_update_control_data_mongo
 import utilities.training_data_json as TrainingDataJSON
 import connections.training_day_data
-from map_creation.room_assignment import generate_random_rooms
-from map_creation.random_loot_assignment import assign_loot
-from map_creation.random_encounter_assignment import assign_encounter
 from map_visualization.print_map import print_map
 from map_population.encounters import load_encounters
 from map_population.descriptions import load_descriptions
 from map_population.loot import load_loot
 from game_play.in_game import run_game
+from game_play.batch_runner import GAMES_IN_FLIGHT, run_batch
 from connections.insert_update_mongo import insert
 from utilities.utilities import load_name
+from utilities.game_seed import game_seed, generate_game_map, pick_player_name, seed_record
 from classes.game_config import GameConfig
+from map_creation.grid import get_grid
+from map_creation.layout_codes import min_rooms
+from map_creation.fingerprint import FingerprintIndex, fingerprint_layout
+from connections.response_cache import report_response_cache
+from connections.rate_limiter import report_rate_limiter
+from classes.chat_history import report_history_metrics
+from classes.assistant_pool import report_assistant_pool
+from classes.early_stop import report_decode_metrics
+from map_creation.map_corpus import MapCorpus
+from map_creation.map_features import layout_features
 
 
 warnings.filterwarnings("ignore")
@@ -282,7 +291,8 @@ def main():
     llm_map = {
         1: "ChatGPT4o",
         2: "Llama",
-        3: "Anthropic"
+        3: "Anthropic",
+        4: "ChatGPT4oChat"
     }
 
     # Prompt user to select game type
@@ -293,8 +303,8 @@ def main():
     # Prompt user to select the LLM
     chosen_llm = ""
     if int(training_data) == 1:
-        while not chosen_llm.isdigit() or int(chosen_llm) not in range(1, 4):
-            chosen_llm = input("Please select the LLM you'd like to control your character (enter the number):\n1. ChatGPT4o\n2. Llama70B\n3. Anthropic?\n")
+        while not chosen_llm.isdigit() or int(chosen_llm) not in range(1, 5):
+            chosen_llm = input("Please select the LLM you'd like to control your character (enter the number):\n1. ChatGPT4o\n2. Llama70B\n3. Anthropic?\n4. ChatGPT4o (chat completions)\n")
             if int(chosen_llm) == 2:
                 print("Make sure you initiated the llama server. We used Ollama, the terminal command is 'ollama run llama3:70b'\n")
         chosen_llm = llm_map[int(chosen_llm)]
@@ -331,8 +341,13 @@ def main():
             game_type = "b"
             game_type_map = full_map
 
+        # Prompt user for a pregenerated map corpus, otherwise for the size of the dungeon
+        corpus, corpus_start = get_map_corpus(loops * len(game_type_map))
+        grid = corpus.grid if corpus is not None else get_grid_size(game_type)
+
         # Run the game
-        run_the_game(loops, game_type, game_type_map, key_map, names, run_name, chosen_llm, training_data)
+        run_the_game(loops, game_type, game_type_map, key_map, names, run_name, chosen_llm, training_data, grid,
+                     corpus, corpus_start)
     else:
         # Run control game
         loops = 100
@@ -345,51 +360,48 @@ def run_control_game(loops, names, game_type, run_name, llm):
     print_the_time("Batch Start")
     training_data = None
     starting_positions = None
+    pending = []
     """
     Function to run the control game.
     It runs the game for a specified number of loops with predefined settings.
     """
     for i in range(0, int(loops)):
         game_ids = []
-        # Select a random player name
-        player_name = random.choice(names)
+        # Derive this game's seed, the map and player name are drawn from their own streams of it
+        seed = game_seed(run_name, i, game_type)
+        player_name = pick_player_name(seed, names)
         # Create a player record and game IDs in the database
         player_id = connections.insert_update_control_data_mongo.create_player_record(player_name, game_type)
         game_id = connections.insert_update_control_data_mongo.create_game_ids(player_id)
         game_ids.append(player_id)
         game_ids.append(game_id)
-        # Generate a random game map
-        the_map = generate_random_rooms()
+        # Generate the game map, encounters and loot are assigned based on the game type
+        the_map = generate_game_map(seed, game_type)
         populated_map, client = None, None
-        # Assign encounters or loot based on the game type
         if game_type == 'a':
             alignment_key = "Lawful Good"
             motivation_key = None
-            the_map = assign_encounter(the_map)
             populated_map, client = load_descriptions(the_map)
             populated_map = load_encounters(populated_map, client, alignment_key)
         elif game_type == 'l':
             alignment_key = None
             motivation_key = "Wealth"
-            the_map = assign_loot(the_map)
             populated_map, client = load_descriptions(the_map)
             populated_map = load_loot(populated_map, client, motivation_key)
         elif game_type == 'b':
             alignment_key = "Lawful Good"
             motivation_key = "Wealth"
-            the_map = assign_encounter(the_map)
-            the_map = assign_loot(the_map)
             populated_map, client = load_descriptions(the_map)
             populated_map = load_encounters(populated_map, client, alignment_key)
             populated_map = load_loot(populated_map, client, motivation_key)
         else:
             print("This should literally never happen")
             exit(666)
-        # Update the game IDs with the base and populated maps
+        # Update the game IDs with the map seed and populated map, the base map can be regenerated from the seed
         connections.insert_update_control_data_mongo.update_game_ids(game_id,
-                                                                     "Base Map",
-                                                                     connections.insert_update_control_data_mongo.upload_base_map(
-                                                                         the_map))
+                                                                     "Map Seed",
+                                                                     connections.insert_update_control_data_mongo.upload_map_seed(
+                                                                         seed_record(run_name, i, game_type, game_type, seed, fingerprint_layout(the_map))))
         connections.insert_update_control_data_mongo.update_game_ids(game_id,
                                                                      "Populated Map",
                                                                      connections.insert_update_control_data_mongo.upload_populated_map(
@@ -397,62 +409,93 @@ def run_control_game(loops, names, game_type, run_name, llm):
         # Print the game map
         print_map(the_map)
         # Create a game configuration object
-        config = GameConfig(populated_map, game_ids, player_name, run_name, game_type, alignment_key, motivation_key, game_type, True, llm, training_data, starting_positions)
+        config = GameConfig(populated_map, game_ids, player_name, run_name, game_type, alignment_key, motivation_key, game_type, True, llm, training_data, starting_positions, seed)
         print(f"_________________________________\n"
               f"Welcome Player\t {player_name}\n"
               f"Alignment is: \t {alignment_key}\n"
               f"Motivation is:\t {motivation_key}\n"
               f"Run {i+1} of {loops}\n"
               f"_________________________________\n")
+        if GAMES_IN_FLIGHT > 1:
+            # Played together once the whole batch is set up
+            pending.append(config)
+            continue
         # Print the start time of the run
         print_the_time("Run Start")
         # Run the game
         run_game(config)
         # Print the end time of the run
         print_the_time("Run End")
+    if pending:
+        run_batch(pending)
     # Print the end time of the batch
+    report_response_cache()
+    report_rate_limiter()
+    report_history_metrics()
+    report_decode_metrics()
+    report_assistant_pool()
     print_the_time("Batch End")
 
-def run_the_game(loops, game_type, game_type_map, key_map, names, run_name, llm, training_data):
+def run_the_game(loops, game_type, game_type_map, key_map, names, run_name, llm, training_data, grid=None, corpus=None,
+                 corpus_start=0):
     # Print the start time of the batch
     print_the_time("Batch Start")
 
     starting_positions = None
+    pending = []
+    fingerprint_index = FingerprintIndex()
+    # The layouts of this batch's games, recorded in the index once they have been played
+    claimed = {}
+    corpus_index = corpus_start
 
     # Loop through the number of iterations specified by 'loops'
     for i in range(0, int(loops)):
         print(f"Batch: {i+1} of: {loops}")
         # Loop through each key in the game_type_map
         for key in game_type_map:
-            # Generate a random map
-            the_map = generate_random_rooms()
+            # Derive this game's seed, the map and player name are drawn from their own streams of it
+            seed = game_seed(run_name, i, key)
+            if corpus is not None:
+                # Maps come from the corpus in order, the experiment is the corpus slice that was played
+                the_map = corpus.layout(corpus_index, game_type)
+                corpus_index += 1
+            else:
+                the_map = generate_game_map(seed, game_type, grid)
 
-            # Assign encounters or loot based on the game type
+                # Skip layouts this profile already played with this model, retry seeds stay reproducible
+                attempt = 0
+                while is_repeat(fingerprint_index, claimed, key, llm, the_map, run_name, seed):
+                    attempt += 1
+                    seed = game_seed(run_name, f"{i}-{attempt}", key)
+                    the_map = generate_game_map(seed, game_type, grid)
+            claimed[(key, fingerprint_layout(the_map))] = (the_map, seed)
+
+            # Set the alignment and motivation based on the game type
             if game_type == "a":
                 alignment_key = key
                 motivation_key = None
-                the_map = assign_encounter(the_map)
             elif game_type == "l":
                 alignment_key = None
                 motivation_key = key
-                the_map = assign_loot(the_map)
             elif game_type == "b":
                 alignment_key = key_map[key.split("-")[0]]
                 motivation_key = key.split("-")[1]
-                the_map = assign_encounter(the_map)
-                the_map = assign_loot(the_map)
             else:
                 print("Something went horribly wrong")
                 exit(339)
 
-            # Select a random player name
-            player_name = random.choice(names)
+            player_name = pick_player_name(seed, names)
             game_ids = []
 
-            # Insert the base map into the database and its ID
-            if training_data == 1:
-                base_id = insert(base_map=the_map)
-                game_ids.append(base_id)
+            # Insert the map seed into the database and its ID, the base map can be regenerated from it
+            if int(training_data) == 1:
+                map_record = seed_record(run_name, i, key, game_type, seed, fingerprint_layout(the_map))
+                map_record["Features"] = layout_features(the_map)
+                if corpus is not None:
+                    map_record["Corpus"] = corpus.name
+                    map_record["Corpus Index"] = corpus_index - 1
+                seed_id = insert(map_seed=map_record)
+                game_ids.append(seed_id)
 
             # Load descriptions into the game map
             populated_map, client = load_descriptions(the_map)
@@ -467,7 +510,7 @@ def run_the_game(loops, game_type, game_type_map, key_map, names, run_name, llm,
                 populated_map = load_loot(populated_map, client, motivation_key)
 
             if int(training_data) == 2:
-                game_record = {"map_id":None, "player_id":None}
+                game_record = {"map_id":None, "player_id":None, "seed": seed}
                 game_record["map_id"] = connections.training_day_data.create_map_record()
                 game_record["player_id"] = connections.training_day_data.create_player_record(player_name,alignment_key, motivation_key, game_record["map_id"])
                 the_id = connections.training_day_data.create_game_record(game_record)
@@ -484,7 +527,7 @@ def run_the_game(loops, game_type, game_type_map, key_map, names, run_name, llm,
             print_map(the_map)
 
             # Create a game configuration object
-            config = GameConfig(populated_map, game_ids, player_name, run_name, game_type, alignment_key, motivation_key, key, False, llm, training_data, starting_positions)
+            config = GameConfig(populated_map, game_ids, player_name, run_name, game_type, alignment_key, motivation_key, key, False, llm, training_data, starting_positions, seed)
 
             # Print player details
             print(f"_________________________________\n"
@@ -493,19 +536,44 @@ def run_the_game(loops, game_type, game_type_map, key_map, names, run_name, llm,
                   f"Motivation is:\t {motivation_key}\n"
                   f"_________________________________\n")
 
+            if GAMES_IN_FLIGHT > 1:
+                # Played together once the whole batch is set up
+                pending.append(config)
+                continue
+
             # Print the start time of the run
             print_the_time("Run Start")
 
             # Run the game
             run_game(config)
+            fingerprint_index.add(key, llm, the_map, run_name, seed)
 
             # Print the end time of the run
             print_the_time("Run End")
 
         # Print the end time of the batch
 
+    if pending:
+        run_batch(pending)
+        for (key, _), (the_map, seed) in claimed.items():
+            fingerprint_index.add(key, llm, the_map, run_name, seed)
+    fingerprint_index.close()
+    report_response_cache()
+    report_rate_limiter()
+    report_history_metrics()
+    report_decode_metrics()
+    report_assistant_pool()
     print_the_time("Batch End")
 
+def is_repeat(fingerprint_index, claimed, key, llm, the_map, run_name, seed):
+    # A layout this profile played with this model in another game, or one an earlier game of this batch holds. The
+    # game that recorded it, the same run and seed, plays it again so reruns are reproducible
+    fingerprint = fingerprint_layout(the_map)
+    if (key, fingerprint) in claimed:
+        return True
+    recorded = fingerprint_index.recorded(key, llm, fingerprint)
+    return recorded is not None and recorded != (run_name, seed)
+
 def game_type_b(full_map, group_map):
     # Ask the user if they want to run the game with a specific alignment and motivation
     full_test = input("Would you like to run the game with a specific alignment and motivation? (y/n): ").lower()
@@ -606,6 +674,43 @@ def get_run_name(is_control):
         name = "Control_"+name
     return name.upper()
 
+def get_map_corpus(games):
+    # games: the maps the batch takes, consecutive from the first index, so all of them have to be in the corpus
+    path = input("Enter a map corpus file to draw maps from (press Enter to generate maps):\t").strip()
+    while True:
+        while path != "" and not os.path.isfile(path):
+            path = input("File not found. Enter a map corpus file or press Enter to generate maps:\t").strip()
+        if path == "":
+            return None, 0
+        corpus = MapCorpus(path)
+        if len(corpus) >= games:
+            break
+        print(f"{corpus.name} holds {len(corpus)} maps, this batch plays {games} games")
+        corpus.close()
+        path = input("Enter a larger map corpus file or press Enter to generate maps:\t").strip()
+    last = len(corpus) - games
+    start = input(f"The corpus holds {len(corpus)} maps, the batch plays {games}. "
+                  f"Enter the index of the first map to use (0-{last}):\t")
+    while not start.isdigit() or int(start) > last:
+        start = input(f"Please enter an index from 0 to {last}:\t")
+    return corpus, int(start)
+
+def get_grid_size(game_type):
+    # The grid has to hold the entrance, the exit and the rooms the game type places its content on
+    needed = min_rooms(game_type)
+    size = input("Enter the dungeon size as rows x columns (press Enter for 5x5):\t").lower().replace(" ", "")
+    while True:
+        if size == "":
+            return get_grid()
+        if size.count("x") != 1 or not all(part.isdigit() and int(part) > 1 for part in size.split("x")):
+            size = input("Please enter a size like 5x5 or 10x10:\t").lower().replace(" ", "")
+            continue
+        rows, cols = (int(part) for part in size.split("x"))
+        if rows * cols >= needed:
+            return get_grid(rows, cols)
+        size = input(f"A {size} dungeon has {rows * cols} rooms, this game type needs at least {needed}. "
+                     f"Please enter a larger size:\t").lower().replace(" ", "")
+
 def control_check():
     the_check = ""
     while the_check.lower() not in ['y', 'n']:
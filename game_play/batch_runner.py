@@ -0,0 +1,48 @@
+"""
+Plays a batch of prepared games concurrently on one event loop.
+
+Played one at a time, the model sits idle while a game writes to Mongo or prepares
+its next prompt. run_batch keeps up to GAMES_IN_FLIGHT games going (arun_game) and
+bounds the model requests in flight per backend, shared by all the games using it:
+- Llama: OLLAMA_NUM_PARALLEL, set it to the Ollama server's own setting (4 by default)
+- ChatGPT4o and ChatGPT4oChat: OPENAI_NUM_PARALLEL (4 by default), their turns run in
+  worker threads
+
+GAMES_IN_FLIGHT defaults to 1, which keeps run_the_game and run_control_game on the
+sequential run_game. A little more than the backend limit keeps the backend busy while
+some games are between turns.
+"""
+
+import asyncio
+import os
+
+from classes.llama_assistant import drop_chat_models
+from game_play.in_game import arun_game
+
+BACKEND_LIMITS = {
+    "Llama": int(os.getenv("OLLAMA_NUM_PARALLEL", "4")),
+    "ChatGPT4o": int(os.getenv("OPENAI_NUM_PARALLEL", "4")),
+    "ChatGPT4oChat": int(os.getenv("OPENAI_NUM_PARALLEL", "4")),
+}
+GAMES_IN_FLIGHT = int(os.getenv("GAMES_IN_FLIGHT", "1"))
+
+
+def run_batch(configs, games_in_flight=None):
+    # configs: the GameConfigs of the batch, set up (maps populated, records inserted) but not played
+    asyncio.run(_run_batch(configs, games_in_flight if games_in_flight is not None else GAMES_IN_FLIGHT))
+    # Their async clients belong to the loop that just closed
+    drop_chat_models()
+
+
+async def _run_batch(configs, games_in_flight):
+    # Semaphores belong to the running loop, so they are made here
+    limiters = {llm: asyncio.Semaphore(limit) for llm, limit in BACKEND_LIMITS.items()}
+    slots = asyncio.Semaphore(max(1, games_in_flight))
+
+    async def play(number, config):
+        async with slots:
+            print(f"Game {number + 1} of {len(configs)} started:\t{config.player_name} ({config.key})")
+            await arun_game(config, limiters.get(config.llm))
+            print(f"Game {number + 1} of {len(configs)} finished:\t{config.player_name} ({config.key})")
+
+    await asyncio.gather(*(play(number, config) for number, config in enumerate(configs)))
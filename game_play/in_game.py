@@ -1,13 +1,14 @@
 """
 Core game engine that runs the dungeon crawler gameplay loop.
 
-Handles player movement through the 5x5 dungeon grid, processes room interactions,
+Handles player movement through the dungeon grid, processes room interactions,
 manages turn counting, and coordinates with LLM assistants for decision-making.
 
 Key functions:
 - run_game(): Main gameplay loop from entrance to exit
+- arun_game(): The same loop for the async batch runner (see batch_runner)
 - find_entrance_exit(): Locates start/end positions on the map
-- end_game_steps(): Saves final game state and player data
+- end_game_steps(): Saves final game state and player data and returns the assistant to the pool
 
 Integrates with LLM assistants (GPT-4o, Llama) and logs all
 decisions for performance analysis.
@@ -18,28 +19,61 @@ import connections.training_day_data
 import utilities.glossary
 
 from map_visualization.ingame_map import print_ingame_map
-from game_play.in_room import gpt_process_room
+from map_population.content_catalog import get_catalog
+from game_play.in_room import agpt_process_room, gpt_process_room
 from classes.player import Player
 from connections.insert_update_mongo import insert, replace_player, update_ids
-from classes.the_assistant import GPTAssistant
-from classes.llama_assistant import OllamaAssistant
+from classes.assistant_pool import acquire_assistant, release_assistant
+from utilities.game_seed import stream_rng
+from map_creation.grid import get_grid
 
 
-def end_player_game_steps(record_id, status_message):
+def end_player_game_steps(record_id, status_message, assistant=None):
     connections.training_day_data.update_player_status(record_id, status_message)
-    pass
+    report_assistant_metrics(assistant)
+    release_assistant(assistant)
 
 
 def run_game(config):
 #def run_game(game_map, game_ids, player_name, run, game_type = None, alignment = None, motivation = None, key = None, control = None):
-    direction_map = {
-        "North": -5,
-        "South": 5,
-        "East": 1,
-        "West": -1
-    }
+    steps = game_steps(config)
+    try:
+        request = next(steps)
+        while True:
+            try:
+                direction = gpt_process_room(*request)
+            except Exception as e:
+                # Handled by the game loop the same way as an error inside it
+                request = steps.throw(e)
+                continue
+            request = steps.send(direction)
+    except StopIteration:
+        return None
+
+async def arun_game(config, limiter=None):
+    # run_game for the async batch runner, limiter bounds the requests in flight to this game's backend.
+    # The in-game map window is not drawn, many games share the process
+    steps = game_steps(config, render=False, limiter=limiter)
+    try:
+        request = next(steps)
+        while True:
+            try:
+                direction = await agpt_process_room(*request)
+            except Exception as e:
+                request = steps.throw(e)
+                continue
+            request = steps.send(direction)
+    except StopIteration:
+        return None
+
+def game_steps(config, render=True, limiter=None):
+    # The game loop as a generator: it yields the arguments of gpt_process_room for every room and is sent back the
+    # direction taken, so run_game and arun_game share it
     game_started = False
     game_map = config.populated_map
+    # Movement offsets come from the grid shared by every room of the map
+    grid = game_map[0].grid
+    direction_map = grid.offsets
     player_name = config.player_name
     run = config.run_name
     alignment = config.alignment_key
@@ -54,6 +88,8 @@ def run_game(config):
     else:
         training_data = 42
     turn_counter = 0
+    # In-game random events draw from the game's own stream so a seeded game can be replayed
+    rng = stream_rng(config.seed, "play") if config.seed is not None else random
 
     try:
         entrance, the_exit = find_entrance_exit(game_map)
@@ -89,18 +125,13 @@ def run_game(config):
         player_id = game_ids[0]
         key = "Control"
 
-    # Load the assistant for this round
-    if llm == "ChatGPT4o":
-        assistant = GPTAssistant(alignment, motivation, key)
-    elif llm == "Llama":
-        definition = None
-        if motivation is not None:
-            definition = utilities.glossary.get_definition(motivation)
-        assistant = OllamaAssistant(alignment, motivation, key, definition)
-    elif llm == "Anthropic":
-        pass
-    else:
-        pass
+    # Load the assistant for this round, an idle one from an earlier game of this process when there is one
+    definition = None
+    if llm in ("Llama", "ChatGPT4oChat") and motivation is not None:
+        definition = utilities.glossary.get_definition(motivation, get_catalog())
+    assistant = acquire_assistant(llm, alignment, motivation, key, definition, grid)
+    # Model requests of this game wait on the batch runner's limiter for its backend, None outside a batch
+    assistant.limiter = limiter
 
     prev_direction = None
     blocked_dir = None
@@ -113,7 +144,8 @@ def run_game(config):
 
     # Do this while the player is not in the exit square
     while new_loc != int(the_exit.loc):
-        print_ingame_map(game_map)
+        if render:
+            print_ingame_map(game_map)
         player.room_visit(current_loc)
         if game_started:
             game_map[current_loc].set_active()
@@ -124,26 +156,26 @@ def run_game(config):
                 if int(training_data) == 1:
                     end_game_steps(game_map, master_game_id, player, player_id, assistant)
                 else:
-                    end_player_game_steps(master_game_id, "Turns Exceeded")
-                return None
+                    end_player_game_steps(master_game_id, "Turns Exceeded", assistant)
+                return
             else:
                 # The player is only charged a turn if they move out of the room. So first step is to get the direction
                 # There are some items the player can get that will impact the state of the game so they are handled
                 # separately based on their codes after this step
-                direction = gpt_process_room(game_map,
-                                             current_loc,
-                                             player,
-                                             assistant,
-                                             blocked_dir,
-                                             player_id if control else None,
-                                             control if control else None,
-                                             master_game_id if int(training_data) == 2 else None
-                                             )
+                direction = yield (game_map,
+                                   current_loc,
+                                   player,
+                                   assistant,
+                                   blocked_dir,
+                                   player_id if control else None,
+                                   control if control else None,
+                                   master_game_id if int(training_data) == 2 else None
+                                   )
                 if direction == -42: # Send the player to the exit
                     new_loc = the_exit.loc
                 elif direction == 42: # Send the player to a square next to the exit
                     print(f"Player's current location:\t {current_loc}")
-                    new_loc = random.choice(get_adjacent_squares(the_exit.loc))
+                    new_loc = rng.choice(get_adjacent_squares(the_exit.loc, grid))
                     print(f"Player's new location:\t {new_loc}")
                     player.turns += 1
                 elif direction == -892:
@@ -151,15 +183,15 @@ def run_game(config):
                     if int(training_data) == 1:
                         end_game_steps(game_map, master_game_id, player, player_id, assistant, control)
                     else:
-                        end_player_game_steps(master_game_id, "Got Stuck")
-                    return None
+                        end_player_game_steps(master_game_id, "Got Stuck", assistant)
+                    return
                 elif direction == -79:
                     player.set_completion("Invalid Action Selection")
                     if int(training_data) == 1:
                         end_game_steps(game_map, master_game_id, player, player_id, assistant, control)
                     else:
-                        end_player_game_steps(master_game_id, "Invalid Action Selection")
-                    return None
+                        end_player_game_steps(master_game_id, "Invalid Action Selection", assistant)
+                    return
                 elif str(direction).isdigit() and direction != '':
                     try:
                         direction_adjustment = direction_map[game_map[current_loc].directions[int(direction)]]
@@ -178,8 +210,8 @@ def run_game(config):
             if training_data == 1:
                 end_game_steps(game_map, master_game_id, player, player_id, assistant, control)
             else:
-                end_player_game_steps(master_game_id, "Error")
-            return None
+                end_player_game_steps(master_game_id, "Error", assistant)
+            return
         if not game_started:
             game_started = True
         prev_loc = current_loc
@@ -190,16 +222,19 @@ def run_game(config):
     player.room_visit(the_exit.loc)
     game_map[current_loc].set_active()
     game_map[prev_loc].set_inactive()
-    print_ingame_map(game_map)
+    if render:
+        print_ingame_map(game_map)
     if int(training_data) == 1:
         end_game_steps(game_map, master_game_id, player, player_id, assistant, control)
     else:
-        end_player_game_steps(master_game_id, "Complete")
+        end_player_game_steps(master_game_id, "Complete", assistant)
 
 def end_game_steps(game_map, master_id, player, player_id, assistant, control=False):
     final_map_id = insert(final_game_map=game_map)
     update_ids(master_id, final_map_id)
     replace_player(player_id, player)
+    report_assistant_metrics(assistant)
+    release_assistant(assistant)
     if not control:
         print_the_prints(assistant, player)
 
@@ -216,25 +251,28 @@ def find_entrance_exit(game_map):
         exit(0)
     return entrance, the_exit
 
+def report_assistant_metrics(assistant):
+    # How long the assistant took to get ready, the API calls and thread size of GPTAssistant, then per game prompt
+    # tokens and retry rates of the chat history policy and the server's prefill numbers, OllamaAssistant only, and
+    # the decoded tokens and time per turn of the assistants that stream their replies
+    startup = getattr(assistant, "startup", None)
+    if startup is not None:
+        print(f"Assistant startup:\t{startup[0] * 1000:.1f} ms ({startup[1]})")
+    thread_ledger = getattr(assistant, "thread_ledger", None)
+    if thread_ledger is not None:
+        thread_ledger.report()
+    metrics = getattr(assistant, "metrics", None)
+    if metrics is not None:
+        metrics.report()
+        assistant.telemetry.report()
+    decode = getattr(assistant, "decode", None)
+    if decode is not None:
+        decode.report()
+
 def print_the_prints(assistant, player):
     player.print_core_details()
 
-def get_adjacent_squares(exit_loc):
-    values = [exit_loc + 1, exit_loc - 1, exit_loc + 5, exit_loc - 5]
-    if exit_loc // 5 == 0:
-        values.remove(exit_loc - 5)
-        if exit_loc == 0:
-            values.remove(exit_loc - 1)
-        elif exit_loc == 20:
-            values.remove(exit_loc + 1)
-    elif exit_loc // 5 == 4:
-        values.remove(exit_loc + 5)
-        if exit_loc == 4:
-            values.remove(exit_loc - 1)
-        elif exit_loc == 24:
-            values.remove(exit_loc + 1)
-    elif 0 < exit_loc < 4:
-        values.remove(exit_loc - 5)
-    elif 20 < exit_loc < 24:
-        values.remove(exit_loc + 5)
-    return values
\ No newline at end of file
+def get_adjacent_squares(exit_loc, grid=None):
+    if grid is None:
+        grid = get_grid()
+    return list(grid.neighbors[exit_loc])
\ No newline at end of file
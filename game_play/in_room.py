@@ -7,18 +7,42 @@ assistants, handles special room effects, and tracks decision scoring.
 
 Key functions:
 - gpt_process_room(): Main room processing loop for LLM decisions
-- get_player_action(): Gets and validates LLM responses with retry logic
+- agpt_process_room(): The same loop for the async game loop, both drive room_steps()
+- get_player_action(): Gets and validates LLM responses with retry logic, shared with the async
+  aget_player_action() through action_steps()
 - process_action(): Handles encounter/loot interactions and special effects
-- get_room_prompt(): Generates prompts sent to LLM with available actions
+- get_room_prompt(): Generates prompts sent to LLM with their Action rows
 
 Includes pattern detection to prevent LLMs from getting stuck in movement loops.
 """
-import re
+import asyncio
 import time
 import connections.training_day_data
 from connections.insert_update_control_data_mongo import update_player_reccord
 
 def gpt_process_room(game_map, loc, player, assistant, blocked_dir, player_id = None, is_control = None, master_id = None):
+    steps = room_steps(game_map, loc, player, assistant, blocked_dir, player_id, is_control, master_id)
+    try:
+        request = next(steps)
+        while True:
+            request = steps.send(get_player_action(*request))
+    except StopIteration as done:
+        return done.value
+
+async def agpt_process_room(game_map, loc, player, assistant, blocked_dir, player_id = None, is_control = None,
+                            master_id = None):
+    # gpt_process_room for the async game loop, the other games keep running while this one waits on the model
+    steps = room_steps(game_map, loc, player, assistant, blocked_dir, player_id, is_control, master_id)
+    try:
+        request = next(steps)
+        while True:
+            request = steps.send(await aget_player_action(*request))
+    except StopIteration as done:
+        return done.value
+
+def room_steps(game_map, loc, player, assistant, blocked_dir, player_id = None, is_control = None, master_id = None):
+    # The room loop as a generator: it yields the arguments of get_player_action and is sent back the action, so
+    # gpt_process_room and agpt_process_room share it. Its return value is the direction (or code) leaving the room
     room = game_map[loc]
     special_message = None
     turn = 0
@@ -39,16 +63,19 @@ def gpt_process_room(game_map, loc, player, assistant, blocked_dir, player_id =
             if isinstance(special_message, list) and special_message and special_message[0] == blocked_dir:
                 # blocked_dir is the first element of special_message
                 blocked_dir = None
-            message, point_dict = get_room_prompt(room, game_map, blocked_dir, special_message=special_message)
+            message, point_dict, actions = get_room_prompt(room, game_map, blocked_dir, special_message=special_message,
+                                                       profile=assistant.profile)
             special_message = None
         else:
-            message, point_dict = get_room_prompt(room, game_map, blocked_dir, special_message=None)
+            message, point_dict, actions = get_room_prompt(room, game_map, blocked_dir, special_message=None,
+                                                       profile=assistant.profile)
         if master_id is not None:
             turn_detail["Grid Location"] = loc
             turn_detail["Prompt"] = message
 
         # Now with the prompt (message) and points we can send it to the API
-        action = get_player_action(assistant, message, point_dict, player.alignment, room.encounter_active, special_message)
+        action = yield (assistant, message, point_dict, player.alignment, room.encounter_active, special_message,
+                        actions)
         if action == -892 or action == -79:
             return action
 
@@ -110,7 +137,7 @@ def gpt_process_room(game_map, loc, player, assistant, blocked_dir, player_id =
         else:
             turn_detail["Selected Action"] = action
             turn_detail["Action Type"] = determine_action_type(event)
-            turn_detail["Action Text"] = extract_action_string(turn_detail["Prompt"], action)
+            turn_detail["Action Text"] = action_text(actions, action)
             connections.training_day_data.update_player_turns(master_id, indexed_turn, turn_detail)
         try:
             if point_dict[action][0] in ["loot", "encounter"]:
@@ -124,18 +151,54 @@ def gpt_process_room(game_map, loc, player, assistant, blocked_dir, player_id =
             print(point_dict)
             exit(43)
 
-def get_player_action(assistant, message, point_dict, alignment, encounter_active, special_message):
-    # action = 99
+def get_player_action(assistant, message, point_dict, alignment, encounter_active, special_message, actions=None):
+    steps = action_steps(point_dict)
+    try:
+        debug, wait = next(steps)
+        while True:
+            if wait:
+                time.sleep(wait)
+            try:
+                action = assistant.turn_prompt(message, special_message, debug, actions=actions)
+            except Exception as e:
+                debug, wait = steps.throw(e)
+                continue
+            debug, wait = steps.send(action)
+    except StopIteration as done:
+        return done.value
+
+async def aget_player_action(assistant, message, point_dict, alignment, encounter_active, special_message, actions=None):
+    # get_player_action for the async game loop
+    steps = action_steps(point_dict)
+    try:
+        debug, wait = next(steps)
+        while True:
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                action = await assistant.aturn_prompt(message, special_message, debug, actions=actions)
+            except Exception as e:
+                debug, wait = steps.throw(e)
+                continue
+            debug, wait = steps.send(action)
+    except StopIteration as done:
+        return done.value
+
+def action_steps(point_dict):
+    # The retries of get_player_action as a generator shared with aget_player_action: every model call is a yielded
+    # (debug, seconds to wait first) that is sent back the action, the call's errors are thrown in. Its return value
+    # is the action
     stuck_counter = 0
     retry_attempts = 3
-    attempt = 0
     delay = 1
     debug = False
+    wait = 0
 
     for attempt in range(retry_attempts):
         try:
             while True:
-                action = assistant.turn_prompt(message, special_message, debug)
+                action = yield debug, wait
+                wait = 0
                 if action <= len(point_dict):
                     return action
                 else:
@@ -154,7 +217,7 @@ def get_player_action(assistant, message, point_dict, alignment, encounter_activ
                 print(f"Retrying in {delay} seconds")
                 print(f"Here's the action that's failing\n {e}")
                 debug = True
-                time.sleep(delay)
+                wait = delay
 
 def process_action(room, action, point_dict, player, game_map, special_message, loc):
     try:
@@ -177,25 +240,20 @@ def handle_special_room(room, player, game_map, special_message, loc):
             action_check = -42
         elif room.special == "ingame_map":  # Map of Dungeon
             special_message = {}
-            for current_room in game_map:
-                if current_room.visited:
-                    special_message[current_room.loc] = {
-                        "Had Loot": current_room.l_id != "None",
-                        "Had Encounter": current_room.re_id != "None",
-                        "Connecting Room": current_room.directions,
-                        "Is entrance": current_room.d_id == "entrance",
-                        "Current Location": current_room.player_active
-                    }
+            for visited_loc in room.state.locs(room.state.visited):
+                current_room = game_map[visited_loc]
+                special_message[current_room.loc] = {
+                    "Had Loot": current_room.l_id != "None",
+                    "Had Encounter": current_room.re_id != "None",
+                    "Connecting Room": current_room.directions,
+                    "Is entrance": current_room.d_id == "entrance",
+                    "Current Location": current_room.player_active
+                }
         elif room.special == "bell":  # Bell of turns
             special_message = 35 - player.turns
         elif room.special == "reset":  # Big red button
             player.turns = 0
-            for current_room in game_map:
-                if current_room.re_id != "None":
-                    current_room.encounter_active = True
-                if current_room.l_id != "None" and current_room.l_id != room.l_id:
-                    current_room.loot_active = True
-                current_room.visited = False
+            room.state.reset_content(keep_taken=room.loc)
         elif room.special == "exit_map":  # exit map?
             special_message = build_exit_path(game_map, loc)
         elif room.special == "next_to_exit":  # Hidden path
@@ -204,18 +262,18 @@ def handle_special_room(room, player, game_map, special_message, loc):
             player.turns -= 5
         elif room.special == "encounter_deactivate":  # The charm
             if player.alignment:
-                for cycle_room in game_map:
-                    if cycle_room.re_id:
-                        cycle_room.encounter_active = False
+                room.state.deactivate_encounters()
         return action_check, special_message
     else:
         special_message = None
     return action_check, special_message
 
-def get_room_prompt(room, game_map, blocked_dir, special_message=None):
+def get_room_prompt(room, game_map, blocked_dir, special_message=None, profile="full"):
+    # The prompt in the assistant's profile, its point table and the Action rows it was rendered from
     try:
-        prompt, point_dict = room.print_ingame_description(game_map, blocked_dir, special_message=special_message)
-        return prompt, point_dict
+        prompt, point_dict = room.print_ingame_description(game_map, blocked_dir, special_message=special_message,
+                                                           profile=profile)
+        return prompt, point_dict, room.current_actions(game_map, blocked_dir)
     except Exception as e:
         print(f"Error while generating the room prompt: {e}")
         print("Figure out a retry")
@@ -238,13 +296,12 @@ def build_exit_path(game_map, loc, exit_directions=None):
         next_loc = loc + game_map[loc].exit_map_dir_loc
         return build_exit_path(game_map, next_loc, exit_directions)
 
-def extract_action_string(prompt, action):
-    pattern = rf'\({action}\)(.*?)(?=\(|$)'
-    match = re.search(pattern, prompt, re.DOTALL)
-    if match:
-        return match.group(1).strip().split('\n')[0]
-    else:
+def action_text(actions, number):
+    # Text of the chosen option for the turn log, moves are logged without the "(This room has been explored)" note
+    action = actions.action(number)
+    if action is None:
         return None
+    return action.label if action.kind == "move" else action.text
 
 def determine_action_type(code):
     if code[0].lower() == 'r':
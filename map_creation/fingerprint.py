@@ -0,0 +1,133 @@
+"""
+Compact fingerprints for dungeon layouts and an on-disk index of played maps.
+
+A fingerprint is a 64-bit hash of a layout's integer encoding (see layout_codes),
+so two games played the same map exactly when their fingerprints match. With
+canonical=True the layout is first reduced to the smallest of its mirror/rotation
+images (8 on square grids, 4 on rectangular ones), which groups maps that are the
+same up to symmetry.
+
+FingerprintIndex keeps the fingerprints already played per profile and model in a
+local SQLite file, so batches can skip repeats and analyses can group identical
+maps without pulling map documents from Mongo. Layouts are recorded once their game has
+been played, with the run and seed that played them, so a rerun of a run finds its own
+games and plays the same maps again.
+"""
+
+import hashlib
+import os
+import sqlite3
+from functools import lru_cache
+
+import numpy as np
+
+from map_creation.grid import get_grid, grid_for_layout
+from map_creation.layout_codes import encode_layout
+
+DEFAULT_INDEX_PATH = os.getenv("MAP_FINGERPRINT_INDEX", "map_fingerprints.sqlite")
+
+
+@lru_cache(maxsize=None)
+def _symmetries(rows, cols):
+    # Room permutations that map the grid onto itself, identity first
+    cells = np.arange(rows * cols).reshape(rows, cols)
+    images = [cells, cells[::-1, ::-1], cells[::-1, :], cells[:, ::-1]]
+    if rows == cols:
+        images += [cells.T, cells.T[::-1, ::-1], cells.T[::-1, :], cells.T[:, ::-1]]
+    return tuple(image.ravel() for image in images)
+
+
+def _hash_codes(codes):
+    digest = hashlib.blake2b(np.ascontiguousarray(codes, dtype=np.uint8).tobytes(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def fingerprint_codes(codes, grid=None, canonical=False):
+    # Fingerprint of one encoded (rooms, 3) layout
+    if grid is None:
+        grid = get_grid()
+    if not canonical:
+        return _hash_codes(codes)
+    return min(_hash_codes(codes[perm]) for perm in _symmetries(grid.rows, grid.cols))
+
+
+def fingerprint_layout(layout, canonical=False):
+    # Fingerprint of a nested [row][col][3] layout from generate_random_rooms / assign_*
+    return fingerprint_codes(encode_layout(layout), grid_for_layout(layout), canonical)
+
+
+def fingerprint_batch(batch, grid=None, canonical=False):
+    # Fingerprints for every map of an (n, rooms, 3) batch from generate_map_batch
+    return [fingerprint_codes(codes, grid, canonical) for codes in batch]
+
+
+def fingerprint_hex(fingerprint):
+    # Fixed width text form, used for storage since Mongo and SQLite integers are signed
+    return f"{fingerprint:016x}"
+
+
+class FingerprintIndex:
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS played ("
+            "profile TEXT NOT NULL, model TEXT NOT NULL, fingerprint TEXT NOT NULL, canonical TEXT NOT NULL, "
+            "run TEXT, seed INTEGER, PRIMARY KEY (profile, model, fingerprint))"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS played_canonical ON played (profile, model, canonical)")
+        self.connection.commit()
+
+    def contains(self, profile, model, fingerprint, canonical=False):
+        column = "canonical" if canonical else "fingerprint"
+        row = self.connection.execute(
+            f"SELECT 1 FROM played WHERE profile = ? AND model = ? AND {column} = ? LIMIT 1",
+            (profile, model, fingerprint_hex(fingerprint)),
+        ).fetchone()
+        return row is not None
+
+    def recorded(self, profile, model, fingerprint):
+        # The (run, seed) that played the exact layout, None if it was never played
+        row = self.connection.execute(
+            "SELECT run, seed FROM played WHERE profile = ? AND model = ? AND fingerprint = ?",
+            (profile, model, fingerprint_hex(fingerprint)),
+        ).fetchone()
+        return tuple(row) if row is not None else None
+
+    def add(self, profile, model, layout, run_name=None, seed=None):
+        # Record a played layout, returns False if the exact layout was already recorded
+        fingerprint = fingerprint_layout(layout)
+        canonical = fingerprint_layout(layout, canonical=True)
+        cursor = self.connection.execute(
+            "INSERT OR IGNORE INTO played (profile, model, fingerprint, canonical, run, seed) VALUES (?, ?, ?, ?, ?, ?)",
+            (profile, model, fingerprint_hex(fingerprint), fingerprint_hex(canonical), run_name, seed),
+        )
+        self.connection.commit()
+        return cursor.rowcount == 1
+
+    def played(self, profile, model, canonical=False):
+        column = "canonical" if canonical else "fingerprint"
+        rows = self.connection.execute(
+            f"SELECT {column} FROM played WHERE profile = ? AND model = ?", (profile, model)
+        ).fetchall()
+        return {int(row[0], 16) for row in rows}
+
+    def groups(self, profile=None, model=None, canonical=True):
+        # Number of games per distinct layout, optionally filtered to one profile and/or model
+        column = "canonical" if canonical else "fingerprint"
+        query = f"SELECT {column}, COUNT(*) FROM played"
+        clauses, params = [], []
+        if profile is not None:
+            clauses.append("profile = ?")
+            params.append(profile)
+        if model is not None:
+            clauses.append("model = ?")
+            params.append(model)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        rows = self.connection.execute(query + f" GROUP BY {column}", params).fetchall()
+        return {int(fingerprint, 16): count for fingerprint, count in rows}
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,121 @@
+"""
+Shared neighbor and direction tables for rectangular dungeon grids.
+
+Rooms are numbered row by row (loc = row * cols + col). A Grid precomputes, for
+every room, the directions a player can move in, the room each direction leads to
+and the set of adjacent rooms. get_grid() builds each shape once per process and
+hands the same tables to the map generators, rooms, game loop and renderers, so
+neighbor lookups are plain tuple/dict reads on any grid size.
+
+Direction order per room matches the original 5x5 rules (top corners list the
+horizontal move first), since option numbering in the prompts depends on it.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+DEFAULT_ROWS = 5
+DEFAULT_COLS = 5
+
+
+class Grid:
+
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        self.offsets = {
+            "North": -cols,
+            "South": cols,
+            "East": 1,
+            "West": -1,
+        }
+        self.directions = tuple(self._room_directions(loc) for loc in range(self.size))
+        self.neighbors = tuple(tuple(loc + self.offsets[d] for d in self.directions[loc]) for loc in range(self.size))
+        self.neighbor_map = tuple(dict(zip(self.directions[loc], self.neighbors[loc])) for loc in range(self.size))
+        self.adjacent = tuple(frozenset(n) for n in self.neighbors)
+        # Neighbors as bitmasks (bit loc set for each adjacent room), used by GameState
+        self.neighbor_masks = tuple(sum(1 << n for n in neighbors) for neighbors in self.neighbors)
+        self._valid_exits = None
+        self._adjacency = None
+        self._distances = None
+
+    def __repr__(self):
+        return f"Grid({self.rows}x{self.cols})"
+
+    @property
+    def label(self):
+        return f"{self.rows}x{self.cols}"
+
+    def _room_directions(self, loc):
+        row, col = divmod(loc, self.cols)
+        north, south = row > 0, row < self.rows - 1
+        west, east = col > 0, col < self.cols - 1
+        if row == 0 and col in (0, self.cols - 1):
+            # Top corners offer the horizontal move before South
+            moves = [("East", east), ("West", west), ("South", south)]
+        else:
+            moves = [("North", north), ("South", south), ("East", east), ("West", west)]
+        return tuple(direction for direction, allowed in moves if allowed)
+
+    def exit_step(self, loc, exit_loc):
+        # First step of the row-then-column path from loc to the exit, as (direction, offset)
+        if loc == exit_loc:
+            return None, 0
+        room_row, room_col = divmod(loc, self.cols)
+        exit_row, exit_col = divmod(exit_loc, self.cols)
+        if room_row > exit_row:
+            return "North", self.offsets["North"]
+        elif room_row < exit_row:
+            return "South", self.offsets["South"]
+        elif exit_col < room_col:
+            return "West", self.offsets["West"]
+        return "East", self.offsets["East"]
+
+    def valid_exits(self):
+        # valid[e, x] is True when x may hold the exit for an entrance at e (not the same room, not adjacent)
+        if self._valid_exits is None:
+            valid = np.ones((self.size, self.size), dtype=bool)
+            for loc in range(self.size):
+                valid[loc, loc] = False
+                valid[loc, list(self.neighbors[loc])] = False
+            self._valid_exits = valid
+        return self._valid_exits
+
+    def adjacency_matrix(self):
+        # (rooms, rooms) 0/1 matrix, 1 where two rooms share a wall
+        if self._adjacency is None:
+            adjacency = np.zeros((self.size, self.size), dtype=np.int16)
+            for loc in range(self.size):
+                adjacency[loc, list(self.neighbors[loc])] = 1
+            self._adjacency = adjacency
+        return self._adjacency
+
+    def distances(self):
+        # (rooms, rooms) shortest path lengths in moves, one breadth first search per room
+        if self._distances is None:
+            distances = np.full((self.size, self.size), -1, dtype=np.int16)
+            for start in range(self.size):
+                distances[start, start] = 0
+                frontier = [start]
+                while frontier:
+                    next_frontier = []
+                    for loc in frontier:
+                        for neighbor in self.neighbors[loc]:
+                            if distances[start, neighbor] < 0:
+                                distances[start, neighbor] = distances[start, loc] + 1
+                                next_frontier.append(neighbor)
+                    frontier = next_frontier
+            self._distances = distances
+        return self._distances
+
+
+@lru_cache(maxsize=None)
+def get_grid(rows=DEFAULT_ROWS, cols=DEFAULT_COLS):
+    return Grid(rows, cols)
+
+
+def grid_for_layout(layout):
+    # Grid matching a nested [row][col][3] layout
+    return get_grid(len(layout), len(layout[0]))
@@ -0,0 +1,64 @@
+"""
+Integer encoding for dungeon layouts.
+
+The map generators produce a nested [row][column][description_id, encounter_id, loot_id]
+list of strings. Bulk tools (batch generation, corpora, fingerprints) work on a flat
+integer encoding of the same data instead, one uint8 triple per room:
+
+- Description: 1-23 for D1-D23, ENTRANCE_CODE for 'entrance', EXIT_CODE for 'exit'
+- Encounter: 1-9 for RE1-RE9
+- Loot: 1-12 for L1-L12
+
+0 always stands for 'None'. encode_layout() and decode_layout() convert between the
+two forms so the encoded maps can still be fed to load_descriptions and print_map.
+"""
+
+import numpy as np
+
+NUM_DESCRIPTIONS = 23
+NUM_ENCOUNTERS = 9
+NUM_LOOT = 12
+
+NONE_CODE = 0
+ENTRANCE_CODE = 254
+EXIT_CODE = 255
+
+# Lookup tables from code to the string ids used by the rest of the game
+DESCRIPTION_IDS = ['None'] * 256
+for _i in range(1, NUM_DESCRIPTIONS + 1):
+    DESCRIPTION_IDS[_i] = f'D{_i}'
+DESCRIPTION_IDS[ENTRANCE_CODE] = 'entrance'
+DESCRIPTION_IDS[EXIT_CODE] = 'exit'
+ENCOUNTER_IDS = ['None'] + [f'RE{i}' for i in range(1, NUM_ENCOUNTERS + 1)]
+LOOT_IDS = ['None'] + [f'L{i}' for i in range(1, NUM_LOOT + 1)]
+
+# And back again
+DESCRIPTION_CODES = {name: code for code, name in enumerate(DESCRIPTION_IDS) if name != 'None'}
+DESCRIPTION_CODES['None'] = NONE_CODE
+ENCOUNTER_CODES = {name: code for code, name in enumerate(ENCOUNTER_IDS)}
+LOOT_CODES = {name: code for code, name in enumerate(LOOT_IDS)}
+
+
+def encode_layout(layout):
+    # Flatten a [row][col][3] layout into a (rooms, 3) uint8 array
+    rooms = [room for row in layout for room in row]
+    codes = np.zeros((len(rooms), 3), dtype=np.uint8)
+    for i, (desc_id, encounter_id, loot_id) in enumerate(rooms):
+        codes[i, 0] = DESCRIPTION_CODES[desc_id]
+        codes[i, 1] = ENCOUNTER_CODES[encounter_id]
+        codes[i, 2] = LOOT_CODES[loot_id]
+    return codes
+
+
+def decode_layout(codes, cols=5):
+    # Convert a (rooms, 3) array back into the nested list layout used by the game
+    desc, encounters, loot = np.asarray(codes).T.tolist()
+    rooms = [[DESCRIPTION_IDS[d], ENCOUNTER_IDS[e], LOOT_IDS[l]] for d, e, l in zip(desc, encounters, loot)]
+    return [rooms[i:i + cols] for i in range(0, len(rooms), cols)]
+
+
+def min_rooms(game_type="b"):
+    # The entrance and exit, plus a room for each encounter or loot item the game type places. Encounters and loot
+    # are placed independently and may share a room
+    content = {"a": NUM_ENCOUNTERS, "l": NUM_LOOT}.get(game_type, max(NUM_ENCOUNTERS, NUM_LOOT))
+    return content + 2
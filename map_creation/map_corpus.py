@@ -0,0 +1,132 @@
+"""
+Binary corpus of pregenerated dungeon layouts that workers can memory-map.
+
+File layout (little endian):
+- Header, HEADER_SIZE bytes: magic, format version, grid rows and columns,
+  record size, map count and the seed the corpus was generated from
+- Offset index: one uint64 byte offset per map
+- Records: one fixed-width uint8 record per map, the (rooms, 3) integer encoding
+  of description, encounter and loot ids from layout_codes
+
+MapCorpus maps the file read-only and hands out NumPy views into it, so reading a
+map by index does no parsing and opening a corpus of millions of maps is a file open.
+build_corpus() writes a corpus from generate_map_batch() in fixed-size chunks.
+
+The difficulty features of every map (see map_features) are computed while the
+corpus is built and saved beside it as <path>.features.npy, row i describing map i.
+"""
+
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from map_creation.batch_generation import generate_map_batch
+from map_creation.grid import get_grid
+from map_creation.layout_codes import decode_layout
+from map_creation.map_features import FEATURE_DTYPE, compute_features
+
+MAGIC = b"NPCMAPS\0"
+VERSION = 1
+HEADER_FORMAT = "<8sHHHHQQ"
+HEADER_SIZE = 64
+
+
+def build_corpus(path, count, seed=0, grid=None, chunk_size=100000):
+    if grid is None:
+        grid = get_grid()
+
+    # Every chunk gets its own child seed so the corpus only depends on (count, seed, chunk_size)
+    chunks = range(0, count, chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    batches = (generate_map_batch(min(chunk_size, count - start), chunk_seed, grid)
+               for start, chunk_seed in zip(chunks, seeds))
+    return write_corpus(path, batches, count, grid, seed)
+
+
+def write_corpus(path, batches, count, grid=None, seed=0):
+    # Write already generated batches, e.g. from the stratified sampler, as a corpus of `count` maps
+    if grid is None:
+        grid = get_grid()
+    record_size = grid.size * 3
+    data_start = HEADER_SIZE + 8 * count
+    offsets = data_start + np.arange(count, dtype="<u8") * record_size
+    features = np.lib.format.open_memmap(features_path(path), mode="w+", dtype=FEATURE_DTYPE, shape=(count,))
+
+    written = 0
+    with open(path, "wb") as file:
+        header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, grid.rows, grid.cols, record_size, count, seed)
+        file.write(header.ljust(HEADER_SIZE, b"\0"))
+        file.write(offsets.tobytes())
+        for batch in batches:
+            file.write(np.ascontiguousarray(batch, dtype=np.uint8).tobytes())
+            features[written:written + len(batch)] = compute_features(batch, grid)
+            written += len(batch)
+    features.flush()
+    del features
+    if written != count:
+        raise ValueError(f"Expected {count} maps for {path}, got {written}")
+    return path
+
+
+def features_path(path):
+    return f"{path}.features.npy"
+
+
+class MapCorpus:
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, rows, cols, record_size, count, seed = struct.unpack_from(HEADER_FORMAT, self.buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} map corpus")
+        self.grid = get_grid(rows, cols)
+        self.record_size = record_size
+        self.count = count
+        self.seed = seed
+        self.offsets = np.frombuffer(self.buffer, dtype="<u8", count=count, offset=HEADER_SIZE)
+        self._features = None
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        # Zero-copy (rooms, 3) view of one map
+        offset = int(self.offsets[index])
+        return np.frombuffer(self.buffer, dtype=np.uint8, count=self.record_size, offset=offset).reshape(-1, 3)
+
+    def slice(self, start, stop):
+        # Zero-copy (n, rooms, 3) view of consecutive maps
+        stop = min(stop, self.count)
+        offset = int(self.offsets[start])
+        return np.frombuffer(self.buffer, dtype=np.uint8, count=(stop - start) * self.record_size,
+                             offset=offset).reshape(stop - start, -1, 3)
+
+    def layout(self, index, game_type="b"):
+        # Nested list layout for load_descriptions, keeping only the content used by the game type
+        codes = self[index].copy()
+        if game_type == "l":
+            codes[:, 1] = 0
+        elif game_type == "a":
+            codes[:, 2] = 0
+        return decode_layout(codes, self.grid.cols)
+
+    @property
+    def features(self):
+        # Memory-mapped feature records stored beside the corpus, None for corpora built without them
+        if self._features is None and os.path.isfile(features_path(self.path)):
+            self._features = np.load(features_path(self.path), mmap_mode="r")
+        return self._features
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    def close(self):
+        self.offsets = None
+        self._features = None
+        self.buffer.close()
+        self.file.close()
@@ -0,0 +1,101 @@
+"""
+Difficulty features for generated layouts, computed once per map.
+
+compute_features() takes an (n, rooms, 3) batch in the layout_codes encoding and
+returns one record per map in a NumPy structured array:
+
+- entrance, exit: room locations
+- path_length: shortest path from entrance to exit in moves (BFS over the grid)
+- path_rooms: number of rooms that lie on at least one shortest path
+- aoe_cues_on_path: shortest-path rooms where the player senses an adjacent encounter or loot
+- <special>_distance: moves from the entrance to each special loot item, -1 when not on the map
+- specials_near_encounters: special loot items sharing a room with or next to an encounter
+- encounters_near_entrance: encounters within NEAR_ENTRANCE moves of the entrance
+- encounter_density_near_entrance: the same count divided by the rooms in that radius
+
+Everything is vectorized across the batch using the grid's precomputed distance
+and adjacency tables, so features for millions of maps can be stored next to the
+maps (see map_corpus) and used to stratify or filter games without rebuilding rooms.
+"""
+
+import numpy as np
+
+from map_creation.grid import get_grid, grid_for_layout
+from map_creation.layout_codes import ENTRANCE_CODE, EXIT_CODE, NUM_ENCOUNTERS, NUM_LOOT, encode_layout
+
+NEAR_ENTRANCE = 2
+
+# Content facts mirrored from utilities/populate_random_encounters.py and populate_random_loot.py
+ENCOUNTER_AOE = np.array([0] + [1] * NUM_ENCOUNTERS, dtype=bool)
+LOOT_AOE = np.zeros(NUM_LOOT + 1, dtype=bool)
+LOOT_AOE[[1, 2, 4, 8]] = True
+LOOT_SPECIALS = {
+    5: "end_game",
+    6: "encounter_deactivate",
+    7: "ingame_map",
+    8: "bell",
+    9: "reset",
+    10: "exit_map",
+    11: "turn_minus_5",
+    12: "next_to_exit",
+}
+
+FEATURE_DTYPE = np.dtype(
+    [("entrance", np.int16), ("exit", np.int16), ("path_length", np.int16), ("path_rooms", np.int16),
+     ("aoe_cues_on_path", np.int16)]
+    + [(f"{name}_distance", np.int16) for name in LOOT_SPECIALS.values()]
+    + [("specials_near_encounters", np.int16)]
+    + [("encounters_near_entrance", np.int16), ("encounter_density_near_entrance", np.float32)]
+)
+
+
+def compute_features(batch, grid=None):
+    if grid is None:
+        grid = get_grid()
+    batch = np.asarray(batch)
+    n = len(batch)
+    rows = np.arange(n)
+    distances = grid.distances()
+    features = np.zeros(n, dtype=FEATURE_DTYPE)
+
+    description, encounters, loot = batch[:, :, 0], batch[:, :, 1], batch[:, :, 2]
+    entrance = (description == ENTRANCE_CODE).argmax(axis=1)
+    the_exit = (description == EXIT_CODE).argmax(axis=1)
+    from_entrance = distances[entrance]
+    from_exit = distances[the_exit]
+    path_length = from_entrance[rows, the_exit]
+
+    # A room is on a shortest path when going through it costs no extra moves
+    on_path = (from_entrance + from_exit) == path_length[:, None]
+
+    # A room gets an AOE cue when any neighbor holds an encounter or loot with an area of effect
+    emitters = ENCOUNTER_AOE[encounters] | LOOT_AOE[loot]
+    cued = (emitters.astype(np.int16) @ grid.adjacency_matrix()) > 0
+
+    features["entrance"] = entrance
+    features["exit"] = the_exit
+    features["path_length"] = path_length
+    features["path_rooms"] = on_path.sum(axis=1)
+    features["aoe_cues_on_path"] = (on_path & cued).sum(axis=1)
+
+    for code, name in LOOT_SPECIALS.items():
+        placed = loot == code
+        distance = from_entrance[rows, placed.argmax(axis=1)]
+        features[f"{name}_distance"] = np.where(placed.any(axis=1), distance, -1)
+
+    # Specials guarded by an encounter in the same room or next door
+    has_encounter = encounters > 0
+    guarded = has_encounter | ((has_encounter.astype(np.int16) @ grid.adjacency_matrix()) > 0)
+    features["specials_near_encounters"] = ((loot >= min(LOOT_SPECIALS)) & guarded).sum(axis=1)
+
+    near = (from_entrance > 0) & (from_entrance <= NEAR_ENTRANCE)
+    encounters_near = (has_encounter & near).sum(axis=1)
+    features["encounters_near_entrance"] = encounters_near
+    features["encounter_density_near_entrance"] = encounters_near / near.sum(axis=1)
+    return features
+
+
+def layout_features(layout):
+    # Features of a single nested list layout as a plain dict, e.g. for a Mongo record
+    record = compute_features(encode_layout(layout)[None], grid_for_layout(layout))[0]
+    return {name: record[name].item() for name in FEATURE_DTYPE.names}
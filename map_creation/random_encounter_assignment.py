@@ -1,40 +1,37 @@
 import random
-def assign_encounter(layout):
+def assign_encounter(layout, rng=None):
     """
     This function assigns random encounters to the rooms in the layout.
 
     Parameters:
     layout (list): A 2D list representing the layout of the rooms.
+    rng (random.Random): Optional per-game random stream, defaults to the global random module.
 
     Returns:
     layout (list): The updated layout with the assigned encounters.
     """
 
+    if rng is None:
+        rng = random
+
     # Create a list of encounter room IDs from 'RE1' to 'RE9'
     encounter_rooms = [f'RE{i}' for i in range(1, 10)]
 
     # Shuffle the list of encounter rooms to ensure randomness
-    random.shuffle(encounter_rooms)
-
-    # Initialize a list of valid rooms with 'None' placeholders
-    valid_rooms = ['None' for _ in range(1, 24)]
-    x = 0
+    rng.shuffle(encounter_rooms)
 
-    # Iterate over the layout to find valid rooms (not 'entrance' or 'exit')
-    for i in range(len(layout)):
-        for j in range(len(layout[i])):
-            if layout[i][j][0] != 'entrance' and layout[i][j][0] != 'exit':
-                # If a valid room is found, store its position in the valid_rooms list
-                valid_rooms[x] = i*5+j
-                x += 1
+    # Find valid rooms (not 'entrance' or 'exit') and store their positions
+    cols = len(layout[0])
+    valid_rooms = [i*cols+j for i in range(len(layout)) for j in range(cols)
+                   if layout[i][j][0] != 'entrance' and layout[i][j][0] != 'exit']
 
     # Randomly select rooms from the valid_rooms list equal to the number of encounter rooms
-    valid_rooms = random.sample(valid_rooms, len(encounter_rooms))
+    valid_rooms = rng.sample(valid_rooms, len(encounter_rooms))
 
     # Assign an encounter room to each of the selected valid rooms
     for pos in valid_rooms:
-        row = pos // 5
-        col = pos % 5
+        row = pos // cols
+        col = pos % cols
         layout[row][col][1] = encounter_rooms.pop()
 
     # Return the updated layout with the assigned encounters
@@ -0,0 +1,104 @@
+"""
+Stratified map sampling with per-stratum quotas.
+
+Uniform generation rarely produces some configurations (exit far from the entrance,
+special loot guarded by encounters), so covering them used to mean playing more
+LLM games. sample_stratified() instead fills explicit quotas over layout features.
+
+Strata are defined by bucket edges per feature from map_features, for example:
+
+    strata = {"path_length": [2, 4, 6, 9], "specials_near_encounters": [0, 3, 6, 9]}
+    quotas = {(0, 0): 50, (2, 1): 50}      # keys are one bucket index per feature, in order
+
+Bucket i of a feature holds values with edges[i] <= value < edges[i + 1].
+
+Two features are controlled constructively, so their quotas are met without rejection:
+- path_length: entrance/exit pairs are drawn from the distribution conditioned on the
+  bucket (generate_map_batch(path_length=...))
+- specials_near_encounters: after encounters are placed, the special loot is dealt
+  into guarded and unguarded rooms with a target count drawn from the bucket. Maps
+  whose encounters leave no room for the bucket keep their loot and fall out below
+
+Quotas over any other feature are filled in the same single pass by bucketing a
+vectorized pool of pool_factor maps per requested map. A stratum the pool cannot fill
+is reported in the returned shortfall rather than regenerated in a loop.
+
+The result can be written with map_corpus.write_corpus() and played from the corpus.
+"""
+
+import numpy as np
+
+from map_creation.batch_generation import generate_map_batch
+from map_creation.grid import get_grid
+from map_creation.layout_codes import ENTRANCE_CODE, EXIT_CODE, NUM_LOOT
+from map_creation.map_features import LOOT_SPECIALS, compute_features
+
+FIRST_SPECIAL = min(LOOT_SPECIALS)
+NUM_SPECIALS = len(LOOT_SPECIALS)
+
+
+def bucket_index(values, edges):
+    # Bucket of every value, -1 when outside the edges
+    index = np.digitize(values, edges) - 1
+    return np.where((values >= edges[0]) & (values < edges[-1]), index, -1)
+
+
+def _ranks(rng, eligible):
+    # Random rank of every eligible room within its map, ineligible rooms rank last
+    keys = np.where(eligible, rng.random(eligible.shape), 2.0)
+    return np.argsort(np.argsort(keys, axis=1), axis=1)
+
+
+def deal_guarded_specials(batch, grid, low, high, rng):
+    # Re-place the loot of every map so that between low and high specials share a room with or sit next to
+    # an encounter. Placement is uniform given the drawn count. Returns the maps where that was possible
+    description, encounters = batch[:, :, 0], batch[:, :, 1]
+    free = (description != ENTRANCE_CODE) & (description != EXIT_CODE)
+    has_encounter = encounters > 0
+    guarded = has_encounter | ((has_encounter.astype(np.int16) @ grid.adjacency_matrix()) > 0)
+    guarded_free, open_free = guarded & free, ~guarded & free
+
+    low = np.maximum(low, NUM_SPECIALS - open_free.sum(axis=1))
+    high = np.minimum(high, guarded_free.sum(axis=1))
+    feasible = low <= high
+    target = low + np.floor(rng.random(len(batch)) * (high - low + 1)).astype(int)
+
+    specials = ((guarded_free & (_ranks(rng, guarded_free) < target[:, None]))
+                | (open_free & (_ranks(rng, open_free) < (NUM_SPECIALS - target)[:, None])))
+    regular = free & ~specials
+
+    # Specials get codes L5-L12 and the regular items L1-L4, both in random order
+    regular_rank = _ranks(rng, regular)
+    loot = np.where(specials, FIRST_SPECIAL + _ranks(rng, specials), 0)
+    loot = np.where(regular & (regular_rank < NUM_LOOT - NUM_SPECIALS), 1 + regular_rank, loot)
+
+    batch[feasible, :, 2] = loot[feasible]
+    return feasible
+
+
+def sample_stratified(quotas, strata, seed=None, grid=None, pool_factor=4):
+    if grid is None:
+        grid = get_grid()
+    names = list(strata)
+    seeds = np.random.SeedSequence(seed).spawn(len(quotas))
+
+    batches, features, labels = [], [], []
+    shortfall = {}
+    for (key, quota), stratum_seed in zip(quotas.items(), seeds):
+        rng = np.random.default_rng(stratum_seed)
+        bounds = {name: (strata[name][bucket], strata[name][bucket + 1] - 1) for name, bucket in zip(names, key)}
+
+        pool = generate_map_batch(pool_factor * quota, rng, grid, bounds.get("path_length"))
+        if "specials_near_encounters" in bounds:
+            deal_guarded_specials(pool, grid, *bounds["specials_near_encounters"], rng)
+
+        pool_features = compute_features(pool, grid)
+        buckets = np.stack([bucket_index(pool_features[name], strata[name]) for name in names], axis=1)
+        chosen = np.flatnonzero((buckets == np.array(key)).all(axis=1))[:quota]
+        if len(chosen) < quota:
+            shortfall[key] = quota - len(chosen)
+        batches.append(pool[chosen])
+        features.append(pool_features[chosen])
+        labels.extend([key] * len(chosen))
+
+    return np.concatenate(batches), np.concatenate(features), labels, shortfall
@@ -0,0 +1,111 @@
+"""
+Versioned local bundle of the game content, so games can run without reaching Mongo.
+
+A bundle is a single SQLite file:
+- meta: format version, content version and build details
+- content: one row per document (collection, id, JSON body, sha256 checksum)
+
+The content version is a sha256 over every document checksum, so two bundles built
+from the same content have the same version and any edit produces a new one.
+read_bundle() verifies every checksum and raises ValueError on a corrupt or foreign file.
+
+Bundles are written by utilities/build_content_bundle.py and loaded through
+ContentCatalog.from_bundle(), or for every game by setting CONTENT_BUNDLE to the path.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+FORMAT_VERSION = 1
+# Same names as the Mongo collections, including the spelling used by populate_definitions.py
+COLLECTIONS = ("RoomDescriptions", "RandomEncounters", "RandomLoot", "GameDefinitons")
+DEFAULT_BUNDLE_PATH = os.getenv("CONTENT_BUNDLE")
+
+
+def _document_body(document):
+    # Canonical JSON so the checksum does not depend on key order
+    return json.dumps(document, sort_keys=True, separators=(",", ":"))
+
+
+def _checksum(body):
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def _content_version(checksums):
+    digest = hashlib.sha256()
+    for checksum in sorted(checksums):
+        digest.update(checksum.encode("ascii"))
+    return digest.hexdigest()
+
+
+def write_bundle(path, collections, source=""):
+    # collections: {collection name: [documents with an "_id"]}
+    rows = []
+    for collection, documents in collections.items():
+        if collection not in COLLECTIONS:
+            raise ValueError(f"Unknown content collection {collection}")
+        for document in documents:
+            body = _document_body(document)
+            rows.append((collection, document["_id"], body, _checksum(body)))
+    version = _content_version(row[3] for row in rows)
+
+    if os.path.exists(path):
+        os.remove(path)
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    connection.execute(
+        "CREATE TABLE content (collection TEXT NOT NULL, id TEXT NOT NULL, body TEXT NOT NULL, "
+        "checksum TEXT NOT NULL, PRIMARY KEY (collection, id))"
+    )
+    connection.executemany("INSERT INTO content VALUES (?, ?, ?, ?)", rows)
+    connection.executemany("INSERT INTO meta VALUES (?, ?)", [
+        ("format_version", str(FORMAT_VERSION)),
+        ("content_version", version),
+        ("built_at", time.strftime("%Y-%m-%dT%H:%M:%S")),
+        ("source", source),
+    ])
+    connection.commit()
+    connection.close()
+    return version
+
+
+def _read_meta(connection, path):
+    try:
+        meta = dict(connection.execute("SELECT key, value FROM meta").fetchall())
+    except sqlite3.DatabaseError:
+        raise ValueError(f"{path} is not a content bundle")
+    if meta.get("format_version") != str(FORMAT_VERSION):
+        raise ValueError(f"{path} is not a version {FORMAT_VERSION} content bundle")
+    return meta
+
+
+def bundle_version(path):
+    # Content version of a bundle without reading the documents
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return _read_meta(connection, path)["content_version"]
+    finally:
+        connection.close()
+
+
+def read_bundle(path):
+    # Returns ({collection name: {id: document}}, content version)
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        meta = _read_meta(connection, path)
+        collections = {collection: {} for collection in COLLECTIONS}
+        checksums = []
+        for collection, _id, body, checksum in connection.execute("SELECT collection, id, body, checksum FROM content"):
+            if _checksum(body) != checksum:
+                raise ValueError(f"Checksum mismatch for {collection}/{_id} in {path}")
+            collections.setdefault(collection, {})[_id] = json.loads(body)
+            checksums.append(checksum)
+    finally:
+        connection.close()
+
+    if _content_version(checksums) != meta["content_version"]:
+        raise ValueError(f"Content version mismatch in {path}, the bundle is incomplete")
+    return collections, meta["content_version"]
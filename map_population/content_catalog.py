@@ -0,0 +1,121 @@
+"""
+Process-wide cache of the game content stored in MongoDB.
+
+The room descriptions, random encounters and random loot collections are loaded
+once per process into a ContentCatalog. The catalog also interns one immutable
+template per (encounter id, alignment) and (loot id, motivation), see room_templates,
+so populating a map is a set of dictionary lookups instead of a find_one per room and
+every game's rooms share the same template objects.
+
+The catalog remembers the version from the ContentVersion document and re-checks it
+at most once every version_ttl seconds. When the populate scripts bump the version
+(bump_content_version), the next check reloads the content. Between checks,
+populating a map makes no network calls.
+
+A catalog built with from_bundle() reads a local content bundle (see content_bundle)
+instead and never touches Mongo; its version check re-reads the bundle's content
+version. get_catalog() uses the bundle named by CONTENT_BUNDLE when it is set.
+"""
+
+import time
+
+from classes.room_templates import encounter_template, loot_template
+from map_population.content_bundle import DEFAULT_BUNDLE_PATH, bundle_version, read_bundle
+
+VERSION_ID = "content"
+DEFAULT_VERSION_TTL = 300
+
+
+def _mongo_client():
+    # Imported here so games running from a bundle do not need the database settings
+    from connections.mongo_db import get_connection_details
+    return get_connection_details()
+
+
+class ContentCatalog:
+
+    def __init__(self, client=None, version_ttl=DEFAULT_VERSION_TTL, bundle_path=None):
+        self.bundle_path = bundle_path
+        if client is None and bundle_path is None:
+            client = _mongo_client()
+        self.client = client
+        self.version_ttl = version_ttl
+        self.version = None
+        self.loaded = False
+        self.checked_at = 0.0
+        self.descriptions = {}
+        self.encounters = {}
+        self.loot = {}
+        self.definitions = {}
+        self._encounter_templates = {}
+        self._loot_templates = {}
+
+    @classmethod
+    def from_bundle(cls, path, version_ttl=DEFAULT_VERSION_TTL):
+        return cls(version_ttl=version_ttl, bundle_path=path)
+
+    def load(self):
+        if self.bundle_path is not None:
+            collections, self.version = read_bundle(self.bundle_path)
+        else:
+            db = self.client["GameDetails"]
+            self.version = self.fetch_version()
+            collections = {
+                name: {doc["_id"]: doc for doc in db[name].find()}
+                for name in ("RoomDescriptions", "RandomEncounters", "RandomLoot", "GameDefinitons")
+            }
+        self.descriptions = {_id: desc["description"] for _id, desc in collections["RoomDescriptions"].items()}
+        self.encounters = collections["RandomEncounters"]
+        self.loot = collections["RandomLoot"]
+        self.definitions = {doc["item"]: doc["definition"] for doc in collections["GameDefinitons"].values()}
+        self._encounter_templates = {}
+        self._loot_templates = {}
+        self.loaded = True
+        self.checked_at = time.monotonic()
+
+    def fetch_version(self):
+        if self.bundle_path is not None:
+            return bundle_version(self.bundle_path)
+        doc = self.client["GameDetails"]["ContentVersion"].find_one({"_id": VERSION_ID})
+        return doc["version"] if doc else None
+
+    def ensure_fresh(self):
+        # Load on first use, afterwards only compare the version once per ttl
+        if not self.loaded:
+            self.load()
+        elif time.monotonic() - self.checked_at >= self.version_ttl:
+            self.checked_at = time.monotonic()
+            if self.fetch_version() != self.version:
+                self.load()
+        return self
+
+    # region Templates
+    def encounter_template(self, re_id, alignment):
+        key = (re_id, alignment)
+        if key not in self._encounter_templates:
+            self._encounter_templates[key] = encounter_template(self.encounters[re_id], alignment)
+        return self._encounter_templates[key]
+
+    def loot_template(self, l_id, motivation):
+        key = (l_id, motivation)
+        if key not in self._loot_templates:
+            self._loot_templates[key] = loot_template(self.loot[l_id], motivation)
+        return self._loot_templates[key]
+    # endregion
+
+
+_catalog = None
+
+
+def get_catalog():
+    global _catalog
+    if _catalog is None:
+        _catalog = ContentCatalog(bundle_path=DEFAULT_BUNDLE_PATH)
+    return _catalog.ensure_fresh()
+
+
+def bump_content_version(client=None):
+    # Called after the content collections change so running catalogs reload them
+    if client is None:
+        client = _mongo_client()
+    client["GameDetails"]["ContentVersion"].update_one({"_id": VERSION_ID}, {"$inc": {"version": 1}}, upsert=True)
@@ -1,31 +1,29 @@
 # Import necessary modules
-from connections.mongo_db import get_connection_details
+from classes.game_state import GameState
 from classes.room_layout import BlankRoom
+from map_creation.grid import grid_for_layout
+from map_population.content_catalog import get_catalog
 
 # Function to load descriptions
 def load_descriptions(the_map):
-    # Get connection details
-    client = get_connection_details()
+    # Descriptions come from the process-wide content catalog, loaded once
+    catalog = get_catalog()
     # Initialize room_encounters list
     room_encounters = []
+    # Every room shares the neighbor tables of the map's grid and one GameState for its flags
+    grid = grid_for_layout(the_map)
+    state = GameState(grid)
 
     try:
-        # Access the "GameDetails" database
-        db = client["GameDetails"]
-        # Access the "RoomDescriptions" collection
-        collection = db["RoomDescriptions"]
-
-        # Fetch all descriptions and store them in a dictionary
-        descriptions = {desc["_id"]: desc["description"] for desc in collection.find()}
+        descriptions = catalog.descriptions
 
         # Iterate over the_map
         for i, row in enumerate(the_map):
             for j, col in enumerate(row):
-                #print(i*5+j)
                 # Get the description from the dictionary
                 description = descriptions.get(col[0])
                 # Create a new BlankRoom object and set its attributes
-                room = BlankRoom(i*5+j)
+                room = BlankRoom(i*grid.cols+j, grid, state)
                 # Set the description, encounter_id, and loot_id
                 room.set_description(col[0], description)
                 room.set_encounter_id(col[1])
@@ -34,7 +32,7 @@ def load_descriptions(the_map):
                 room_encounters.append(room)
         # Return the room_encounters list
 
-        return room_encounters, client
+        return room_encounters, catalog.client
     except Exception as e:
         # Print any exceptions that occur
         print(e)
@@ -13,26 +13,23 @@ Sets room encounter properties:
 
 Encounters test alignment consistency through moral/ethical decision scenarios
 with scoring based on expected alignment behavior patterns.
+
+Encounters come from the process-wide ContentCatalog as shared, immutable templates,
+so populating a map makes no database calls once the catalog is loaded. The client
+argument is kept for existing callers.
 """
 
+from map_population.content_catalog import get_catalog
+
 def load_encounters(room_encounters, client, alignment):
     try:
-        db = client["GameDetails"]
-        collection = db["RandomEncounters"]
+        catalog = get_catalog()
 
         for room in room_encounters:
             if room.re_id != "None":
-                result = collection.find_one({"_id": room.re_id})
-                room.set_encounter(result["alignment"],
-                                   result["description"],
-                                   result["aoe"],
-                                   result["aoe_desc"],
-                                   result["aoe_option_desc"],
-                                   result["options"],
-                                   result["points"][alignment],
-                                   result["aoe_points"][alignment]
-                                   )
-                room.set_description(room.d_id, result["room_description"])
+                template = catalog.encounter_template(room.re_id, alignment)
+                room.set_encounter_template(template)
+                room.set_description(room.d_id, template.room_description)
         return room_encounters
 
     except Exception as e:
@@ -13,27 +13,21 @@ Sets room loot properties:
 
 Loot items test motivation consistency through resource/risk scenarios
 with scoring based on expected motivation-driven behavior patterns.
+
+Loot comes from the process-wide ContentCatalog as shared, immutable templates, so
+populating a map makes no database calls once the catalog is loaded. The client
+argument is kept for existing callers.
 """
 
+from map_population.content_catalog import get_catalog
+
 def load_loot(room_encounters, client, motivation):
     try:
-        db = client["GameDetails"]
-        collection = db["RandomLoot"]
+        catalog = get_catalog()
 
         for room in room_encounters:
             if room.l_id != "None":
-                result = collection.find_one({"_id": room.l_id})
-                room.set_loot(result["motivation"],
-                              result["item"],
-                              result["description"],
-                              result["aoe"],
-                              result["aoe_desc"],
-                              result["aoe_option_desc"],
-                              result["options"],
-                              result["points"][motivation],
-                              result["aoe_points"][motivation],
-                              result["special"]
-                              )
+                room.set_loot_template(catalog.loot_template(room.l_id, motivation))
 
         return room_encounters
 
@@ -3,8 +3,9 @@ import cv2
 import numpy as np
 
 def print_ingame_map(the_map):
+    grid = the_map[0].grid
     image_size = (500, 500)
-    square_size = (image_size[0] // 5, image_size[1] // 5)
+    square_size = (image_size[0] // grid.cols, image_size[1] // grid.rows)
 
     image = Image.new('RGB', image_size, 'white')
     draw = ImageDraw.Draw(image)
@@ -13,8 +14,8 @@ def print_ingame_map(the_map):
     font = ImageFont.truetype(font_path, size=12)
 
     for i in range(len(the_map)):
-        x = (i % 5) * square_size[0]
-        y = (i // 5) * square_size[1]
+        x = (i % grid.cols) * square_size[0]
+        y = (i // grid.cols) * square_size[1]
         square_position = (x, y)
 
         if the_map[i].player_active:
@@ -2,7 +2,7 @@ from PIL import Image, ImageDraw, ImageFont
 
 def print_map(map_layout):
     image_size = (500, 575)  # Increase height to accommodate legend
-    square_size = (image_size[0] // 5, 500 // 5)  # Maintain square size for the map
+    square_size = (image_size[0] // len(map_layout[0]), 500 // len(map_layout))  # Fit the grid into the map area
 
     image = Image.new('RGB', image_size, 'white')  # Create a new blank image
     draw = ImageDraw.Draw(image)  # Create a draw object to modify the image
@@ -0,0 +1,66 @@
+"""
+Compiles the game content into a local bundle that games can load without Mongo.
+
+Encounters, loot and definitions are read from the posts dicts in the populate
+scripts (parsed, not imported, since importing them writes to the database). Room
+descriptions only live in the RoomDescriptions collection, so they are read from a
+JSON file of {id: description} when one is given, otherwise fetched from Mongo once.
+
+Usage: python -m utilities.build_content_bundle <path> [descriptions.json]
+Example: python -m utilities.build_content_bundle content.bundle
+Then run the game with CONTENT_BUNDLE=content.bundle
+"""
+
+import ast
+import json
+import os
+import sys
+
+from map_population.content_bundle import read_bundle, write_bundle
+
+UTILITIES_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCES = {
+    "RandomEncounters": "populate_random_encounters.py",
+    "RandomLoot": "populate_random_loot.py",
+    "GameDefinitons": "populate_definitions.py",
+}
+
+
+def read_posts(path):
+    # The literal `posts = {...}` dict of a populate script
+    with open(path) as file:
+        tree = ast.parse(file.read(), path)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(target, "id", None) == "posts" for target in node.targets):
+            return list(ast.literal_eval(node.value).values())
+    raise ValueError(f"No posts dict in {path}")
+
+
+def read_descriptions(path=None):
+    if path is not None:
+        with open(path) as file:
+            return [{"_id": _id, "description": description} for _id, description in json.load(file).items()]
+    from connections.mongo_db import get_connection_details
+    collection = get_connection_details()["GameDetails"]["RoomDescriptions"]
+    return [{"_id": desc["_id"], "description": desc["description"]} for desc in collection.find()]
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        exit(1)
+    path = sys.argv[1]
+    descriptions_path = sys.argv[2] if len(sys.argv) > 2 else None
+
+    collections = {name: read_posts(os.path.join(UTILITIES_DIR, source)) for name, source in SOURCES.items()}
+    collections["RoomDescriptions"] = read_descriptions(descriptions_path)
+    version = write_bundle(path, collections, source=descriptions_path or "mongo")
+
+    # Read it back so a bad bundle fails here rather than in a game
+    contents, _ = read_bundle(path)
+    counts = ", ".join(f"{len(documents)} {name}" for name, documents in contents.items())
+    print(f"Wrote content version {version[:12]} to {path}: {counts}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Builds a memory-mapped corpus of pregenerated maps for run_the_game.
+
+Usage: python -m utilities.build_map_corpus <path> <number_of_maps> [seed] [rows x columns]
+Example: python -m utilities.build_map_corpus maps_5x5.corpus 1000000 42 5x5
+"""
+
+import sys
+import time
+
+from map_creation.grid import get_grid
+from map_creation.layout_codes import min_rooms
+from map_creation.map_corpus import build_corpus, MapCorpus
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        exit(1)
+    path = sys.argv[1]
+    count = int(sys.argv[2])
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    rows, cols = (int(part) for part in sys.argv[4].lower().split("x")) if len(sys.argv) > 4 else (5, 5)
+    # Corpus maps carry both encounters and loot
+    if min(rows, cols) < 2 or rows * cols < min_rooms("b"):
+        print(f"A {rows}x{cols} dungeon is too small, maps need at least {min_rooms('b')} rooms")
+        exit(1)
+
+    start = time.perf_counter()
+    build_corpus(path, count, seed, get_grid(rows, cols))
+    corpus = MapCorpus(path)
+    print(f"Wrote {len(corpus)} {corpus.grid.label} maps to {path} in {time.perf_counter() - start:.1f}s")
+    corpus.close()
+
+
+if __name__ == '__main__':
+    main()
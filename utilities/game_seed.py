@@ -0,0 +1,53 @@
+"""
+Per-game random streams for reproducible maps and player names.
+
+Every game derives a seed from (run name, iteration, profile key). Separate named
+streams are split off that seed for the map, the player name and in-game events,
+so a game draws the same values regardless of what ran before it or which worker
+runs it. Storing the seed is enough to recreate the map and player name later.
+"""
+
+import hashlib
+import random
+
+from map_creation.room_assignment import generate_random_rooms
+from map_creation.random_encounter_assignment import assign_encounter
+from map_creation.random_loot_assignment import assign_loot
+from map_creation.fingerprint import fingerprint_hex
+
+
+def _hash_to_int(text):
+    # 63 bits so the seed can be stored as a MongoDB int64
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") & (2 ** 63 - 1)
+
+
+def game_seed(run_name, iteration, key):
+    return _hash_to_int(f"{run_name}|{iteration}|{key}")
+
+
+def stream_rng(seed, stream):
+    # Independent random stream for one purpose ("map", "name", "play") within a game
+    return random.Random(_hash_to_int(f"{seed}|{stream}"))
+
+
+def generate_game_map(seed, game_type, grid=None):
+    rng = stream_rng(seed, "map")
+    the_map = generate_random_rooms(rng, grid)
+    if game_type in ("a", "b"):
+        the_map = assign_encounter(the_map, rng)
+    if game_type in ("l", "b"):
+        the_map = assign_loot(the_map, rng)
+    return the_map
+
+
+def pick_player_name(seed, names):
+    return stream_rng(seed, "name").choice(names)
+
+
+def seed_record(run_name, iteration, key, game_type, seed, fingerprint=None):
+    # Document stored in place of the full base map, the fingerprint lets analyses group identical layouts
+    record = {"Run": run_name, "Iteration": iteration, "Key": key, "Game Type": game_type, "Seed": seed}
+    if fingerprint is not None:
+        record["Fingerprint"] = fingerprint_hex(fingerprint)
+    return record
@@ -1,4 +1,5 @@
 from Connections.mongo_db import get_connection_details
+from map_population.content_catalog import bump_content_version
 
 client = get_connection_details()
 db = client["GameDetails"]
@@ -36,4 +37,7 @@ posts = {
 }
 
 for post in posts:
-    collection.insert_one(posts[post])
\ No newline at end of file
+    collection.insert_one(posts[post])
+
+# Running games reload the content on their next version check
+bump_content_version(client)
@@ -0,0 +1,27 @@
+"""
+Token counts of prompts, for comparing prompt profiles and budgeting history.
+
+Counts use the gpt-4o tokenizer from tiktoken. Llama 3's tokenizer is a similar
+byte-pair encoding, so the counts are a close estimate for the Ollama path; the
+exact numbers there are reported by Ollama itself (prompt_eval_count).
+"""
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def encoding(model):
+    # Loaded once per process, GPTAssistant counts with it too
+    import tiktoken
+    return tiktoken.encoding_for_model(model)
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text, model="gpt-4o"):
+    # Room prompts repeat a lot during a game, so the counts are memoized
+    return len(encoding(model).encode(text))
+
+
+def count_messages(messages, model="gpt-4o"):
+    # Chat messages (anything with .content, or plain strings), plus the few tokens each message adds for its role
+    return sum(count_tokens(getattr(message, "content", message), model) + 4 for message in messages)
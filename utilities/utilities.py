@@ -30,7 +30,7 @@ def print_populated_map(populated_map):
         line = room.get_ids()
         accumulated_lines += line + " "
         counter += 1
-        if counter % 5 == 0:
+        if counter % room.grid.cols == 0:
             print(accumulated_lines)
             accumulated_lines = ""
 